@@ -3,6 +3,11 @@ ASGI config for CopilotHQ project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the async agent endpoints
+(/api/agents/async/...) can await Claude without tying up a worker:
+
+    uvicorn CopilotHQ.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -135,12 +135,142 @@ AGENT_SETTINGS = {
     'MAX_TOKENS': 4000,
     'MODEL': 'claude-3-5-sonnet-20240620',
     'TEMPERATURE': 0.7,
+    'CACHE_ALIAS': 'agents',
+    # Tool loop: follow-up rounds per question, parallel tool threads
+    'MAX_TOOL_ROUNDS': 3,
+    'TOOL_WORKERS': 4,
+    # Support chat: newest exchanges sent with each question, within a token
+    # budget; older ones are folded into a rolling summary
+    'HISTORY_WINDOW': {
+        'TOKEN_BUDGET': 3000,
+        'SUMMARY_MAX_TOKENS': 600,
+    },
+    # Send the static system prompt as a cacheable prefix
+    'PROMPT_CACHING': True,
+    # Anthropic only caches prefixes (tools + static prompt) of at least this
+    # many tokens (1024 for Sonnet/Opus, 2048 for Haiku); shorter ones are
+    # sent without a cache marker. No current agent reaches it, so caching is
+    # effectively off until a prompt grows (sizes are estimated, ~4 chars/token)
+    'PROMPT_CACHE_MIN_TOKENS': 1024,
+    # Buffered AgentLog writer (see agents/log_sink.py)
+    'LOG_SINK': {
+        'ENABLED': True,
+        'BATCH_SIZE': 200,
+        'FLUSH_INTERVAL': 2.0,
+        'SPOOL_DIR': os.path.join(BASE_DIR, 'var', 'agent_log_spool'),
+    },
+    # AgentLog partitions older than this are archived (per-tenant override:
+    # AgentConfig.agent_settings['log_retention_days'])
+    'LOG_RETENTION_DAYS': 365,
+    'LOG_ARCHIVE_DIR': os.path.join(BASE_DIR, 'var', 'agent_log_archive'),
+    # USD per million tokens, used for usage cost estimates
+    'PRICING': {
+        'claude-3-5-sonnet-20240620': {'input': 3.00, 'output': 15.00, 'cache_write': 3.75, 'cache_read': 0.30},
+        'default': {'input': 3.00, 'output': 15.00, 'cache_write': 3.75, 'cache_read': 0.30},
+    },
+    # Opt-in cache for deterministic calls (call_claude(..., cache=True))
+    'RESPONSE_CACHE': {
+        'ENABLED': True,
+        'MAX_ENTRIES': 1000,  # in-process LRU (L1) size
+        'L1_TTL': 300,
+        'TTLS': {  # seconds, per agent_type
+            'recruiting': 3600,
+            'knowledge': 900,
+            'analytics': 3600,
+        },
+    },
+    # Knowledge search results, invalidated whenever the knowledge base changes
+    'SEARCH_CACHE': {
+        'ENABLED': True,
+        'TTL': 3600,
+        'L1_TTL': 300,
+        'MAX_ENTRIES': 2000,
+    },
+    # Knowledge passages and hashed term vectors (see agents/term_vectors.py)
+    'KNOWLEDGE_INDEX': {
+        'CHUNK_WORDS': 200,
+        'CHUNK_OVERLAP': 40,
+        'DIMENSIONS': 256,
+        'KEYWORD_WEIGHT': 0.4,
+        'TOP_PASSAGES': 6,
+    },
+    # Background file ingestion (see agents/ingestion.py)
+    'INGESTION': {
+        'PAGES_PER_TASK': 20,
+        'WORKERS': 4,
+    },
+    # Bulk knowledge ingest (see agents/bulk_ingest.py)
+    'BULK_INGEST': {
+        'BATCH_SIZE': 200,
+        'MAX_ITEMS': 5000,
+        'MAX_FILE_BYTES': 50 * 1024 * 1024,
+        'MAX_ARCHIVE_BYTES': 500 * 1024 * 1024,
+    },
+    # Map-reduce compliance audits (see agents/compliance.py)
+    'COMPLIANCE_AUDIT': {
+        'SECTION_TOKENS': 2500,
+        'WORKERS': 4,
+        'BACKGROUND_SECTIONS': 3,
+        # Rules run first; 'escalations' sends only ambiguous passages to Claude,
+        # 'always' adds a full LLM audit, 'never' is rules only
+        'LLM_MODE': 'escalations',
+    },
+    # Background bulk resume screening (see agents/screening.py)
+    'BULK_SCREENING': {
+        'CHUNK_SIZE': 10,
+        'TENANT_CONCURRENCY': 4,
+        'RETRY_DELAY': 5,
+        'MAX_SLOT_RETRIES': 720,
+        'SLOT_TIMEOUT': 900,
+        'TOP_K': None,
+    },
+    # Local BM25 pre-ranking of candidates (see agents/prerank.py)
+    'PRERANK': {
+        'K1': 1.2,
+        'B': 0.75,
+    },
+    # Message Batches for offline screening/outreach (see agents/batches.py);
+    # 'auto' uses the local fake backend in mock mode
+    'MESSAGE_BATCHES': {
+        'BACKEND': 'auto',
+        'POLL_INTERVAL': 60,
+        'MAX_WAIT': 26 * 3600,
+        'MAX_REQUESTS': 10000,
+    },
+    # Compensation band index for policy-drift checks (see agents/compensation.py)
+    'COMPENSATION': {
+        'MIN_HEADCOUNT': 3,
+        'MAX_CHANGE_PCT': 15,
+        'EXPLAIN': 'drift',
+        'BULK_MAX_ROWS': 5000,
+        'BULK_EXPLAIN_LIMIT': 20,
+    },
+    # Pooled Anthropic HTTP client (see agents/clients.py)
+    'HTTP': {
+        'MAX_CONNECTIONS': int(os.environ.get('AGENT_HTTP_MAX_CONNECTIONS', 20)),
+        'MAX_KEEPALIVE_CONNECTIONS': int(os.environ.get('AGENT_HTTP_MAX_KEEPALIVE', 10)),
+        'CONNECT_TIMEOUT': 5.0,
+        'READ_TIMEOUT': float(os.environ.get('AGENT_HTTP_READ_TIMEOUT', 120)),
+        'MAX_RETRIES': 2,
+    },
     'ENABLED_AGENTS': [
         'support',
         # 'recruiting',  # Enable later
     ]
 }
 
+# Shared cache for agent contexts and cache versions
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'agents': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('AGENT_CACHE_URL', 'redis://localhost:6379/1'),
+        'KEY_PREFIX': 'copilothq',
+    },
+}
+
 # Celery configuration for async agent tasks
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -148,6 +278,12 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'maintain-agent-log-partitions': {
+        'task': 'agents.tasks.maintain_agent_log_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+}
 
 # Authentication settings
 LOGIN_URL = 'login'
@@ -0,0 +1,25 @@
+"""
+Settings for `manage.py test`: in-memory caches instead of Redis, AgentLog
+rows written synchronously (the sink's flush thread uses its own DB
+connection, which cannot see the test transaction), and agents in mock mode.
+"""
+from .base import *  # noqa: F401,F403
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'agents': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agents',
+    },
+}
+
+ANTHROPIC_API_KEY = None
+
+AGENT_SETTINGS = {
+    **AGENT_SETTINGS,
+    'LOG_SINK': {**AGENT_SETTINGS['LOG_SINK'], 'ENABLED': False},
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
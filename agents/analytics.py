@@ -62,4 +62,4 @@ Analytical, data-heavy, and professional. Use numbers to back up all claims.
             }
         
         prompt = "Based on historical turnover data, predict next quarter's attrition risk."
-        return self.call_claude(prompt)
+        return self.call_claude(prompt, cache=True)
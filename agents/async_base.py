@@ -0,0 +1,121 @@
+from asgiref.sync import sync_to_async
+from django.db import connection, connections
+from .base import BaseAgent
+from .caching import response_cache
+from .clients import get_async_client
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_in_tenant(tenant, func, *args, **kwargs):
+    """
+    Run blocking (ORM) code from async code with the tenant schema set.
+
+    The schema is a property of the thread's DB connection, and that thread
+    is shared by everything awaiting in the same request. Setting it right
+    before every call means a schema switched elsewhere between two awaits
+    can never leak into this tenant's queries.
+    """
+    def _call():
+        connection.set_tenant(tenant)
+        return func(*args, **kwargs)
+
+    return sync_to_async(_call, thread_sensitive=True)()
+
+
+def run_in_tenant_thread(tenant, func, *args, **kwargs):
+    """
+    Like run_in_tenant, but on a pool thread with its own DB connection so
+    several calls can run concurrently. The connection is closed afterwards.
+    """
+    def _call():
+        try:
+            connection.set_tenant(tenant)
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(_call, thread_sensitive=False)()
+
+
+class AsyncBaseAgent(BaseAgent):
+    """
+    Async variant of BaseAgent.
+    Claude calls go through the pooled AsyncAnthropic client so the event
+    loop stays free while a completion is generated; all DB work is
+    delegated to run_in_tenant. Combine with a concrete agent, e.g.
+    class AsyncSupportAgent(AsyncBaseAgent, SupportAgent).
+    """
+
+    @classmethod
+    async def create(cls, tenant):
+        """Construct the agent off the event loop (context lookup hits the DB)"""
+        return await run_in_tenant(tenant, cls, tenant)
+
+    def run_sync(self, func, *args, **kwargs):
+        return run_in_tenant(self.tenant, func, *args, **kwargs)
+
+    async def acall_claude(self, user_message, tools=None, max_tokens=4000, cache=False, messages=None, tool_choice=None):
+        """Async counterpart of call_claude (same logging and response cache)"""
+        if self.mock_mode:
+            return await self.run_sync(self._mock_call_claude, user_message, tools)
+
+        request = self._build_request(user_message, tools, max_tokens, messages, tool_choice)
+        cache_key, cache_ttl = self._response_cache_key(request) if cache else (None, None)
+        if cache_key:
+            cached = await sync_to_async(response_cache.get, thread_sensitive=False)(cache_key)
+            if cached is not None:
+                return await self.run_sync(self._cached_response, user_message, cached)
+
+        started = time.monotonic()
+        try:
+            response = await get_async_client(self.api_key).messages.create(**request)
+        except Exception as e:
+            await self.run_sync(self.log_error, str(e))
+            raise
+
+        await self.run_sync(self._record_response, user_message, response, started, cache_key, cache_ttl)
+        return response
+
+    async def aexecute_tools(self, tool_uses):
+        """Run all tool calls of a response concurrently"""
+        return await asyncio.gather(*[
+            run_in_tenant_thread(self.tenant, self.execute_tool_safely, block)
+            for block in tool_uses
+        ])
+
+    async def astream_claude(self, user_message, tools=None, max_tokens=4000, messages=None, tool_choice=None):
+        """
+        Stream a Claude call as events:
+            {"type": "token", "text": ...}          for every text delta
+            {"type": "tool_use", "id", "name", "input"} for every finished tool block
+            {"type": "message", "message": Message}  once, at the end
+        The completed message is logged exactly like acall_claude.
+        """
+        if self.mock_mode:
+            response = await self.run_sync(self._mock_call_claude, user_message, tools)
+            for word in self.extract_text_response(response).split(" "):
+                yield {"type": "token", "text": word + " "}
+            yield {"type": "message", "message": response}
+            return
+
+        request = self._build_request(user_message, tools, max_tokens, messages, tool_choice)
+        started = time.monotonic()
+        try:
+            async with get_async_client(self.api_key).messages.stream(**request) as stream:
+                async for event in stream:
+                    if event.type == "text":
+                        yield {"type": "token", "text": event.text}
+                    elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                        block = event.content_block
+                        yield {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+                response = await stream.get_final_message()
+        except Exception as e:
+            await self.run_sync(self.log_error, str(e))
+            raise
+
+        await self.run_sync(self._record_response, user_message, response, started)
+        yield {"type": "message", "message": response}
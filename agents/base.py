@@ -1,12 +1,25 @@
 import anthropic
-from django.db import connection
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, connections
 from django.conf import settings
-from .models import AgentLog
+from .log_sink import log_sink
+from .usage import usage_ledger
+from .caching import context_cache, response_cache, get_response_cache_settings
+from .clients import get_client
 import json
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Last round of a tool loop: tool results go back, but no new tool calls
+FINAL_TOOL_CHOICE = {"type": "none"}
+
+# Rough size estimate for the prompt caching threshold (Claude's tokenizer is
+# not public, so the check is approximate either way)
+CHARS_PER_TOKEN = 4
+_tools_tokens = {}  # tool names -> estimated tokens of their definitions
+
 class BaseAgent:
     """
     Base class for all AI agents
@@ -14,32 +27,39 @@ class BaseAgent:
     """
     
     agent_type = "base"
+    # Seconds to reuse responses of call_claude(..., cache=True); None disables
+    response_cache_ttl = None
     
     def __init__(self, tenant):
         self.tenant = tenant
         self.api_key = getattr(settings, 'ANTHROPIC_API_KEY', None)
         
         if self.api_key and self.api_key != 'your-key-here':
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            # Shared, pooled client - keeps HTTP connections warm across requests
+            self.client = get_client(self.api_key)
             self.mock_mode = False
         else:
             self.client = None
             self.mock_mode = True
             logger.warning(f"Starting {self.agent_type} agent in MOCK MODE (API key missing)")
             
-        self.context = self.build_context()
+        connection.set_tenant(self.tenant)
+        # Served from the per-tenant cache; invalidated by Employee/Department signals
+        self.static_context, self.dynamic_context = context_cache.get_or_build(
+            self.tenant.schema_name, self.agent_type, self._build_context_parts
+        )
+        self.context = f"{self.static_context}\n{self.dynamic_context}"
+        
+    def _build_context_parts(self):
+        return self.build_context(), self.build_dynamic_context()
         
     def build_context(self):
         """
-        Build tenant-specific context
-        Override in subclasses to add specialized context
+        Build the stable part of the tenant context (rules, role, tools).
+        Override in subclasses to add specialized context.
+        Must not contain data that changes between requests - it is sent
+        as a cached prompt prefix.
         """
-        connection.set_tenant(self.tenant)
-        
-        # Import models inside to avoid circular imports if any
-        from employees.models import Employee
-        from departments.models import Department
-        
         context = f"""You are an AI agent for {self.tenant.name}.
 
 CRITICAL RULES:
@@ -49,8 +69,6 @@ CRITICAL RULES:
 
 COMPANY INFORMATION:
 - Company Name: {self.tenant.name}
-- Total Employees: {Employee.objects.count()}
-- Departments: {list(Department.objects.values_list('name', flat=True))}
 - Your permissions: {self.get_permissions()}
 
 POLICIES:
@@ -58,6 +76,61 @@ POLICIES:
 """
         return context
     
+    def build_dynamic_context(self):
+        """
+        Build the volatile part of the tenant context (live company data).
+        Sent after the cached prefix so changes here never bust the cache.
+        """
+        connection.set_tenant(self.tenant)
+        
+        # Import models inside to avoid circular imports if any
+        from employees.models import Employee
+        from departments.models import Department
+        
+        return f"""CURRENT COMPANY DATA:
+- Total Employees: {Employee.objects.count()}
+- Departments: {list(Department.objects.values_list('name', flat=True))}
+"""
+    
+    def get_system_blocks(self, tools=None):
+        """
+        System prompt as content blocks. The static block carries a
+        cache_control marker, so Anthropic can reuse the prefix up to it
+        (tool definitions come first, then the static context) across calls.
+
+        Prefixes shorter than PROMPT_CACHE_MIN_TOKENS are never cached by
+        Anthropic, so below it the marker is left out. No current agent
+        reaches it (static context ~300-500 tokens, tools a few hundred), so
+        prompt caching is effectively off until a prefix grows past it.
+        """
+        agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+        if not agent_settings.get('PROMPT_CACHING', True):
+            return self.context
+        
+        static_block = {"type": "text", "text": self.static_context}
+        if self.cacheable_prefix_tokens(tools) >= agent_settings.get('PROMPT_CACHE_MIN_TOKENS', 1024):
+            static_block["cache_control"] = {"type": "ephemeral"}
+        return [
+            static_block,
+            {
+                "type": "text",
+                "text": self.dynamic_context
+            }
+        ]
+    
+    def cacheable_prefix_tokens(self, tools=None):
+        """
+        Estimated size of the cacheable prefix (tool definitions and static
+        context) at CHARS_PER_TOKEN; tool sets are measured once per process
+        """
+        tokens = len(self.static_context) // CHARS_PER_TOKEN
+        if tools:
+            signature = tuple(tool.get("name") for tool in tools)
+            if signature not in _tools_tokens:
+                _tools_tokens[signature] = len(json.dumps(tools, default=str)) // CHARS_PER_TOKEN
+            tokens += _tools_tokens[signature]
+        return tokens
+    
     def get_permissions(self):
         """Override in subclasses"""
         return []
@@ -67,37 +140,186 @@ POLICIES:
         # TODO: Implement policy model or fetch from a known location
         return "Standard HR policies apply."
     
-    def call_claude(self, user_message, tools=None, max_tokens=4000):
+    def get_model(self):
+        return getattr(settings, 'AGENT_SETTINGS', {}).get('MODEL', 'claude-3-5-sonnet-20240620')
+    
+    def get_response_cache_ttl(self):
+        """Per-agent TTL, overridable in AGENT_SETTINGS['RESPONSE_CACHE']['TTLS']"""
+        cache_settings = get_response_cache_settings()
+        if not cache_settings['ENABLED']:
+            return None
+        return cache_settings['TTLS'].get(self.agent_type, self.response_cache_ttl)
+    
+    def call_claude(self, user_message, tools=None, max_tokens=4000, cache=False, messages=None, tool_choice=None):
         """
         Make API call to Claude with tenant context or return mock response
+        
+        cache=True opts a deterministic call into the response cache: an
+        identical (tenant, agent, model, system, prompt, tools) request is
+        answered without a round trip while the agent's TTL lasts.
+        messages replaces the single user turn with a full conversation
+        (user_message is then only used for the audit log).
+        tool_choice is passed through as is (e.g. {"type": "none"}).
         """
         if self.mock_mode:
             return self._mock_call_claude(user_message, tools)
 
-        messages = [
+        request = self._build_request(user_message, tools, max_tokens, messages, tool_choice)
+        cache_key, cache_ttl = self._response_cache_key(request) if cache else (None, None)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return self._cached_response(user_message, cached)
+        
+        started = time.monotonic()
+        try:
+            response = self.client.messages.create(**request)
+            self._record_response(user_message, response, started, cache_key, cache_ttl)
+            return response
+            
+        except Exception as e:
+            self.log_error(str(e))
+            raise
+
+    def _build_request(self, user_message, tools=None, max_tokens=4000, messages=None, tool_choice=None):
+        """Keyword arguments for messages.create (shared by sync and async runtimes)"""
+        request = {
+            "model": self.get_model(),
+            "max_tokens": max_tokens,
+            "system": self.get_system_blocks(tools),
+            "messages": messages or self.build_user_messages(user_message),
+            "tools": tools or [],
+        }
+        if tool_choice:
+            request["tool_choice"] = tool_choice
+        return request
+
+    def build_user_messages(self, user_message):
+        return [
             {
                 "role": "user",
                 "content": f"[TENANT: {self.tenant.schema_name}]\n\n{user_message}"
             }
         ]
+
+    def _response_cache_key(self, request):
+        cache_ttl = self.get_response_cache_ttl()
+        if not cache_ttl:
+            return None, None
         
-        try:
-            response = self.client.messages.create(
-                model=getattr(settings, 'AGENT_SETTINGS', {}).get('MODEL', 'claude-3-5-sonnet-20240620'),
-                max_tokens=max_tokens,
-                system=self.context,
-                messages=messages,
-                tools=tools or []
+        cache_key = response_cache.make_key(
+            self.tenant.schema_name, self.agent_type, request["model"],
+            request["system"], request["messages"],
+            [request["tools"], request["tool_choice"]] if "tool_choice" in request else request["tools"],
+            request["max_tokens"]
+        )
+        return cache_key, cache_ttl
+
+    def _cached_response(self, user_message, cached):
+        response = anthropic.types.Message.model_validate(cached)
+        self.log_interaction(user_message, response, latency_ms=0, cached=True)
+        return response
+
+    def _record_response(self, user_message, response, started, cache_key=None, cache_ttl=None):
+        """Log a completed call and store it in the response cache if requested"""
+        latency_ms = int((time.monotonic() - started) * 1000)
+        self.log_interaction(user_message, response, latency_ms=latency_ms)
+        
+        if cache_key and response.stop_reason != "max_tokens":
+            response_cache.set(cache_key, response.model_dump(), cache_ttl)
+
+    def get_max_tool_rounds(self):
+        return getattr(settings, 'AGENT_SETTINGS', {}).get('MAX_TOOL_ROUNDS', 3)
+    
+    def execute_tool(self, tool_name, tool_input):
+        """Override in subclasses that offer tools"""
+        return None
+    
+    def run_tool_loop(self, prompt, tools, messages=None, max_tokens=4000):
+        """
+        Call Claude and keep answering its tool requests until it produces
+        a final answer. Once MAX_TOOL_ROUNDS rounds of tools have run, the
+        last call sends their results with tool_choice none, so the answer
+        is always text rather than another tool request.
+        
+        All tool_use blocks of one response are executed concurrently and
+        returned together in a single follow-up turn that carries the whole
+        conversation, so a question costs ~2 calls instead of N+1.
+        
+        Returns (final response, tool_calls).
+        """
+        messages = messages or self.build_user_messages(prompt)
+        tool_calls = []
+        log_message = prompt
+        
+        max_rounds = self.get_max_tool_rounds()
+        for round_number in range(max_rounds + 1):
+            response = self.call_claude(
+                log_message, tools=tools, max_tokens=max_tokens, messages=messages,
+                tool_choice=FINAL_TOOL_CHOICE if round_number == max_rounds else None
             )
+            tool_uses = self.get_tool_uses(response)
+            if not tool_uses or round_number == max_rounds:
+                break
             
-            # Log the interaction
-            self.log_interaction(user_message, response)
-            
-            return response
-            
+            results = self.execute_tools(tool_uses)
+            tool_calls += [
+                {"tool": block.name, "input": block.input, "result": result}
+                for block, result in zip(tool_uses, results)
+            ]
+            messages = messages + self.build_tool_turn(response, tool_uses, results)
+            log_message = f"Tool results: {json.dumps(results, default=str)}"
+        
+        return response, tool_calls
+    
+    def get_tool_uses(self, response):
+        if self.mock_mode:
+            return []
+        return [block for block in response.content if block.type == "tool_use"]
+    
+    def execute_tools(self, tool_uses):
+        """Run tool calls concurrently (each in its own thread and DB connection)"""
+        if len(tool_uses) == 1:
+            return [self.execute_tool_safely(tool_uses[0])]
+        
+        def run(block):
+            try:
+                connection.set_tenant(self.tenant)
+                return self.execute_tool_safely(block)
+            finally:
+                connections.close_all()
+        
+        workers = getattr(settings, 'AGENT_SETTINGS', {}).get('TOOL_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=min(workers, len(tool_uses))) as executor:
+            return list(executor.map(run, tool_uses))
+    
+    def execute_tool_safely(self, block):
+        """A failing tool becomes an error result Claude can react to"""
+        try:
+            return self.execute_tool(block.name, block.input)
         except Exception as e:
-            self.log_error(str(e))
-            raise
+            logger.error(f"Tool {block.name} failed: {str(e)}")
+            return {"error": str(e)}
+    
+    def build_tool_turn(self, response, tool_uses, results):
+        """Assistant tool request + one user message with every tool result"""
+        return [
+            {
+                "role": "assistant",
+                "content": [block.model_dump(exclude_none=True) for block in response.content]
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": json.dumps(result, default=str),
+                    }
+                    for block, result in zip(tool_uses, results)
+                ]
+            }
+        ]
 
     def _mock_call_claude(self, user_message, tools=None):
         """Simulate Claude response for development"""
@@ -110,6 +332,8 @@ POLICIES:
             def __init__(self):
                 self.input_tokens = 0
                 self.output_tokens = 0
+                self.cache_creation_input_tokens = 0
+                self.cache_read_input_tokens = 0
 
         class MockContentBlock:
             def __init__(self, text):
@@ -126,10 +350,8 @@ POLICIES:
         self.log_interaction(user_message, MockResponse(mock_text))
         return MockResponse(mock_text)
     
-    def log_interaction(self, prompt, response):
-        """Log agent interactions for audit trail"""
-        connection.set_tenant(self.tenant)
-        
+    def log_interaction(self, prompt, response, latency_ms=None, cached=False):
+        """Log agent interactions for audit trail (buffered, see log_sink)"""
         # Check if response content is a list or object
         try:
             if hasattr(response.content[0], 'text'):
@@ -139,27 +361,47 @@ POLICIES:
         except:
             resp_text = str(response)
 
-        AgentLog.objects.create(
-            tenant=self.tenant,
+        model = getattr(response, 'model', 'unknown')
+        usage = self.extract_usage(response)
+        
+        log_sink.emit(
+            self.tenant,
             agent_type=self.agent_type,
             action="call_claude",
             prompt=prompt[:5000],
             response=resp_text[:5000],
             metadata={
-                "model": getattr(response, 'model', 'unknown'),
-                "usage": {
-                    "input_tokens": getattr(response.usage, 'input_tokens', 0),
-                    "output_tokens": getattr(response.usage, 'output_tokens', 0),
-                } if hasattr(response, 'usage') else {}
+                "model": model,
+                "usage": usage,
+                "latency_ms": latency_ms,
+                "response_cache": "hit" if cached else "miss",
             }
         )
+        
+        # Cache hits cost no tokens
+        usage_ledger.record(
+            self.tenant, self.agent_type, model,
+            {} if cached else usage,
+            latency_ms=latency_ms, cached=cached
+        )
+    
+    def extract_usage(self, response):
+        """Token usage of a response, including prompt-cache reads/writes"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return {}
+        
+        return {
+            "input_tokens": getattr(usage, 'input_tokens', 0) or 0,
+            "output_tokens": getattr(usage, 'output_tokens', 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+            "cache_read_input_tokens": getattr(usage, 'cache_read_input_tokens', 0) or 0,
+        }
     
     def log_error(self, error):
         """Log errors"""
-        connection.set_tenant(self.tenant)
-        
-        AgentLog.objects.create(
-            tenant=self.tenant,
+        log_sink.emit(
+            self.tenant,
             agent_type=self.agent_type,
             action="error",
             response=error,
@@ -0,0 +1,284 @@
+"""
+Message Batches mode for offline recruiting work (resume screening and
+outreach drafts).
+
+start_message_batch packs one request per candidate into a single provider
+batch (half the price of synchronous calls, no per-minute rate limits) and
+records it in an AgentTask; agents.tasks.poll_message_batch polls it and,
+once it has ended, maps the results back to candidates through their
+custom_id. Without an API key (mock mode), or with
+MESSAGE_BATCHES['BACKEND'] = 'fake', batches go to FakeBatchBackend, a
+cache-backed stand-in for the provider so the flow runs offline.
+"""
+from django.conf import settings
+from django.db import transaction
+from .caching import get_cache
+import anthropic
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SETTINGS = {
+    'BACKEND': 'auto',          # 'auto' (fake in mock mode), 'anthropic' or 'fake'
+    'POLL_INTERVAL': 60,        # seconds between status checks
+    'MAX_WAIT': 26 * 3600,      # seconds after which polling gives up (batches expire after 24 hours)
+    'MAX_REQUESTS': 10000,      # candidates per batch
+    'SCREEN_MAX_TOKENS': 1500,
+    'OUTREACH_MAX_TOKENS': 800,
+    'FAKE_DURATION': 5,         # seconds a fake batch stays in_progress
+}
+
+BATCH_KINDS = ('screen', 'outreach')
+
+
+def get_batch_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_BATCH_SETTINGS, **agent_settings.get('MESSAGE_BATCHES', {})}
+
+
+def custom_id(kind, candidate_id):
+    return f"{kind}-{candidate_id}"
+
+
+def parse_custom_id(value):
+    kind, _, candidate_id = value.rpartition('-')
+    return kind, int(candidate_id)
+
+
+class AnthropicBatchBackend:
+    name = 'anthropic'
+
+    def __init__(self, client):
+        # Message Batches are GA in newer SDKs and in beta in older ones
+        self.batches = getattr(client.messages, 'batches', None) or client.beta.messages.batches
+
+    def create(self, entries):
+        batch = self.batches.create(requests=[
+            {"custom_id": entry["custom_id"], "params": entry["params"]} for entry in entries
+        ])
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.batches.retrieve(batch_id)
+        return {
+            "processing_status": batch.processing_status,
+            "request_counts": batch.request_counts.model_dump(),
+        }
+
+    def results(self, batch_id):
+        """Yields (custom_id, message or None, error or None)"""
+        for entry in self.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                yield entry.custom_id, entry.result.message, None
+            else:
+                error = getattr(entry.result, 'error', None)
+                yield entry.custom_id, None, str(error) if error else entry.result.type
+
+
+class FakeBatchBackend:
+    """
+    Local batch server: stores a batch's canned responses (each entry's
+    mock_text) in the cache and reports it in_progress for FAKE_DURATION
+    seconds, then ended.
+    """
+    name = 'fake'
+
+    def _key(self, batch_id):
+        return f"agents:fake_batch:{batch_id}"
+
+    def create(self, entries):
+        batch_id = f"msgbatch_fake_{uuid.uuid4().hex}"
+        get_cache().set(self._key(batch_id), {
+            "created": time.time(),
+            "responses": {entry["custom_id"]: entry["mock_text"] for entry in entries},
+        }, 2 * 24 * 3600)
+        return batch_id
+
+    def _batch(self, batch_id):
+        batch = get_cache().get(self._key(batch_id))
+        if batch is None:
+            raise LookupError(f"Unknown batch {batch_id}")
+        return batch
+
+    def retrieve(self, batch_id):
+        batch = self._batch(batch_id)
+        count = len(batch["responses"])
+        ended = time.time() - batch["created"] >= get_batch_settings()['FAKE_DURATION']
+        return {
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0, "canceled": 0, "expired": 0,
+            },
+        }
+
+    def results(self, batch_id):
+        for key, text in self._batch(batch_id)["responses"].items():
+            yield key, anthropic.types.Message.model_validate({
+                "id": f"msg_fake_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "model": "mock-model",
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 0, "output_tokens": 0},
+            }), None
+
+
+def get_backend(agent, name=None):
+    name = name or get_batch_settings()['BACKEND']
+    if name == 'fake' or (name == 'auto' and agent.mock_mode):
+        return FakeBatchBackend()
+    if agent.client is None:
+        raise ValueError("The Anthropic batch backend needs an API key")
+    return AnthropicBatchBackend(agent.client)
+
+
+def build_entries(agent, kind, job, candidates):
+    """One batch request per candidate"""
+    import json
+
+    batch_settings = get_batch_settings()
+    entries = []
+    for candidate in candidates:
+        if kind == 'screen':
+            prompt = agent.build_screening_prompt(candidate, job)
+            max_tokens = batch_settings['SCREEN_MAX_TOKENS']
+            mock_text = json.dumps(agent._mock_screen_resume(candidate, job))
+        else:
+            prompt = agent.build_outreach_prompt(candidate, job)
+            max_tokens = batch_settings['OUTREACH_MAX_TOKENS']
+            mock_text = agent._mock_draft_outreach(candidate, job)
+        params = agent._build_request(prompt, max_tokens=max_tokens)
+        params.pop("tools", None)
+        entries.append({
+            "custom_id": custom_id(kind, candidate.id),
+            "params": params,
+            "prompt": prompt,
+            "mock_text": mock_text,
+        })
+    return entries
+
+
+def start_message_batch(tenant, job, kind, candidate_ids=None, rescreen=False, force_refresh=False):
+    """
+    Submit one batch for the job's candidates (the given candidate_ids, or
+    every candidate; screening skips already screened ones unless
+    rescreen). Candidates with a stored screening result get it at once and
+    are left out of the batch unless force_refresh. Returns the AgentTask
+    tracking it.
+    """
+    from django.utils import timezone
+    from candidates.models import Candidate
+    from .models import AgentTask
+    from .recruiting import RecruitingAgent
+    from .tasks import poll_message_batch
+
+    if kind not in BATCH_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(BATCH_KINDS)}")
+
+    batch_settings = get_batch_settings()
+    candidates = Candidate.objects.filter(job=job).order_by('id')
+    if candidate_ids:
+        candidates = candidates.filter(id__in=candidate_ids)
+    if kind == 'screen' and not rescreen:
+        candidates = candidates.filter(ai_evaluation__isnull=True)
+    candidates = list(candidates)
+    if len(candidates) > batch_settings['MAX_REQUESTS']:
+        raise ValueError(f"At most {batch_settings['MAX_REQUESTS']} candidates per batch")
+
+    agent = RecruitingAgent(tenant)
+    reused = []
+    if kind == 'screen' and not force_refresh:
+        stored = agent.stored_evaluations(candidates, job)
+        for candidate in candidates:
+            if candidate.id in stored:
+                agent.apply_evaluation(candidate, stored[candidate.id])
+                reused.append(candidate)
+        Candidate.objects.bulk_update(reused, ['ai_score', 'ai_evaluation'], batch_size=500)
+        candidates = [candidate for candidate in candidates if candidate.id not in stored]
+
+    task = AgentTask.objects.create(
+        tenant=tenant,
+        agent_type='recruiting',
+        task_type=f"batch_{kind}",
+        input_data={
+            "job_id": job.id, "kind": kind,
+            "candidate_ids": [candidate.id for candidate in candidates], "reused": len(reused),
+        },
+        progress_total=len(candidates),
+    )
+    if not candidates:
+        output_data = {"job_id": job.id, "kind": kind}
+        if kind == 'screen':
+            output_data.update(screened=0, reused=len(reused), failed=[])
+        AgentTask.objects.filter(id=task.id).update(
+            status='completed', completed_at=timezone.now(), output_data=output_data
+        )
+        task.refresh_from_db()
+        return task
+
+    backend = get_backend(agent)
+    batch_id = backend.create(build_entries(agent, kind, job, candidates))
+    task.status = 'running'
+    task.output_data = {"job_id": job.id, "kind": kind, "batch_id": batch_id, "backend": backend.name}
+    task.save(update_fields=['status', 'output_data'])
+    logger.info(f"Submitted {kind} batch {batch_id} ({len(candidates)} requests) for tenant {tenant.name}")
+
+    transaction.on_commit(lambda: poll_message_batch.apply_async(
+        (tenant.id, task.id), countdown=batch_settings['POLL_INTERVAL']
+    ))
+    return task
+
+
+def apply_batch_results(agent, task):
+    """
+    Map an ended batch's results back to candidates: evaluations are saved
+    with bulk_update, outreach drafts are returned. Returns the task output.
+    """
+    from candidates.models import Candidate, Job
+
+    output = dict(task.output_data)
+    kind = output["kind"]
+    job = Job.objects.get(id=task.input_data["job_id"])
+    backend = get_backend(agent, output["backend"])
+    candidates = Candidate.objects.in_bulk(task.input_data["candidate_ids"])
+
+    screened, drafts, failed = [], {}, []
+    for result_id, message, error in backend.results(output["batch_id"]):
+        try:
+            _, candidate_id = parse_custom_id(result_id)
+        except ValueError:
+            logger.warning(f"Unexpected custom_id {result_id} in batch {output['batch_id']}")
+            continue
+        candidate = candidates.get(candidate_id)
+        if candidate is None:
+            continue
+        if message is None:
+            failed.append({"candidate_id": candidate_id, "error": error})
+            continue
+
+        agent.log_interaction(f"[batch {output['batch_id']}] {result_id}", message)
+        text = agent.extract_text_response(message)
+        if kind == 'outreach':
+            drafts[str(candidate_id)] = text
+            continue
+        evaluation = agent.parse_evaluation(text)
+        if "error" in evaluation:
+            failed.append({"candidate_id": candidate_id, "error": evaluation["error"]})
+            continue
+        agent.apply_evaluation(candidate, evaluation)
+        screened.append(candidate)
+
+    agent.store_evaluations([(candidate, candidate.ai_evaluation) for candidate in screened], job)
+    Candidate.objects.bulk_update(screened, ['ai_score', 'ai_evaluation'], batch_size=500)
+    output.update(failed=failed)
+    if kind == 'outreach':
+        output["drafts"] = drafts
+    else:
+        output.update(screened=len(screened), reused=task.input_data.get("reused", 0))
+    return output
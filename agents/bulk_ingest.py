@@ -0,0 +1,227 @@
+"""
+Bulk loading of knowledge base documents (see the knowledge_ingest_bulk view).
+
+Entries are streamed in from a zip archive, a multipart batch or NDJSON and
+written in batches: one query finds the existing titles of a batch, then
+one bulk_create and one bulk_update write it. Text whose sha256 matches the
+stored content_hash is reported as unchanged. PDFs go to the background
+ingestion pipeline (agents/ingestion.py), and passages of written documents
+are indexed by a Celery task.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from .caching import search_cache
+import hashlib
+import json
+import os
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.csv', '.json', '.html', '.htm'}
+
+DEFAULT_BULK_INGEST_SETTINGS = {
+    'BATCH_SIZE': 200,
+    'MAX_ITEMS': 5000,
+    'MAX_FILE_BYTES': 50 * 1024 * 1024,
+    'MAX_ARCHIVE_BYTES': 500 * 1024 * 1024,
+}
+
+
+def get_bulk_ingest_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_BULK_INGEST_SETTINGS, **agent_settings.get('BULK_INGEST', {})}
+
+
+class ArchiveTooLarge(Exception):
+    pass
+
+
+def copy_archive(source, target, max_bytes=None):
+    """Copy a request body into target, refusing more than MAX_ARCHIVE_BYTES"""
+    max_bytes = max_bytes or get_bulk_ingest_settings()['MAX_ARCHIVE_BYTES']
+    copied = 0
+    for block in iter(lambda: source.read(1024 * 1024), b''):
+        copied += len(block)
+        if copied > max_bytes:
+            raise ArchiveTooLarge()
+        target.write(block)
+
+
+def title_from_name(name):
+    return os.path.splitext(os.path.basename(name))[0].replace('_', ' ').strip() or name
+
+
+class BulkIngestor:
+    """Collects entries, writes them in batches and builds a per-item report"""
+
+    def __init__(self, tenant, category="General", force=False):
+        self.tenant = tenant
+        self.category = category
+        self.force = force
+        self.settings = get_bulk_ingest_settings()
+        self.report = []
+        self._batch = []  # [(report item, title, content, category)]
+        self._titles = set()
+
+    def _item(self, name, **fields):
+        item = {"index": len(self.report), "title": name, **fields}
+        self.report.append(item)
+        return item
+
+    def add_error(self, name, error):
+        self._item(name, status="error", error=error)
+
+    def accepts_more(self):
+        return len(self.report) < self.settings['MAX_ITEMS']
+
+    def add_text(self, title, content, category=None):
+        if not title or content is None:
+            self.add_error(title or "", "title and content are required")
+            return
+        if title in self._titles:
+            # Same title twice in one batch: write the earlier one first
+            self.flush()
+        item = self._item(title, status="pending")
+        self._batch.append((item, title, str(content), category or self.category))
+        self._titles.add(title)
+        if len(self._batch) >= self.settings['BATCH_SIZE']:
+            self.flush()
+
+    def add_file(self, name, data):
+        """A file from an archive or an upload; data is bytes or an uploaded file"""
+        from .knowledge import KnowledgeAgent
+
+        ext = os.path.splitext(name)[1].lower()
+        size = len(data) if isinstance(data, bytes) else data.size
+        if size > self.settings['MAX_FILE_BYTES']:
+            self.add_error(title_from_name(name), "file too large")
+            return
+
+        if ext == '.pdf':
+            upload = ContentFile(data, name=os.path.basename(name)) if isinstance(data, bytes) else data
+            result = KnowledgeAgent(self.tenant).ingest_document(
+                upload, title_from_name(name), category=self.category, force=self.force
+            )
+            if result["success"]:
+                status = "queued" if result["status"] == 'pending' else "unchanged"
+                self._item(result["title"], status=status, document_id=result["document_id"])
+            else:
+                self.add_error(title_from_name(name), result["error"])
+        elif ext in TEXT_EXTENSIONS:
+            raw = data if isinstance(data, bytes) else data.read()
+            self.add_text(title_from_name(name), raw.decode('utf-8', errors='replace'))
+        else:
+            self.add_error(title_from_name(name), f"unsupported file type {ext or '(none)'}")
+
+    def flush(self):
+        from .models import KnowledgeBase, KnowledgeChunk
+        from .passage_index import chunk_index
+        from .tasks import index_knowledge_documents
+
+        batch, self._batch, self._titles = self._batch, [], set()
+        if not batch:
+            return
+
+        existing = {}
+        for document in KnowledgeBase.objects.filter(
+            tenant=self.tenant, title__in=[title for _, title, _, _ in batch]
+        ).only('id', 'title', 'category', 'content_hash').order_by('id'):
+            existing[document.title] = document
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for item, title, content, category in batch:
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            document = existing.get(title)
+            if document is None:
+                document = KnowledgeBase(
+                    tenant=self.tenant, title=title, content=content, category=category,
+                    content_hash=content_hash, ingest_status='ready', ingested_at=now,
+                )
+                to_create.append((item, document))
+            elif document.content_hash == content_hash and not self.force:
+                item.update(status="unchanged", document_id=document.id)
+            else:
+                document.content = content
+                document.category = category
+                document.content_hash = content_hash
+                document.ingest_status = 'ready'
+                document.ingest_error = ''
+                document.ingested_at = now
+                document.updated_at = now
+                to_update.append((item, document))
+
+        try:
+            with transaction.atomic():
+                KnowledgeBase.objects.bulk_create([document for _, document in to_create])
+                KnowledgeBase.objects.bulk_update(
+                    [document for _, document in to_update],
+                    ['content', 'category', 'content_hash', 'ingest_status', 'ingest_error', 'ingested_at', 'updated_at']
+                )
+                # Passages of the old text must not be served until the reindex
+                KnowledgeChunk.objects.filter(document_id__in=[document.id for _, document in to_update]).delete()
+        except Exception as e:
+            logger.error(f"Bulk ingest batch failed: {str(e)}")
+            for item, _ in to_create + to_update:
+                item.update(status="error", error=str(e))
+            return
+
+        for item, document in to_create:
+            item.update(status="created", document_id=document.id)
+        for item, document in to_update:
+            item.update(status="updated", document_id=document.id)
+
+        written = [document.id for _, document in to_create + to_update]
+        if written:
+            # bulk_create/bulk_update send no signals
+            schema_name = self.tenant.schema_name
+            search_cache.invalidate(schema_name)
+            if to_update:
+                transaction.on_commit(lambda: chunk_index.invalidate(schema_name))
+            transaction.on_commit(lambda: index_knowledge_documents.delay(self.tenant.id, written))
+
+    def finish(self):
+        self.flush()
+        counts = {}
+        for item in self.report:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {"total": len(self.report), "counts": counts, "items": self.report}
+
+
+def ingest_zip(ingestor, fileobj):
+    size = getattr(fileobj, 'size', None)
+    if size is not None and size > ingestor.settings['MAX_ARCHIVE_BYTES']:
+        raise ArchiveTooLarge()
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or os.path.basename(info.filename).startswith('.'):
+                continue
+            if not ingestor.accepts_more():
+                break
+            if info.file_size > ingestor.settings['MAX_FILE_BYTES']:
+                ingestor.add_error(title_from_name(info.filename), "file too large")
+                continue
+            ingestor.add_file(info.filename, archive.read(info))
+
+
+def ingest_ndjson(ingestor, stream):
+    """One JSON object per line: {"title", "content", "category"?}"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if not ingestor.accepts_more():
+            break
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            ingestor.add_error("", f"invalid JSON: {str(e)}")
+            continue
+        if not isinstance(entry, dict):
+            ingestor.add_error("", "each line must be a JSON object")
+            continue
+        ingestor.add_text(entry.get("title"), entry.get("content"), entry.get("category"))
@@ -0,0 +1,327 @@
+from django.conf import settings
+from django.core.cache import caches
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache():
+    """Return the cache backend shared by all agent caches"""
+    alias = getattr(settings, 'AGENT_SETTINGS', {}).get('CACHE_ALIAS', 'default')
+    return caches[alias]
+
+
+def _version_key(scope, schema_name):
+    return f"agents:version:{scope}:{schema_name}"
+
+
+def get_version(scope, schema_name):
+    """
+    Current version of a tenant-scoped cache namespace.
+    Versions live in the shared cache so every worker sees a bump.
+    """
+    try:
+        return get_cache().get(_version_key(scope, schema_name), 0)
+    except Exception as e:
+        logger.warning(f"Could not read cache version {scope}/{schema_name}: {str(e)}")
+        return None
+
+
+def bump_version(scope, schema_name):
+    """Invalidate every entry of a tenant-scoped namespace"""
+    key = _version_key(scope, schema_name)
+    cache = get_cache()
+    try:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Key missing (first bump or evicted) - start a fresh counter
+            cache.set(key, 1, None)
+            return 1
+    except Exception as e:
+        logger.warning(f"Could not bump cache version {scope}/{schema_name}: {str(e)}")
+        return None
+
+
+class TenantContextCache:
+    """
+    In-process cache of rendered agent contexts.
+
+    Entries are keyed by (schema, agent_type) and tagged with the tenant's
+    "context" version. Employee/Department signals bump that version, so a
+    stale entry is simply ignored on the next lookup.
+    """
+
+    scope = "context"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, schema_name, agent_type, builder):
+        version = get_version(self.scope, schema_name)
+        key = (schema_name, agent_type)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if version is not None and entry and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = builder()
+
+        # Never cache when the shared version could not be read
+        if version is not None:
+            with self._lock:
+                self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self, schema_name):
+        bump_version(self.scope, schema_name)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == schema_name]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+context_cache = TenantContextCache()
+
+
+class ResponseCache:
+    """
+    Two-level cache of Claude responses for deterministic agent calls.
+
+    L1 is a size-bounded LRU dict inside the process, L2 is the shared
+    'agents' cache (Redis) so other workers can reuse a response. Entries
+    expire after the per-agent TTL on both levels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return get_response_cache_settings()['MAX_ENTRIES']
+
+    def make_key(self, schema_name, agent_type, model, system, prompt, tools, max_tokens):
+        def digest(value):
+            raw = json.dumps(value, sort_keys=True, default=str)
+            return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+        return "agents:response:" + ":".join([
+            schema_name,
+            agent_type,
+            model,
+            digest(system),
+            digest(prompt),
+            digest([tools or [], max_tokens]),
+        ])
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires_at, data = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                del self._entries[key]
+
+        try:
+            data = get_cache().get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.l2_hits += 1
+            # Remaining TTL is unknown here; keep L1 copies short-lived
+            self._store_local(key, data, min(60, get_response_cache_settings()['L1_TTL']))
+        return data
+
+    def set(self, key, data, ttl):
+        with self._lock:
+            self._store_local(key, data, min(ttl, get_response_cache_settings()['L1_TTL']))
+        try:
+            get_cache().set(key, data, ttl)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def _store_local(self, key, data, ttl):
+        # Called with the lock held
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.l2_hits + self.misses
+            return {
+                "hits": self.hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": round((self.hits + self.l2_hits) / total, 4) if total else 0.0,
+            }
+
+
+DEFAULT_RESPONSE_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 1000,
+    'L1_TTL': 300,
+    'TTLS': {},
+}
+
+
+def get_response_cache_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_RESPONSE_CACHE_SETTINGS, **agent_settings.get('RESPONSE_CACHE', {})}
+
+
+response_cache = ResponseCache()
+
+
+class SearchResultCache:
+    """
+    Knowledge search results per tenant and normalized query.
+
+    Keys carry the tenant's "knowledge" version, which KnowledgeBase
+    signals (and bulk writers, explicitly) bump on every change, so a
+    result is never served after the documents behind it changed.
+    L1 is an in-process LRU dict, L2 the shared cache.
+    """
+
+    scope = "knowledge"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query):
+        # Quotes, - and * change the meaning of a query; case and other punctuation do not
+        return " ".join(re.sub(r'[^\w\s"*-]', ' ', query.lower()).split())
+
+    def _key(self, schema_name, version, query, variant):
+        digest = hashlib.sha256(json.dumps([self.normalize(query), variant]).encode('utf-8')).hexdigest()[:32]
+        return f"agents:search:{schema_name}:{version}:{digest}"
+
+    def get(self, schema_name, query, variant=None):
+        """Returns (key, cached result or None); key is None when caching is unavailable"""
+        search_settings = get_search_cache_settings()
+        if not search_settings['ENABLED']:
+            return None, None
+        version = get_version(self.scope, schema_name)
+        if version is None:
+            return None, None
+
+        key = self._key(schema_name, version, query, variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, copy.deepcopy(entry[1])
+
+        try:
+            data = get_cache().get(key)
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {str(e)}")
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return key, None
+            self.l2_hits += 1
+            self._store_local(key, data, search_settings)
+        return key, copy.deepcopy(data)
+
+    def set(self, key, data):
+        if key is None:
+            return
+        search_settings = get_search_cache_settings()
+        with self._lock:
+            self._store_local(key, copy.deepcopy(data), search_settings)
+        try:
+            get_cache().set(key, data, search_settings['TTL'])
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {str(e)}")
+
+    def _store_local(self, key, data, search_settings):
+        # Called with the lock held
+        self._entries[key] = (time.monotonic() + search_settings['L1_TTL'], data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > search_settings['MAX_ENTRIES']:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, schema_name):
+        bump_version(self.scope, schema_name)
+        prefix = f"agents:search:{schema_name}:"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.l2_hits + self.misses
+            return {
+                "hits": self.hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": round((self.hits + self.l2_hits) / total, 4) if total else 0.0,
+            }
+
+
+DEFAULT_SEARCH_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'TTL': 3600,
+    'L1_TTL': 300,
+    'MAX_ENTRIES': 2000,
+}
+
+
+def get_search_cache_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_SEARCH_CACHE_SETTINGS, **agent_settings.get('SEARCH_CACHE', {})}
+
+
+search_cache = SearchResultCache()
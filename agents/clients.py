@@ -0,0 +1,139 @@
+import anthropic
+import httpx
+from django.conf import settings
+import asyncio
+import os
+import threading
+import weakref
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_SETTINGS = {
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 30.0,
+    'CONNECT_TIMEOUT': 5.0,
+    'READ_TIMEOUT': 120.0,
+    'MAX_RETRIES': 2,
+}
+
+
+def get_http_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_HTTP_SETTINGS, **agent_settings.get('HTTP', {})}
+
+
+class ClientRegistry:
+    """
+    Process-wide pool of Anthropic clients.
+
+    One client (and therefore one httpx connection pool) is kept per API key
+    and shared by every agent, request and tenant in the process, so calls
+    reuse warm keep-alive/TLS connections. Sockets must never be shared
+    across a fork, so Celery prefork children start with an empty registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # Called with the lock held
+        if self._pid != os.getpid():
+            self._clients = {}
+            self._async_clients = weakref.WeakKeyDictionary()
+            self._pid = os.getpid()
+
+    def get_client(self, api_key):
+        with self._lock:
+            self._check_pid()
+            client = self._clients.get(api_key)
+            if client is None:
+                client = self._build_client(api_key)
+                self._clients[api_key] = client
+            return client
+
+    def get_async_client(self, api_key):
+        """
+        Async clients hold connections bound to an event loop, so one is
+        kept per (loop, API key) and closed when its loop shuts down.
+        Under ASGI that is the server's loop; under WSGI every
+        async_to_sync call runs its own short-lived loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._check_pid()
+            clients = self._async_clients.setdefault(loop, {})
+            if api_key not in clients:
+                client = self._build_client(api_key, is_async=True)
+                clients[api_key] = (client, close_at_shutdown(client))
+            return clients[api_key][0]
+
+    def _build_client(self, api_key, is_async=False):
+        http = get_http_settings()
+        logger.info(f"Creating pooled Anthropic client (pid {os.getpid()}, async={is_async}, max {http['MAX_CONNECTIONS']} connections)")
+        limits = httpx.Limits(
+            max_connections=http['MAX_CONNECTIONS'],
+            max_keepalive_connections=http['MAX_KEEPALIVE_CONNECTIONS'],
+            keepalive_expiry=http['KEEPALIVE_EXPIRY'],
+        )
+        client_class = anthropic.AsyncAnthropic if is_async else anthropic.Anthropic
+        http_client_class = anthropic.DefaultAsyncHttpxClient if is_async else anthropic.DefaultHttpxClient
+        return client_class(
+            api_key=api_key,
+            max_retries=http['MAX_RETRIES'],
+            timeout=httpx.Timeout(http['READ_TIMEOUT'], connect=http['CONNECT_TIMEOUT']),
+            http_client=http_client_class(limits=limits),
+        )
+
+    def reset(self):
+        """Drop all clients without closing them (used after fork)"""
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+
+
+async def _closing(client):
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+def close_at_shutdown(client):
+    """
+    Close an async client when the running loop shuts down. The returned
+    async generator is parked at its yield and must be kept referenced;
+    loop.shutdown_asyncgens() (run by asyncio.run and asgiref before
+    closing a loop) resumes it, which closes the client on its own loop.
+    """
+    closer = _closing(client)
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+    return closer
+
+
+registry = ClientRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+def get_client(api_key):
+    return registry.get_client(api_key)
+
+
+def get_async_client(api_key):
+    return registry.get_async_client(api_key)
@@ -0,0 +1,340 @@
+"""
+Compensation band index and in-process policy-drift checks.
+
+Salaries of active employees are summarized per (department, position,
+contract type) group into CompensationBand rows (min, P10-P90, max). Employee
+signals recompute the affected groups on commit, so a drift check is one
+indexed lookup and some arithmetic; Claude is only asked to explain the
+result (see ComplianceAgent.check_policy_drift).
+"""
+from django.conf import settings
+from django.db import transaction
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPENSATION_SETTINGS = {
+    'MIN_HEADCOUNT': 3,          # smaller groups have no usable band
+    'MAX_CHANGE_PCT': 15,        # salary changes beyond this are flagged
+    'EXPLAIN': 'drift',          # when Claude explains a single check: 'drift', 'always' or 'never'
+    'BULK_MAX_ROWS': 5000,
+    'BULK_EXPLAIN_LIMIT': 20,    # explained rows per bulk request (explain is 'never' unless asked)
+}
+
+COUNTED_STATUSES = ('active', 'on_leave')
+BAND_POINTS = [(0, 'min_salary'), (10, 'p10'), (25, 'p25'), (50, 'p50'), (75, 'p75'), (90, 'p90'), (100, 'max_salary')]
+CHANGE_FIELDS = ('salary', 'position', 'department', 'contract_type')
+
+
+def get_compensation_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_COMPENSATION_SETTINGS, **agent_settings.get('COMPENSATION', {})}
+
+
+def position_key(position):
+    return " ".join((position or "").split()).lower()
+
+
+def parse_employee_id(value):
+    """employee_id of a request or CSV row as an int; ValueError with a readable message otherwise"""
+    if value is None or str(value).strip() == "":
+        raise ValueError("employee_id is required")
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"employee_id must be an integer, got {value!r}")
+
+
+def group_of(department_id, position, contract_type):
+    return (department_id, position_key(position), contract_type)
+
+
+def percentile(values, pct):
+    """Linear interpolation between closest ranks; values must be sorted"""
+    if len(values) == 1:
+        return values[0]
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def to_decimal(value):
+    return Decimal(str(round(value, 2)))
+
+
+class BandIndex:
+    """Reads and maintains the CompensationBand rows of a tenant"""
+
+    def _employees(self, tenant, group=None):
+        from employees.models import Employee
+
+        employees = Employee.objects.filter(status__in=COUNTED_STATUSES, salary__isnull=False)
+        if group is not None:
+            department_id, position, contract_type = group
+            employees = employees.filter(department_id=department_id, contract_type=contract_type)
+        return employees
+
+    def _band_fields(self, salaries):
+        salaries = sorted(float(salary) for salary in salaries)
+        fields = {name: to_decimal(percentile(salaries, pct)) for pct, name in BAND_POINTS}
+        fields['headcount'] = len(salaries)
+        return fields
+
+    def _lookup(self, tenant, group):
+        from .models import CompensationBand
+
+        department_id, position, contract_type = group
+        return CompensationBand.objects.filter(
+            tenant=tenant, department_id=department_id, position=position, contract_type=contract_type
+        )
+
+    def recompute(self, tenant, group):
+        """Rebuild one group's band from its employees; returns the band or None"""
+        from .models import CompensationBand
+
+        # Positions are free text, so they are matched on their normalized form
+        salaries = [
+            salary for salary, position in self._employees(tenant, group).values_list('salary', 'position')
+            if position_key(position) == group[1]
+        ]
+        if not salaries:
+            self._lookup(tenant, group).delete()
+            return None
+
+        department_id, position, contract_type = group
+        band, _ = CompensationBand.objects.update_or_create(
+            tenant=tenant, department_id=department_id, position=position, contract_type=contract_type,
+            defaults=self._band_fields(salaries)
+        )
+        return band
+
+    def get(self, tenant, group):
+        band = self._lookup(tenant, group).first()
+        if band is None:
+            # Groups that predate the index are built on first use
+            band = self.recompute(tenant, group)
+        return band
+
+    def load(self, tenant):
+        """{group: band} for every band of the tenant (bulk checks)"""
+        from .models import CompensationBand
+
+        return {
+            (band.department_id, band.position, band.contract_type): band
+            for band in CompensationBand.objects.filter(tenant=tenant)
+        }
+
+    def rebuild(self, tenant):
+        """Recompute every band of the tenant; returns the number of bands"""
+        from .models import CompensationBand
+
+        groups = {}
+        for department_id, position, contract_type, salary in self._employees(tenant).values_list(
+            'department_id', 'position', 'contract_type', 'salary'
+        ).iterator(chunk_size=2000):
+            groups.setdefault(group_of(department_id, position, contract_type), []).append(salary)
+
+        bands = [
+            CompensationBand(
+                tenant=tenant, department_id=department_id, position=position, contract_type=contract_type,
+                **self._band_fields(salaries)
+            )
+            for (department_id, position, contract_type), salaries in groups.items()
+        ]
+        with transaction.atomic():
+            CompensationBand.objects.filter(tenant=tenant).delete()
+            CompensationBand.objects.bulk_create(bands, batch_size=500)
+        return len(bands)
+
+
+band_index = BandIndex()
+
+
+def band_summary(band):
+    if band is None:
+        return None
+    summary = {name: float(getattr(band, name)) for _, name in BAND_POINTS}
+    summary['headcount'] = band.headcount
+    return summary
+
+
+def estimate_percentile(band, salary):
+    """Approximate percentile of salary within the band (0-100)"""
+    points = [(pct, float(getattr(band, name))) for pct, name in BAND_POINTS]
+    if salary <= points[0][1]:
+        return 0.0
+    for (low_pct, low), (high_pct, high) in zip(points, points[1:]):
+        if salary <= high:
+            if high == low:
+                return float(high_pct)
+            return round(low_pct + (high_pct - low_pct) * (salary - low) / (high - low), 1)
+    return 100.0
+
+
+class DriftChecker:
+    """
+    Evaluates proposed employee changes against the compensation bands.
+    Bands, departments and employees are looked up once per checker, so a
+    checker can be reused for every row of a bulk request.
+    """
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self.settings = get_compensation_settings()
+        self._bands = None
+        self._departments = None
+        self._employees = {}
+
+    def _band(self, group):
+        if self._bands is None:
+            return band_index.get(self.tenant, group)
+        if group not in self._bands:
+            self._bands[group] = band_index.get(self.tenant, group)
+        return self._bands[group]
+
+    def _department_id(self, value):
+        from departments.models import Department
+
+        if self._departments is None:
+            self._departments = {}
+            for department_id, name in Department.objects.values_list('id', 'name'):
+                self._departments[str(department_id)] = department_id
+                self._departments[name.strip().lower()] = department_id
+        key = str(value).strip().lower()
+        if key not in self._departments:
+            raise ValueError(f"Unknown department {value}")
+        return self._departments[key]
+
+    def prefetch(self, rows):
+        """Load bands and the employees of rows in two queries (bulk checks)"""
+        from employees.models import Employee
+
+        ids = set()
+        for row in rows:
+            try:
+                ids.add(parse_employee_id(row.get("employee_id")))
+            except ValueError:
+                pass
+        self._bands = band_index.load(self.tenant)
+        self._employees.update(Employee.objects.only(
+            'id', 'department_id', 'position', 'contract_type', 'salary'
+        ).in_bulk(ids))
+
+    def _employee(self, employee_id):
+        from employees.models import Employee
+
+        if employee_id not in self._employees:
+            self._employees[employee_id] = Employee.objects.only(
+                'id', 'department_id', 'position', 'contract_type', 'salary'
+            ).filter(id=employee_id).first()
+        return self._employees[employee_id]
+
+    def parse_changes(self, action_data):
+        """
+        Proposed changes of an action: {"field": ..., "new_value": ...},
+        {"changes": {...}} or the fields themselves (CSV rows)
+        """
+        if action_data.get("field"):
+            raw = {action_data["field"]: action_data.get("new_value")}
+        elif isinstance(action_data.get("changes"), dict):
+            raw = action_data["changes"]
+        else:
+            raw = action_data
+
+        changes = {}
+        for field in CHANGE_FIELDS:
+            value = raw.get(field)
+            if value is None or value == "":
+                continue
+            if field == "salary":
+                changes[field] = float(str(value).replace(",", "").strip())
+            elif field == "department":
+                changes[field] = self._department_id(value)
+            else:
+                changes[field] = str(value).strip()
+        if not changes:
+            raise ValueError(f"No change to check; expected one of {', '.join(CHANGE_FIELDS)}")
+        return changes
+
+    def check(self, action_data):
+        """
+        Returns {"employee_id", "changes", "status", "drift", "issues", "salary",
+        "percentile", "band", ...}; status is within_band, below_band,
+        above_band, below_range, above_range, insufficient_data or error.
+        """
+        employee_id = action_data.get("employee_id")
+        result = {"employee_id": employee_id}
+        try:
+            employee = self._employee(parse_employee_id(employee_id))
+            if employee is None:
+                raise ValueError(f"Employee {employee_id} not found")
+            changes = self.parse_changes(action_data)
+        except (TypeError, ValueError) as e:
+            result.update(status="error", drift=False, issues=[str(e)])
+            return result
+
+        department_id = changes.get("department", employee.department_id)
+        position = changes.get("position", employee.position)
+        contract_type = changes.get("contract_type", employee.contract_type)
+        current_salary = float(employee.salary) if employee.salary is not None else None
+        salary = changes.get("salary", current_salary)
+        band = self._band(group_of(department_id, position, contract_type))
+
+        result.update(
+            changes=changes,
+            group={"department_id": department_id, "position": position, "contract_type": contract_type},
+            current_salary=current_salary,
+            salary=salary,
+            band=band_summary(band),
+            percentile=None,
+        )
+        issues = []
+
+        if "salary" in changes and current_salary:
+            change_pct = round((salary - current_salary) * 100 / current_salary, 1)
+            result["change_pct"] = change_pct
+            if change_pct < 0:
+                issues.append(f"Salary decrease of {-change_pct:g}%")
+            elif change_pct > self.settings['MAX_CHANGE_PCT']:
+                issues.append(f"Salary increase of {change_pct:g}% exceeds {self.settings['MAX_CHANGE_PCT']:g}%")
+
+        if salary is None:
+            status = "insufficient_data"
+        elif band is None or band.headcount < self.settings['MIN_HEADCOUNT']:
+            status = "insufficient_data"
+        else:
+            result["percentile"] = estimate_percentile(band, salary)
+            if salary < float(band.min_salary):
+                status = "below_range"
+            elif salary > float(band.max_salary):
+                status = "above_range"
+            elif salary < float(band.p10):
+                status = "below_band"
+            elif salary > float(band.p90):
+                status = "above_band"
+            else:
+                status = "within_band"
+            if status != "within_band":
+                issues.append(
+                    f"Salary {salary:g} is {status.replace('_', ' ')} "
+                    f"(P10 {float(band.p10):g}, median {float(band.p50):g}, P90 {float(band.p90):g}, n={band.headcount})"
+                )
+
+        result.update(status=status, drift=bool(issues), issues=issues)
+        return result
+
+
+def schedule_band_update(tenant, groups):
+    """Recompute the bands of groups once the current transaction commits"""
+    groups = set(groups)
+
+    def update():
+        for group in groups:
+            try:
+                band_index.recompute(tenant, group)
+            except Exception as e:
+                logger.error(f"Failed to update compensation band {group}: {str(e)}")
+
+    transaction.on_commit(update)
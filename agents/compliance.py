@@ -1,10 +1,29 @@
 from .base import BaseAgent
-from django.db import connection
+from .rules import rule_engine
+from .sections import split_sections
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connection, connections
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_AUDIT_SETTINGS = {
+    'SECTION_TOKENS': 2500,      # longer documents are audited section by section
+    'WORKERS': 4,                # sections audited at the same time
+    'BACKGROUND_SECTIONS': 3,    # the API queues audits with more sections than this
+    'LLM_MODE': 'escalations',   # 'escalations', 'always' or 'never' (see ComplianceAgent.audit)
+}
+
+SEVERITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def get_audit_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_AUDIT_SETTINGS, **agent_settings.get('COMPLIANCE_AUDIT', {})}
+
+
 class ComplianceAgent(BaseAgent):
     """
     Internal Auditor and Regulatory Guide.
@@ -48,13 +67,8 @@ AVAILABLE TOOLS:
 """
         return compliance_context
 
-    def audit_document(self, document_text, doc_type="contract"):
-        """
-        Scan a document for compliance issues.
-        """
-        connection.set_tenant(self.tenant)
-        
-        tools = [
+    def get_audit_tools(self):
+        return [
             {
                 "name": "lookup_regulatory_info",
                 "description": "Search Knowledge Base for specific compliance standards/policy required for this doc type",
@@ -71,7 +85,117 @@ AVAILABLE TOOLS:
             }
         ]
 
-        prompt = f"""Please audit the following {doc_type} for compliance issues:
+    def audit(self, document_text, doc_type="contract", progress=None, llm_mode=None):
+        """
+        Audit a document: deterministic rules first (agents/rules.py), then
+        Claude only where needed. llm_mode (default COMPLIANCE_AUDIT['LLM_MODE']):
+        - 'escalations': only passages the rules found ambiguous go to Claude
+        - 'always': Claude also audits the whole document (map-reduce)
+        - 'never': rule findings only
+        
+        Returns {"report", "findings", "escalations", "llm_review"}.
+        progress(done, total) is called as steps finish.
+        """
+        connection.set_tenant(self.tenant)
+        findings, escalations = rule_engine.evaluate(self.tenant, document_text, doc_type)
+        mode = llm_mode or get_audit_settings()['LLM_MODE']
+        
+        llm_review = None
+        if mode == 'always':
+            llm_review = self.llm_audit(document_text, doc_type, progress, known_findings=findings)
+        elif mode == 'escalations' and escalations:
+            llm_review = self.review_escalations(escalations, doc_type)
+        if progress and mode != 'always':
+            progress(1, 1)
+        
+        return {
+            "report": self.format_report(findings, escalations, llm_review),
+            "findings": findings,
+            "escalations": escalations,
+            "llm_review": llm_review,
+        }
+
+    def audit_document(self, document_text, doc_type="contract", progress=None):
+        """Scan a document for compliance issues; returns the report text"""
+        return self.audit(document_text, doc_type, progress)["report"]
+
+    def format_report(self, findings, escalations, llm_review):
+        lines = []
+        if findings:
+            lines.append("AUTOMATIC CHECKS:")
+            for finding in sorted(findings, key=lambda f: SEVERITY_ORDER.get(f["severity"], 3)):
+                line = f"- [{finding['severity'].upper()}] {finding['issue']}"
+                if finding.get("clause"):
+                    line += f' ("{finding["clause"]}")'
+                if finding.get("recommendation"):
+                    line += f" -> {finding['recommendation']}"
+                lines.append(line)
+        elif not escalations and not llm_review:
+            lines.append("AUTOMATIC CHECKS: no issues found.")
+        
+        if escalations and not llm_review:
+            lines.append("\nNEEDS REVIEW:")
+            lines += [f"- {item['issue']} (\"{item['clause']}\")" for item in escalations]
+        if llm_review:
+            lines.append(f"\nREVIEW:\n{llm_review}")
+        return "\n".join(lines)
+
+    def review_escalations(self, escalations, doc_type):
+        """One Claude call judging the passages the rules could not decide"""
+        items = "\n\n".join(
+            f"{i}. {item['issue']}\nPassage: \"{item['clause'] or '(whole document)'}\""
+            for i, item in enumerate(escalations, 1)
+        )
+        prompt = f"""Automatic compliance checks on a {doc_type} flagged these passages as needing judgement:
+
+{items}
+
+For each item, decide whether it is a compliance issue under our policies and applicable labor law,
+give its severity (high/medium/low) and a recommendation. Be brief.
+If you are unsure of the current policy, use the 'lookup_regulatory_info' tool first.
+"""
+        response, tool_calls = self.run_tool_loop(prompt, self.get_audit_tools())
+        return self.extract_text_response(response)
+
+    def llm_audit(self, document_text, doc_type="contract", progress=None, known_findings=None):
+        """
+        Full LLM audit. Documents longer than one section
+        (COMPLIANCE_AUDIT['SECTION_TOKENS']) are split at clause boundaries;
+        sections are audited concurrently (map) and their findings merged
+        into one report (reduce).
+        """
+        audit_settings = get_audit_settings()
+        sections = split_sections(document_text, audit_settings['SECTION_TOKENS'])
+        
+        if len(sections) <= 1:
+            response, tool_calls = self.run_tool_loop(
+                self.build_audit_prompt(document_text, doc_type, known_findings), self.get_audit_tools()
+            )
+            if progress:
+                progress(1, 1)
+            return self.extract_text_response(response)
+        
+        # One step per section plus the reduce step
+        total = len(sections) + 1
+        findings = self.audit_sections(
+            sections, doc_type, lambda done: progress and progress(done, total)
+        )
+        report = self.reduce_findings(sections, findings, doc_type, known_findings)
+        if progress:
+            progress(total, total)
+        return report
+
+    def describe_known_findings(self, known_findings):
+        if not known_findings:
+            return ""
+        issues = "\n".join(f"- {finding['issue']}" for finding in known_findings)
+        return f"""
+Automatic checks already reported these issues (do not repeat them):
+{issues}
+"""
+
+    def build_audit_prompt(self, document_text, doc_type, known_findings=None):
+        return f"""Please audit the following {doc_type} for compliance issues:
 
 --- DOCUMENT START ---
 {document_text}
@@ -83,43 +207,168 @@ Compare this against our standard policies. Look for:
 3. Potential legal risks.
 
 If you are unsure of the current policy, use the 'lookup_regulatory_info' tool first.
+{self.describe_known_findings(known_findings)}"""
+
+    def build_section_prompt(self, section, section_count, doc_type):
+        heading = f' ("{section["heading"]}")' if section["heading"] else ""
+        return f"""You are auditing section {section["index"] + 1} of {section_count}{heading} of a {doc_type}.
+The other sections are audited separately: only report issues visible in this section,
+and do not report a clause as missing just because it is not in this section.
+
+--- SECTION START ---
+{section["text"]}
+--- SECTION END ---
+
+Look for language that contradicts our company policy and potential legal risks.
+If you are unsure of the current policy, use the 'lookup_regulatory_info' tool first.
+
+Answer with a JSON array only, one object per finding:
+[{{"issue": "...", "severity": "high|medium|low", "clause": "short quote or clause heading", "recommendation": "..."}}]
+Answer [] if the section has no issues.
 """
+
+    def audit_sections(self, sections, doc_type, on_section_done=None):
+        """Map step: audit sections in a bounded thread pool, returns findings in section order"""
+        def audit(section):
+            try:
+                connection.set_tenant(self.tenant)
+                response, tool_calls = self.run_tool_loop(
+                    self.build_section_prompt(section, len(sections), doc_type), self.get_audit_tools()
+                )
+                return self.parse_findings(self.extract_text_response(response), section)
+            except Exception as e:
+                logger.error(f"Audit of section {section['index'] + 1} failed: {str(e)}")
+                return [{"section": section["index"] + 1, "heading": section["heading"],
+                         "issue": f"Section could not be audited: {str(e)}", "severity": "unknown"}]
+            finally:
+                connections.close_all()
+        
+        results = {}
+        workers = min(get_audit_settings()['WORKERS'], len(sections))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(audit, section): section["index"] for section in sections}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_section_done:
+                    on_section_done(len(results))
         
-        response = self.call_claude(prompt, tools=tools)
-        return self._process_response_with_tools(response)
+        return [finding for index in sorted(results) for finding in results[index]]
+
+    def parse_findings(self, text, section):
+        """JSON findings of one section (free text becomes a single finding)"""
+        findings = None
+        start, end = text.find("["), text.rfind("]")
+        if start != -1 and end > start:
+            try:
+                findings = json.loads(text[start:end + 1])
+            except ValueError:
+                findings = None
+        if not isinstance(findings, list):
+            findings = [{"issue": text.strip(), "severity": "unknown"}] if text.strip() else []
+        
+        return [
+            {"section": section["index"] + 1, "heading": section["heading"],
+             **(finding if isinstance(finding, dict) else {"issue": str(finding)})}
+            for finding in findings
+        ]
+
+    def reduce_findings(self, sections, findings, doc_type, known_findings=None):
+        """Reduce step: merge section findings into one report"""
+        outline = "\n".join(
+            f"{section['index'] + 1}. {section['heading'] or '(untitled)'}" for section in sections
+        )
+        prompt = f"""A {doc_type} was audited section by section. Merge the results into one compliance report.
+
+DOCUMENT OUTLINE (section headings):
+{outline}
+
+SECTION FINDINGS (JSON):
+{json.dumps(findings, indent=2)}
+
+In the report:
+1. Merge duplicate findings and order them by severity.
+2. Using the outline, list mandatory clauses that are missing from the whole document.
+3. Summarize the overall risk in two or three sentences.
 
-    def check_policy_drift(self, action_data):
+If you are unsure of the current policy, use the 'lookup_regulatory_info' tool first.
+{self.describe_known_findings(known_findings)}"""
+        response, tool_calls = self.run_tool_loop(prompt, self.get_audit_tools())
+        return self.extract_text_response(response)
+
+    def check_policy_drift(self, action_data, explain=None, checker=None):
         """
         Check if an action (e.g. salary change, role change) deviates from policy.
         action_data: dict e.g. {"employee_id": 1, "field": "salary", "new_value": 50000}
+        
+        The check itself runs against the compensation band index
+        (agents/compensation.py); Claude only writes the explanation.
+        explain (default COMPENSATION['EXPLAIN']): 'drift', 'always' or 'never'.
+        """
+        from .compensation import DriftChecker, get_compensation_settings
+        
+        connection.set_tenant(self.tenant)
+        result = (checker or DriftChecker(self.tenant)).check(action_data)
+        
+        explain = explain or get_compensation_settings()['EXPLAIN']
+        result["explanation"] = None
+        if result["status"] != "error" and (explain == 'always' or (explain == 'drift' and result["drift"])):
+            result["explanation"] = self.explain_drift(action_data, result)
+        return result
+
+    def check_policy_drift_bulk(self, rows, explain='never'):
+        """
+        Drift checks for many proposed changes (e.g. rows of a CSV).
+        Bands and employees are loaded once. explain takes the modes of
+        check_policy_drift but defaults to 'never'; Claude explains at most
+        COMPENSATION['BULK_EXPLAIN_LIMIT'] rows.
         """
+        from .compensation import DriftChecker, get_compensation_settings
+        
         connection.set_tenant(self.tenant)
+        compensation_settings = get_compensation_settings()
+        checker = DriftChecker(self.tenant)
+        checker.prefetch(rows)
+        
+        results, counts = [], {}
+        explained = 0
+        for index, row in enumerate(rows):
+            row_explain = explain if explained < compensation_settings['BULK_EXPLAIN_LIMIT'] else 'never'
+            result = self.check_policy_drift(row, explain=row_explain, checker=checker)
+            if result["explanation"]:
+                explained += 1
+            result["row"] = index + 1
+            results.append(result)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
         
+        return {
+            "total": len(results),
+            "flagged": sum(1 for result in results if result["drift"]),
+            "counts": counts,
+            "results": results,
+        }
+
+    def explain_drift(self, action_data, result):
+        facts = {key: result.get(key) for key in (
+            "changes", "group", "current_salary", "salary", "change_pct", "band", "percentile", "status", "issues"
+        )}
         prompt = f"""
-Perform a 'Policy Drift' check for the following action:
-{json.dumps(action_data, indent=2)}
+A 'Policy Drift' check was run for the following action:
+{json.dumps(action_data, indent=2, default=str)}
 
-Cross-reference with company policy/compensation bands in the Knowledge Base to see if this is compliant.
-"""
-        response = self.call_claude(prompt)
-        return self.extract_text_response(response)
+Result, computed from the company's current salaries for the same department, position and contract type:
+{json.dumps(facts, indent=2, default=str)}
 
-    def _process_response_with_tools(self, response):
-        """Helper to handle tool calls in response"""
-        answer = self.extract_text_response(response)
-        
-        if not self.mock_mode:
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_result = self.execute_tool(block.name, block.input)
-                    
-                    # Follow up with tool results
-                    follow_up = self.call_claude(
-                        f"Tool result for {block.name}: {json.dumps(tool_result)}\n\nPlease provide final audit findings."
-                    )
-                    answer = self.extract_text_response(follow_up)
-        
-        return answer
+The numbers above are final; do not recompute them. In a few sentences, explain
+what the result means for this action, whether it is compliant, and what HR should do.
+If the compensation policy in the Knowledge Base matters here, use the
+'lookup_regulatory_info' tool.
+"""
+        try:
+            response, tool_calls = self.run_tool_loop(prompt, self.get_audit_tools())
+            return self.extract_text_response(response)
+        except Exception as e:
+            logger.error(f"Drift explanation failed: {str(e)}")
+            return None
 
     def execute_tool(self, tool_name, tool_input):
         """Execute compliance tools"""
@@ -0,0 +1,108 @@
+from django.conf import settings
+from functools import lru_cache
+import json
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    import tiktoken
+    # Claude's tokenizer is not public; cl100k_base is a close enough estimate
+    # for budgeting
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(content):
+    """Approximate token count of a message content (text or content blocks)"""
+    if not content:
+        return 0
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    return len(get_encoding().encode(content, disallowed_special=()))
+
+
+def get_window_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {
+        'TOKEN_BUDGET': 3000,
+        'SUMMARY_MAX_TOKENS': 600,
+        **agent_settings.get('HISTORY_WINDOW', {}),
+    }
+
+
+class ConversationWindow:
+    """
+    Picks the part of a conversation that is sent with a new question.
+
+    The newest exchanges are kept whole while they fit in the token budget
+    (token counts are stored per message at insert time, so nothing is
+    re-tokenized). Everything older is represented by the conversation's
+    rolling summary; when exchanges fall out of the window but are not yet
+    summarized, the summary is refreshed in the background.
+    """
+
+    def __init__(self, budget_tokens=None):
+        self.budget_tokens = budget_tokens or get_window_settings()['TOKEN_BUDGET']
+
+    def build(self, conversation):
+        """
+        Returns (messages, summarize_through_turn). The second value is the
+        last turn that fell out of the window without being summarized yet,
+        or None when the summary is up to date.
+        """
+        budget = self.budget_tokens - count_tokens(conversation.summary)
+
+        rows = conversation.message_rows.filter(
+            turn__gt=conversation.summary_through_turn
+        ).order_by('-turn', '-id').values('turn', 'role', 'content', 'token_count')
+
+        turns = []
+        current_turn, current_messages, current_tokens = None, [], 0
+        oldest_kept = conversation.turn_count + 1
+        for row in rows.iterator(chunk_size=50):
+            if row['turn'] != current_turn:
+                if current_turn is not None:
+                    if current_tokens > budget:
+                        break
+                    budget -= current_tokens
+                    turns.append(current_messages)
+                    oldest_kept = current_turn
+                current_turn, current_messages, current_tokens = row['turn'], [], 0
+            current_messages.insert(0, {"role": row['role'], "content": row['content']})
+            current_tokens += row['token_count']
+        else:
+            if current_turn is not None and current_tokens <= budget:
+                turns.append(current_messages)
+                oldest_kept = current_turn
+
+        messages = []
+        if conversation.summary:
+            messages += [
+                {"role": "user", "content": f"Summary of our earlier conversation:\n{conversation.summary}"},
+                {"role": "assistant", "content": "Thanks, I have the context of our earlier conversation."},
+            ]
+        for turn_messages in reversed(turns):
+            messages += turn_messages
+
+        summarize_through = oldest_kept - 1
+        if summarize_through > conversation.summary_through_turn:
+            return messages, summarize_through
+        return messages, None
+
+
+def build_summary_prompt(previous_summary, messages):
+    transcript = "\n".join(
+        f"{message['role'].upper()}: {message['content'] if isinstance(message['content'], str) else json.dumps(message['content'])}"
+        for message in messages
+    )
+    return f"""Update the running summary of an HR support conversation.
+
+PREVIOUS SUMMARY:
+{previous_summary or "(none)"}
+
+NEW MESSAGES:
+{transcript}
+
+Write a concise summary (at most a few short paragraphs) that keeps every fact,
+decision, open question and number the employee or the agent mentioned.
+Return only the summary text.
+"""
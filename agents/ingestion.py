@@ -0,0 +1,123 @@
+"""
+Background ingestion of knowledge base files.
+
+PDFs are read in page ranges, in a process pool when the current process
+may have children (Celery prefork children are daemonic and may not, so
+they extract the ranges one after another). Each worker opens the file
+itself and returns only the text of its range, so a multi-hundred-page PDF
+is never held as one parsed object plus a growing string. Files whose
+sha256 matches the stored content_hash are skipped.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+import hashlib
+import multiprocessing
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGESTION_SETTINGS = {
+    'PAGES_PER_TASK': 20,
+    'WORKERS': 4,
+}
+
+
+def get_ingestion_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_INGESTION_SETTINGS, **agent_settings.get('INGESTION', {})}
+
+
+def file_sha256(source):
+    """sha256 of a path or of an uploaded file (read in chunks)"""
+    digest = hashlib.sha256()
+    if hasattr(source, 'chunks'):
+        for block in source.chunks():
+            digest.update(block)
+        source.seek(0)
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_page_range(path, start, stop):
+    """Text of pages [start, stop) - runs in a pool process"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    return "\n".join(reader.pages[i].extract_text() or "" for i in range(start, stop))
+
+
+def extract_pdf(path):
+    """Returns (text, page_count)"""
+    from PyPDF2 import PdfReader
+
+    page_count = len(PdfReader(path).pages)
+    ingestion_settings = get_ingestion_settings()
+    step = ingestion_settings['PAGES_PER_TASK']
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    if len(ranges) > 1 and not multiprocessing.current_process().daemon:
+        workers = min(ingestion_settings['WORKERS'], len(ranges))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(
+                extract_page_range,
+                [path] * len(ranges),
+                [start for start, stop in ranges],
+                [stop for start, stop in ranges],
+            ))
+    else:
+        parts = [extract_page_range(path, start, stop) for start, stop in ranges]
+
+    return "\n".join(parts), page_count
+
+
+def extract_text(path):
+    """Returns (text, page_count or None)"""
+    if os.path.splitext(path)[1].lower() == '.pdf':
+        return extract_pdf(path)
+    # Treat as plain text
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read(), None
+
+
+def ingest_file(tenant, document_id, path=None, force=False):
+    """
+    Extract a KnowledgeBase document's file, store the text and index its
+    passages. path defaults to the document's source_file.
+    Returns the final ingest_status, or 'skipped' when the file is unchanged.
+    """
+    from .models import KnowledgeBase
+    from .passage_index import index_document
+
+    connection.set_tenant(tenant)
+    document = KnowledgeBase.objects.select_related('tenant').get(id=document_id, tenant=tenant)
+    path = path or document.source_file.path
+
+    try:
+        content_hash = file_sha256(path)
+        if not force and content_hash == document.content_hash and document.ingested_at:
+            KnowledgeBase.objects.filter(id=document.id).update(ingest_status='ready', ingest_error='')
+            logger.info(f"Skipping unchanged file for document {document.id}")
+            return 'skipped'
+
+        KnowledgeBase.objects.filter(id=document.id).update(ingest_status='processing', ingest_error='')
+        content, page_count = extract_text(path)
+
+        document.content = content
+        document.content_hash = content_hash
+        document.page_count = page_count
+        document.ingest_status = 'ready'
+        document.ingest_error = ''
+        document.ingested_at = timezone.now()
+        document.save()
+        index_document(document)
+        return 'ready'
+    except Exception as e:
+        logger.error(f"Failed to ingest document {document.id}: {str(e)}")
+        KnowledgeBase.objects.filter(id=document.id).update(ingest_status='failed', ingest_error=str(e))
+        return 'failed'
@@ -1,4 +1,6 @@
 from .base import BaseAgent
+from .async_base import AsyncBaseAgent
+from .caching import search_cache
 from django.db import connection
 import logging
 
@@ -28,38 +30,31 @@ TONE:
 Factual, precise, and objective. If information is missing from the documents, state that you do not know.
 """
 
-    def search_knowledge(self, query):
-        """Perform keyword search over the KnowledgeBase"""
-        from .models import KnowledgeBase
-        from django.db.models import Q
+    def search_knowledge(self, query, limit=5):
+        """
+        Perform full-text search over the KnowledgeBase.
+        Results are cached per tenant and normalized query until the
+        knowledge base changes.
+        """
+        cache_key, cached = search_cache.get(self.tenant.schema_name, query, [limit, self.mock_mode])
+        if cached is not None:
+            cached["query"] = query
+            return cached
         
-        # Simple keyword search across content and title
-        results = KnowledgeBase.objects.filter(
-            tenant=self.tenant,
-            is_active=True
-        ).filter(
-            Q(content__icontains=query) | Q(title__icontains=query)
-        )[:5]
+        result = self._search_knowledge(query, limit)
+        search_cache.set(cache_key, result)
+        return result
+    
+    def _search_knowledge(self, query, limit):
+        formatted_results, context_text = self._find_documents(query, limit)
         
-        if not results.exists():
+        if not formatted_results:
             return {
                 "query": query,
                 "results": [],
                 "summary": "No documents found matching your query in the company knowledge base."
             }
 
-        formatted_results = []
-        context_text = ""
-        for res in results:
-            # Create a snippet from content
-            snippet = res.content[:200] + "..." if len(res.content) > 200 else res.content
-            formatted_results.append({
-                "title": res.title,
-                "snippet": snippet,
-                "relevance": 1.0 # Simple match
-            })
-            context_text += f"\nDocument: {res.title}\nContent: {res.content[:1000]}\n"
-
         if self.mock_mode:
             return {
                 "query": query,
@@ -68,7 +63,78 @@ Factual, precise, and objective. If information is missing from the documents, s
             }
             
         # Real Claude call with extracted context
-        prompt = f"""
+        response = self.call_claude(self.build_search_prompt(query, context_text), cache=True)
+        return {
+            "query": query,
+            "results": formatted_results,
+            "summary": self.extract_text_response(response)
+        }
+
+    def _find_documents(self, query, limit=5):
+        """
+        Returns (formatted results, context for the prompt). Indexed documents
+        come first, ranked by their best passage's hybrid score; documents
+        not split into passages yet (still ingesting, or never indexed) fill
+        the remaining places by full-text rank. The two scores are on
+        different scales, so the tiers are never sorted together. The
+        context only holds the returned documents.
+        """
+        from .search import hybrid_search
+        
+        formatted_results = []
+        passages = {}  # document id -> context of its passages
+        for passage in hybrid_search(self.tenant, query):
+            chunk = passage["chunk"]
+            if chunk.document_id not in passages:
+                if len(passages) >= limit:
+                    continue
+                passages[chunk.document_id] = ""
+                formatted_results.append({
+                    "id": chunk.document_id,
+                    "title": chunk.document.title,
+                    "snippet": self._snippet(chunk, chunk.text),
+                    "relevance": round(passage["score"], 4)
+                })
+            passages[chunk.document_id] += f"\nDocument: {chunk.document.title} (passage {chunk.position + 1})\nContent: {chunk.text}\n"
+        context_text = "".join(passages.values())
+        
+        if len(formatted_results) < limit:
+            unindexed, unindexed_context = self._find_whole_documents(
+                query, limit - len(formatted_results), unindexed_only=True
+            )
+            formatted_results += unindexed
+            context_text += unindexed_context
+        return formatted_results, context_text
+    
+    def _find_whole_documents(self, query, limit=5, unindexed_only=False):
+        from .search import search_documents
+        
+        # Full-text search, ranked (title matches weigh more than body matches);
+        # snippets and excerpts are cut in the database, content is not loaded
+        results = search_documents(self.tenant, query, limit=limit, excerpts=True, unindexed_only=unindexed_only)
+
+        formatted_results = []
+        context_text = ""
+        for res in results:
+            formatted_results.append({
+                "id": res.id,
+                "title": res.title,
+                "snippet": res.snippet,
+                "relevance": round(res.rank, 4)
+            })
+            context_text += f"\nDocument: {res.title}\nExcerpts: {res.excerpt}\n"
+        
+        return formatted_results, context_text
+    
+    def _snippet(self, obj, text):
+        """Highlighted snippet when the query had searchable terms, else the start of text"""
+        snippet = getattr(obj, 'snippet', None)
+        if snippet:
+            return snippet
+        return text[:200] + "..." if len(text) > 200 else text
+
+    def build_search_prompt(self, query, context_text):
+        return f"""
 Using the following company documents, answer the user's question.
 If the information is not present, say you don't know based on the documents.
 
@@ -77,33 +143,45 @@ DOCUMENTS:
 
 USER QUESTION: {query}
 """
-        return self.call_claude(prompt)
 
-    def ingest_document(self, file_path, title, category="General"):
-        """Extracts text from a file and saves to KnowledgeBase"""
+    def ingest_document(self, source, title, category="General", force=False):
+        """
+        Register a file for ingestion and queue its extraction.
+        source is a path on disk or an uploaded file (kept in source_file).
+        Returns at once; the document's ingest_status tracks progress.
+        """
+        from .ingestion import file_sha256
         from .models import KnowledgeBase
+        from .tasks import ingest_knowledge_document
+        from django.db import transaction
         import os
         
-        content = ""
-        ext = os.path.splitext(file_path)[1].lower()
-        
         try:
-            if ext == '.pdf':
-                from PyPDF2 import PdfReader
-                reader = PdfReader(file_path)
-                for page in reader.pages:
-                    content += page.extract_text() + "\n"
+            content_hash = file_sha256(source)
+            document = KnowledgeBase.objects.filter(tenant=self.tenant, title=title).first()
+            
+            if (document and not force and document.ingested_at
+                    and document.content_hash == content_hash and document.ingest_status == 'ready'):
+                return {"success": True, "title": title, "document_id": document.id, "created": False, "status": "skipped"}
+            
+            created = document is None
+            if created:
+                document = KnowledgeBase(tenant=self.tenant, title=title, content="")
+            document.category = category
+            document.ingest_status = 'pending'
+            document.ingest_error = ''
+            
+            file_path = None
+            if hasattr(source, 'chunks'):
+                document.source_file.save(os.path.basename(source.name), source, save=False)
             else:
-                # Treat as plain text
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                file_path = source
+            document.save()
             
-            kb_entry, created = KnowledgeBase.objects.update_or_create(
-                tenant=self.tenant,
-                title=title,
-                defaults={'content': content, 'category': category}
-            )
-            return {"success": True, "title": title, "created": created}
+            transaction.on_commit(lambda: ingest_knowledge_document.delay(
+                self.tenant.id, document.id, file_path, force
+            ))
+            return {"success": True, "title": title, "document_id": document.id, "created": created, "status": "pending"}
         except Exception as e:
             logger.error(f"Failed to ingest document {title}: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -119,4 +197,44 @@ USER QUESTION: {query}
             }
         
         prompt = f"Summarize the document with ID {doc_id}."
-        return self.call_claude(prompt)
+        return self.call_claude(prompt, cache=True)
+
+
+class AsyncKnowledgeAgent(AsyncBaseAgent, KnowledgeAgent):
+    """KnowledgeAgent on the async runtime (used by the ASGI endpoints)"""
+
+    async def search_knowledge(self, query, limit=5):
+        cache_key, cached = await self.run_sync(
+            search_cache.get, self.tenant.schema_name, query, [limit, self.mock_mode]
+        )
+        if cached is not None:
+            cached["query"] = query
+            return cached
+        
+        result = await self._search_knowledge(query, limit)
+        await self.run_sync(search_cache.set, cache_key, result)
+        return result
+    
+    async def _search_knowledge(self, query, limit):
+        formatted_results, context_text = await self.run_sync(self._find_documents, query, limit)
+        
+        if not formatted_results:
+            return {
+                "query": query,
+                "results": [],
+                "summary": "No documents found matching your query in the company knowledge base."
+            }
+
+        if self.mock_mode:
+            return {
+                "query": query,
+                "results": formatted_results,
+                "summary": f"Found {len(formatted_results)} relevant documents. Summarizing based on match..."
+            }
+
+        response = await self.acall_claude(self.build_search_prompt(query, context_text), cache=True)
+        return {
+            "query": query,
+            "results": formatted_results,
+            "summary": self.extract_text_response(response)
+        }
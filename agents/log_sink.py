@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.db import connection, close_old_connections
+from django.utils import timezone
+import atexit
+import json
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_SINK_SETTINGS = {
+    'ENABLED': True,
+    'BATCH_SIZE': 200,       # flush as soon as this many entries are buffered
+    'FLUSH_INTERVAL': 2.0,   # seconds between background flushes
+    'MAX_BUFFER': 20000,     # beyond this, entries go straight to the spool
+    'SPOOL_DIR': os.path.join(settings.BASE_DIR, 'var', 'agent_log_spool'),
+}
+
+
+def get_log_sink_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_LOG_SINK_SETTINGS, **agent_settings.get('LOG_SINK', {})}
+
+
+class AgentLogSink:
+    """
+    Buffered writer for AgentLog rows.
+
+    Agents hand entries to emit() and return immediately; a daemon thread
+    writes them per tenant with bulk_create when a batch fills up or the
+    flush interval elapses. Whatever cannot be written (DB down, process
+    exiting) is appended to a JSONL spool file that
+    `manage.py replay_agent_log_spool` loads later, so no audit entry is lost.
+    """
+
+    def __init__(self):
+        self._flush_hooks = []
+        self._after_fork()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        # Request threads (on overflow) and the flush thread both append to the spool file
+        self._spool_lock = threading.Lock()
+        self._reset_locked()
+
+    def add_flush_hook(self, hook):
+        """Register a callable run by the flush thread after each flush"""
+        self._flush_hooks.append(hook)
+
+    def emit(self, tenant, **fields):
+        from .models import AgentLog
+
+        sink_settings = get_log_sink_settings()
+        fields.setdefault('created_at', timezone.now())
+
+        if not sink_settings['ENABLED']:
+            connection.set_tenant(tenant)
+            AgentLog.objects.create(tenant=tenant, **fields)
+            return
+
+        entry = AgentLog(tenant=tenant, **fields)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child (Celery prefork): parent's buffer and thread are not ours
+                self._reset_locked()
+            if self._pending >= sink_settings['MAX_BUFFER']:
+                overflow = True
+            else:
+                overflow = False
+                self._buffers.setdefault(tenant.schema_name, (tenant, []))[1].append(entry)
+                self._pending += 1
+            self._ensure_thread()
+            if self._pending >= sink_settings['BATCH_SIZE']:
+                self._wakeup.set()
+
+        if overflow:
+            logger.warning("AgentLog buffer full, spooling entry to disk")
+            self._spool({tenant.schema_name: (tenant, [entry])})
+
+    def _reset_locked(self):
+        self._buffers = {}  # schema_name -> (tenant, [AgentLog])
+        self._pending = 0
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def _ensure_thread(self):
+        # Called with the lock held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="agent-log-sink", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(get_log_sink_settings()['FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"AgentLog flush failed: {str(e)}")
+
+    def _take(self):
+        with self._lock:
+            buffers = self._buffers
+            self._buffers = {}
+            self._pending = 0
+        return buffers
+
+    def flush(self):
+        """Write all buffered entries now (falls back to the spool on error)"""
+        from .models import AgentLog
+
+        buffers = self._take()
+        if buffers:
+            close_old_connections()
+            batch_size = get_log_sink_settings()['BATCH_SIZE']
+            for schema_name, (tenant, entries) in buffers.items():
+                try:
+                    connection.set_tenant(tenant)
+                    AgentLog.objects.bulk_create(entries, batch_size=batch_size)
+                except Exception as e:
+                    logger.error(f"Could not write {len(entries)} AgentLog entries for {schema_name}: {str(e)}")
+                    self._spool({schema_name: (tenant, entries)})
+
+        for hook in self._flush_hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"AgentLog flush hook failed: {str(e)}")
+
+    def _spool(self, buffers):
+        lines = []
+        for schema_name, (tenant, entries) in buffers.items():
+            for entry in entries:
+                lines.append(json.dumps({
+                    "schema_name": schema_name,
+                    "agent_type": entry.agent_type,
+                    "action": entry.action,
+                    "prompt": entry.prompt,
+                    "response": entry.response,
+                    "metadata": entry.metadata,
+                    "created_at": entry.created_at.isoformat(),
+                }, default=str) + "\n")
+        if not lines:
+            return
+
+        spool_dir = get_log_sink_settings()['SPOOL_DIR']
+        os.makedirs(spool_dir, exist_ok=True)
+        path = os.path.join(spool_dir, f"agentlog-{os.getpid()}.jsonl")
+        with self._spool_lock, open(path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+    def shutdown(self):
+        """Final flush on process exit; anything left over is spooled"""
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"AgentLog shutdown flush failed: {str(e)}")
+            self._spool(self._take())
+
+
+log_sink = AgentLogSink()
+atexit.register(log_sink.shutdown)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=log_sink._after_fork)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tenants.models import Client
+from agents import partitions
+import os
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly AgentLog partitions and archive partitions older "
+        "than each tenant's retention (AgentConfig.agent_settings['log_retention_days']) "
+        "to compressed JSONL before dropping them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help="Only process this tenant schema")
+        parser.add_argument('--months-ahead', type=int, default=2)
+        parser.add_argument('--archive-dir', help="Defaults to AGENT_SETTINGS['LOG_ARCHIVE_DIR']")
+        parser.add_argument('--dry-run', action='store_true', help="Report expired partitions without archiving")
+
+    def handle(self, *args, **options):
+        archive_root = options['archive_dir'] or getattr(settings, 'AGENT_SETTINGS', {}).get(
+            'LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'var', 'agent_log_archive')
+        )
+
+        tenants = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            tenants = tenants.filter(schema_name=options['schema'])
+
+        for tenant in tenants:
+            connection.set_tenant(tenant)
+
+            created = partitions.ensure_partitions(months_ahead=options['months_ahead'])
+            for name in created:
+                self.stdout.write(f"[{tenant.schema_name}] created partition {name}")
+
+            retention_days = partitions.get_retention_days(tenant)
+            for name, start, end in partitions.expired_partitions(retention_days):
+                if options['dry_run']:
+                    self.stdout.write(f"[{tenant.schema_name}] would archive {name} ({start} - {end})")
+                    continue
+
+                path, rows = partitions.archive_partition(name, os.path.join(archive_root, tenant.schema_name))
+                partitions.drop_partition(name)
+                self.stdout.write(self.style.SUCCESS(
+                    f"[{tenant.schema_name}] archived {rows} rows from {name} to {path}"
+                ))
+
+        connection.set_schema_to_public()
@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from tenants.models import Client
+from agents.caching import search_cache
+from agents.models import KnowledgeBase
+from agents.search import search_documents
+import random
+import statistics
+import time
+
+BENCHMARK_CATEGORY = 'Benchmark'
+
+VOCABULARY = (
+    "policy leave vacation remote work benefits insurance payroll overtime contract "
+    "employee manager department training onboarding security password laptop expense "
+    "travel reimbursement holiday parental sick compliance audit retention salary bonus "
+    "pension equipment office hybrid schedule review promotion probation termination notice"
+).split()
+
+DEFAULT_QUERIES = [
+    'remote work',
+    '"parental leave"',
+    'expense OR reimbursement',
+    'security -laptop',
+    'reimburs*',
+    'onboarding training manager',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure KnowledgeBase search latency on a tenant: full-text search "
+        "(GIN index) against the old icontains scan, on synthetic documents"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('schema', help="Tenant schema to benchmark in")
+        parser.add_argument('--documents', type=int, default=10000, help="Synthetic documents to create")
+        parser.add_argument('--words', type=int, default=400, help="Words per synthetic document")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per query")
+        parser.add_argument('--query', action='append', dest='queries', help="Query to run (repeatable)")
+        parser.add_argument('--skip-scan', action='store_true', help="Do not time the icontains baseline")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic documents afterwards")
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Client.objects.get(schema_name=options['schema'])
+        except Client.DoesNotExist:
+            raise CommandError(f"Unknown tenant schema: {options['schema']}")
+        connection.set_tenant(tenant)
+
+        try:
+            self.create_documents(tenant, options['documents'], options['words'])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE agents_knowledgebase")
+
+            total = KnowledgeBase.objects.filter(tenant=tenant, is_active=True).count()
+            self.stdout.write(f"[{tenant.schema_name}] {total} active documents, {options['repeat']} runs per query\n")
+
+            for query in options['queries'] or DEFAULT_QUERIES:
+                fts = self.time_it(lambda: list(search_documents(tenant, query)), options['repeat'])
+                line = f"{query!r:32} fts p50={fts[0]:7.2f}ms p95={fts[1]:7.2f}ms"
+                if not options['skip_scan']:
+                    term = query.strip('"*-').split()[0]
+                    scan = self.time_it(lambda: list(
+                        KnowledgeBase.objects.filter(tenant=tenant, is_active=True).filter(
+                            Q(content__icontains=term) | Q(title__icontains=term)
+                        )[:5]
+                    ), options['repeat'])
+                    line += f" | icontains({term}) p50={scan[0]:7.2f}ms p95={scan[1]:7.2f}ms"
+                self.stdout.write(line)
+        finally:
+            if not options['keep']:
+                deleted, _ = KnowledgeBase.objects.filter(
+                    tenant=tenant, category=BENCHMARK_CATEGORY, title__startswith='[bench] '
+                ).delete()
+                self.stdout.write(f"\nRemoved {deleted} synthetic documents")
+            connection.set_schema_to_public()
+
+    def create_documents(self, tenant, count, words):
+        rng = random.Random(42)
+        batch = []
+        for i in range(count):
+            batch.append(KnowledgeBase(
+                tenant=tenant,
+                title=f"[bench] {' '.join(rng.choices(VOCABULARY, k=4)).title()} {i}",
+                content=' '.join(rng.choices(VOCABULARY, k=words)),
+                category=BENCHMARK_CATEGORY,
+            ))
+            if len(batch) >= 1000:
+                KnowledgeBase.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            KnowledgeBase.objects.bulk_create(batch)
+        # bulk_create sends no signals
+        search_cache.invalidate(tenant.schema_name)
+        self.stdout.write(f"Created {count} synthetic documents")
+
+    def time_it(self, func, repeat):
+        """(p50, p95) in milliseconds"""
+        func()  # warm up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tenants.models import Client
+from agents.models import KnowledgeBase
+from agents.passage_index import index_document
+
+
+class Command(BaseCommand):
+    help = "Split KnowledgeBase documents into passages and compute their term vectors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help="Only process this tenant schema")
+        parser.add_argument('--missing', action='store_true', help="Only documents without passages yet")
+
+    def handle(self, *args, **options):
+        tenants = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            tenants = tenants.filter(schema_name=options['schema'])
+
+        for tenant in tenants:
+            connection.set_tenant(tenant)
+
+            documents = KnowledgeBase.objects.filter(tenant=tenant).select_related('tenant').order_by('id')
+            if options['missing']:
+                documents = documents.filter(chunks__isnull=True)
+
+            count = chunks = 0
+            for document in documents.iterator(chunk_size=100):
+                chunks += index_document(document)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"[{tenant.schema_name}] indexed {count} documents into {chunks} passages"
+            ))
+
+        connection.set_schema_to_public()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tenants.models import Client
+from agents.compensation import band_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the compensation bands used by policy-drift checks (e.g. after bulk salary updates)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help="Only process this tenant schema")
+
+    def handle(self, *args, **options):
+        tenants = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            tenants = tenants.filter(schema_name=options['schema'])
+
+        for tenant in tenants:
+            connection.set_tenant(tenant)
+            count = band_index.rebuild(tenant)
+            self.stdout.write(self.style.SUCCESS(f"[{tenant.schema_name}] rebuilt {count} compensation bands"))
+
+        connection.set_schema_to_public()
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from tenants.models import Client
+from agents.log_sink import get_log_sink_settings
+from agents.models import AgentLog
+import glob
+import json
+import os
+
+
+class Command(BaseCommand):
+    help = "Write AgentLog entries spooled to disk by the log sink back to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        spool_dir = get_log_sink_settings()['SPOOL_DIR']
+        self.batch_size = options['batch_size']
+        self.tenants = {}
+
+        # Files claimed by an earlier run that did not finish come first
+        leftovers = sorted(glob.glob(os.path.join(spool_dir, 'agentlog-*.jsonl.replaying')))
+        for claimed in leftovers:
+            self._replay(claimed)
+
+        for path in sorted(glob.glob(os.path.join(spool_dir, 'agentlog-*.jsonl'))):
+            claimed = f"{path}.replaying"
+            if os.path.exists(claimed):
+                # An unfinished replay of the same name; retry it on the next run
+                continue
+            # Claim the file first so a live sink starts a fresh one
+            os.rename(path, claimed)
+            self._replay(claimed)
+
+    def _replay(self, claimed):
+        name = os.path.basename(claimed)
+        entries, rejected = self._read(claimed)
+
+        # One transaction per file: a failed replay leaves the file claimed
+        # and writes nothing, so the next run can replay it without duplicates
+        try:
+            with transaction.atomic():
+                written = 0
+                for tenant, batch in entries:
+                    connection.set_tenant(tenant)
+                    AgentLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                    written += len(batch)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Replaying {name} failed, will retry on the next run: {str(e)}"))
+            return
+        finally:
+            connection.set_schema_to_public()
+
+        if rejected:
+            with open(f"{claimed[:-len('.replaying')]}.rejected", 'a', encoding='utf-8') as f:
+                f.writelines(rejected)
+            self.stderr.write(self.style.WARNING(f"Kept {len(rejected)} unreadable entries of {name} in a .rejected file"))
+        os.remove(claimed)
+        self.stdout.write(self.style.SUCCESS(f"Replayed {written} entries from {name}"))
+
+    def _read(self, path):
+        """([(tenant, [AgentLog])], rejected lines); bad lines and unknown tenants are set aside"""
+        batches, rejected = {}, []
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    schema_name = data.pop('schema_name')
+                    tenant = self._tenant(schema_name)
+                    if tenant is None:
+                        raise ValueError(f"unknown tenant {schema_name}")
+                    data['created_at'] = parse_datetime(data['created_at'])
+                    entry = AgentLog(tenant=tenant, **data)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self.stderr.write(self.style.WARNING(f"{os.path.basename(path)}:{number}: skipped ({str(e)})"))
+                    rejected.append(line if line.endswith('\n') else f"{line}\n")
+                    continue
+                batches.setdefault(schema_name, (tenant, []))[1].append(entry)
+        return list(batches.values()), rejected
+
+    def _tenant(self, schema_name):
+        if schema_name not in self.tenants:
+            self.tenants[schema_name] = Client.objects.filter(schema_name=schema_name).first()
+        return self.tenants[schema_name]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_knowledgebase'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
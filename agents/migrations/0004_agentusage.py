@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-17 10:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('agents', '0003_alter_agentlog_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('agent_type', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('call_count', models.PositiveIntegerField(default=0)),
+                ('cached_call_count', models.PositiveIntegerField(default=0)),
+                ('input_tokens', models.BigIntegerField(default=0)),
+                ('output_tokens', models.BigIntegerField(default=0)),
+                ('cache_creation_input_tokens', models.BigIntegerField(default=0)),
+                ('cache_read_input_tokens', models.BigIntegerField(default=0)),
+                ('latency_ms_sum', models.BigIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='agentusage',
+            constraint=models.UniqueConstraint(fields=('tenant', 'day', 'agent_type', 'model'), name='agents_usage_unique_bucket'),
+        ),
+    ]
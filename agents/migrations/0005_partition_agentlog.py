@@ -0,0 +1,94 @@
+# Generated by Django 4.2.11 on 2026-10-18 08:41
+#
+# Turns agents_agentlog into a table partitioned by month on created_at.
+# Runs once per tenant schema; the model itself is unchanged.
+
+from django.db import migrations
+
+
+FORWARD_SQL = """
+ALTER TABLE agents_agentlog RENAME TO agents_agentlog_old;
+ALTER INDEX agents_agen_tenant__7f3de4_idx RENAME TO agents_agentlog_old_tenant_idx;
+ALTER INDEX agents_agen_agent_t_465aac_idx RENAME TO agents_agentlog_old_agent_type_idx;
+
+CREATE SEQUENCE agents_agentlog_part_id_seq;
+SELECT setval('agents_agentlog_part_id_seq', COALESCE((SELECT MAX(id) FROM agents_agentlog_old), 0) + 1, false);
+
+CREATE TABLE agents_agentlog (
+    id bigint NOT NULL DEFAULT nextval('agents_agentlog_part_id_seq'),
+    agent_type varchar(50) NOT NULL,
+    action varchar(100) NOT NULL,
+    prompt text NOT NULL,
+    response text NOT NULL,
+    metadata jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    tenant_id bigint NOT NULL REFERENCES tenants_client (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE agents_agentlog_part_id_seq OWNED BY agents_agentlog.id;
+
+CREATE INDEX agents_agen_tenant__7f3de4_idx ON agents_agentlog (tenant_id, created_at);
+CREATE INDEX agents_agen_agent_t_465aac_idx ON agents_agentlog (agent_type);
+
+-- Catch-all for rows outside the monthly partitions
+CREATE TABLE agents_agentlog_default PARTITION OF agents_agentlog DEFAULT;
+
+DO $$
+DECLARE
+    month_start date := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM agents_agentlog_old), now()))::date;
+    last_month date := (date_trunc('month', now()) + interval '2 months')::date;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF agents_agentlog FOR VALUES FROM (%L) TO (%L)',
+            'agents_agentlog_p' || to_char(month_start, 'YYYY_MM'),
+            month_start,
+            (month_start + interval '1 month')::date
+        );
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO agents_agentlog (id, agent_type, action, prompt, response, metadata, created_at, tenant_id)
+SELECT id, agent_type, action, prompt, response, metadata, created_at, tenant_id FROM agents_agentlog_old;
+
+DROP TABLE agents_agentlog_old;
+"""
+
+REVERSE_SQL = """
+ALTER TABLE agents_agentlog RENAME TO agents_agentlog_partitioned;
+ALTER INDEX agents_agen_tenant__7f3de4_idx RENAME TO agents_agentlog_partitioned_tenant_idx;
+ALTER INDEX agents_agen_agent_t_465aac_idx RENAME TO agents_agentlog_partitioned_agent_type_idx;
+
+CREATE TABLE agents_agentlog (
+    id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    agent_type varchar(50) NOT NULL,
+    action varchar(100) NOT NULL,
+    prompt text NOT NULL,
+    response text NOT NULL,
+    metadata jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    tenant_id bigint NOT NULL REFERENCES tenants_client (id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX agents_agen_tenant__7f3de4_idx ON agents_agentlog (tenant_id, created_at);
+CREATE INDEX agents_agen_agent_t_465aac_idx ON agents_agentlog (agent_type);
+
+INSERT INTO agents_agentlog (id, agent_type, action, prompt, response, metadata, created_at, tenant_id)
+OVERRIDING SYSTEM VALUE
+SELECT id, agent_type, action, prompt, response, metadata, created_at, tenant_id FROM agents_agentlog_partitioned;
+SELECT setval(pg_get_serial_sequence('agents_agentlog', 'id'), COALESCE((SELECT MAX(id) FROM agents_agentlog), 0) + 1, false);
+
+DROP TABLE agents_agentlog_partitioned CASCADE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('agents', '0004_agentusage'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+    ]
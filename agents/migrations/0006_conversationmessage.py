@@ -0,0 +1,68 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def split_blobs(apps, schema_editor):
+    """Move each ConversationHistory.messages list into ConversationMessage rows"""
+    ConversationHistory = apps.get_model('agents', 'ConversationHistory')
+    ConversationMessage = apps.get_model('agents', 'ConversationMessage')
+
+    for conversation in ConversationHistory.objects.iterator(chunk_size=200):
+        rows = []
+        turn = 0
+        for message in conversation.messages or []:
+            # Every user message opens a new exchange
+            if message.get('role') == 'user' or turn == 0:
+                turn += 1
+            rows.append(ConversationMessage(
+                conversation=conversation,
+                turn=turn,
+                role=message.get('role', 'user'),
+                content=message.get('content', ''),
+                created_at=conversation.updated_at,
+            ))
+        ConversationMessage.objects.bulk_create(rows, batch_size=500)
+        ConversationHistory.objects.filter(pk=conversation.pk).update(turn_count=turn)
+
+
+def join_blobs(apps, schema_editor):
+    ConversationHistory = apps.get_model('agents', 'ConversationHistory')
+    ConversationMessage = apps.get_model('agents', 'ConversationMessage')
+
+    for conversation in ConversationHistory.objects.iterator(chunk_size=200):
+        rows = ConversationMessage.objects.filter(conversation=conversation).order_by('turn', 'id')
+        conversation.messages = [{"role": row.role, "content": row.content} for row in rows]
+        conversation.save(update_fields=['messages'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0005_partition_agentlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationhistory',
+            name='turn_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ConversationMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('turn', models.PositiveIntegerField()),
+                ('role', models.CharField(max_length=20)),
+                ('content', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_rows', to='agents.conversationhistory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['conversation', 'turn'], name='agents_convmsg_turn_idx')],
+            },
+        ),
+        migrations.RunPython(split_blobs, join_blobs),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0006_conversationmessage'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='conversationhistory',
+            name='messages',
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+def count_existing_tokens(apps, schema_editor):
+    from agents.context_window import count_tokens
+
+    ConversationMessage = apps.get_model('agents', 'ConversationMessage')
+    batch = []
+    for message in ConversationMessage.objects.only('id', 'content').iterator(chunk_size=500):
+        message.token_count = count_tokens(message.content)
+        batch.append(message)
+        if len(batch) >= 500:
+            ConversationMessage.objects.bulk_update(batch, ['token_count'])
+            batch = []
+    if batch:
+        ConversationMessage.objects.bulk_update(batch, ['token_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0007_remove_conversationhistory_messages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationhistory',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='conversationhistory',
+            name='summary_through_turn',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversationmessage',
+            name='token_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_tokens, migrations.RunPython.noop),
+    ]
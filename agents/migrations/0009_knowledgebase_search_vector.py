@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:40
+#
+# Full-text search for KnowledgeBase: a trigger keeps search_vector in sync
+# with title (weight A) and content (weight B); existing rows are backfilled.
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+FORWARD_SQL = """
+CREATE FUNCTION agents_knowledgebase_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER agents_knowledgebase_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, content ON agents_knowledgebase
+FOR EACH ROW EXECUTE FUNCTION agents_knowledgebase_search_vector_update();
+
+UPDATE agents_knowledgebase SET
+    search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B');
+"""
+
+REVERSE_SQL = """
+DROP TRIGGER IF EXISTS agents_knowledgebase_search_vector_trigger ON agents_knowledgebase;
+DROP FUNCTION IF EXISTS agents_knowledgebase_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0008_conversation_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebase',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='knowledgebase',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='agents_kb_search_idx'),
+        ),
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+    ]
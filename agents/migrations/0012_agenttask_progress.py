@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0011_knowledgebase_ingest_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenttask',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agenttask',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('agents', '0012_agenttask_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rule_type', models.CharField(choices=[('regex', 'Regular expression'), ('keyword', 'Keywords'), ('required', 'Required clause'), ('numeric_threshold', 'Numeric threshold')], max_length=20)),
+                ('doc_types', models.JSONField(blank=True, default=list)),
+                ('pattern', models.TextField(blank=True)),
+                ('config', models.JSONField(blank=True, default=dict)),
+                ('severity', models.CharField(choices=[('high', 'High'), ('medium', 'Medium'), ('low', 'Low')], default='medium', max_length=10)),
+                ('action', models.CharField(choices=[('flag', 'Flag'), ('escalate', 'Escalate to LLM review')], default='flag', max_length=10)),
+                ('message', models.CharField(max_length=255)),
+                ('recommendation', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'name'), name='agents_compliance_rule_unique_name')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('departments', '0001_initial'),
+        ('agents', '0013_compliancerule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompensationBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.CharField(max_length=120)),
+                ('contract_type', models.CharField(max_length=20)),
+                ('headcount', models.PositiveIntegerField(default=0)),
+                ('min_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('p10', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('p25', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('p50', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('p75', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('p90', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='departments.department')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('department__isnull', False)), fields=('tenant', 'department', 'position', 'contract_type'), name='agents_compband_unique_group'),
+                    models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('tenant', 'position', 'contract_type'), name='agents_compband_unique_nodept'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('agents', '0014_compensationband'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScreeningResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resume_hash', models.CharField(max_length=64)),
+                ('requirements_hash', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=100)),
+                ('evaluation', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'resume_hash', 'requirements_hash', 'model'), name='agents_screening_result_unique_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0015_screeningresult'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='knowledgechunk',
+            old_name='embedding',
+            new_name='term_vector',
+        ),
+    ]
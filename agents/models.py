@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from tenants.models import Client
 
 class AgentConfig(models.Model):
@@ -20,7 +23,8 @@ class AgentLog(models.Model):
     prompt = models.TextField(blank=True)
     response = models.TextField(blank=True)
     metadata = models.JSONField(default=dict)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is emitted, not when the buffered sink writes it
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         app_label = 'agents'
@@ -29,6 +33,29 @@ class AgentLog(models.Model):
             models.Index(fields=['agent_type']),
         ]
 
+class AgentUsage(models.Model):
+    """Daily token usage per agent and model, rolled up at call time"""
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    day = models.DateField()
+    agent_type = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    call_count = models.PositiveIntegerField(default=0)
+    cached_call_count = models.PositiveIntegerField(default=0)  # response cache hits
+    input_tokens = models.BigIntegerField(default=0)
+    output_tokens = models.BigIntegerField(default=0)
+    cache_creation_input_tokens = models.BigIntegerField(default=0)
+    cache_read_input_tokens = models.BigIntegerField(default=0)
+    latency_ms_sum = models.BigIntegerField(default=0)
+    
+    class Meta:
+        app_label = 'agents'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'day', 'agent_type', 'model'],
+                name='agents_usage_unique_bucket'
+            ),
+        ]
+
 class AgentTask(models.Model):
     """Async tasks for agents"""
     STATUS_CHOICES = [
@@ -45,6 +72,8 @@ class AgentTask(models.Model):
     input_data = models.JSONField()
     output_data = models.JSONField(blank=True, null=True)
     error = models.TextField(blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     
@@ -53,12 +82,27 @@ class AgentTask(models.Model):
 
 class KnowledgeBase(models.Model):
     """Knowledge base for agents to draw information from"""
+    INGEST_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     content = models.TextField()  # Extracted text
     source_file = models.FileField(upload_to='kb_docs/', null=True, blank=True)
     category = models.CharField(max_length=100, default='General')
     is_active = models.BooleanField(default=True)
+    # Maintained by a database trigger from title (weight A) and content (B)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # File ingestion (see agents/ingestion.py)
+    ingest_status = models.CharField(max_length=20, choices=INGEST_STATUS_CHOICES, default='ready')
+    ingest_error = models.TextField(blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)  # sha256 of the source file
+    page_count = models.PositiveIntegerField(blank=True, null=True)
+    ingested_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -67,14 +111,199 @@ class KnowledgeBase(models.Model):
     
     class Meta:
         app_label = 'agents'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='agents_kb_search_idx'),
+        ]
+
+class KnowledgeChunk(models.Model):
+    """
+    Passage of a KnowledgeBase document with its hashed term vector
+    (float32 bytes, see agents/term_vectors.py)
+    """
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    document = models.ForeignKey(KnowledgeBase, on_delete=models.CASCADE, related_name='chunks')
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+    term_vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        app_label = 'agents'
+        indexes = [
+            models.Index(fields=['document', 'position'], name='agents_kbchunk_doc_idx'),
+        ]
+
+class ComplianceRule(models.Model):
+    """
+    Deterministic compliance check run before any LLM audit
+    (see agents/rules.py). A rule named like a built-in default replaces it;
+    an inactive one switches the default off.
+    """
+    RULE_TYPES = [
+        ('regex', 'Regular expression'),
+        ('keyword', 'Keywords'),
+        ('required', 'Required clause'),
+        ('numeric_threshold', 'Numeric threshold'),
+    ]
+    SEVERITY_CHOICES = [
+        ('high', 'High'),
+        ('medium', 'Medium'),
+        ('low', 'Low'),
+    ]
+    ACTION_CHOICES = [
+        ('flag', 'Flag'),
+        ('escalate', 'Escalate to LLM review'),
+    ]
+    
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    rule_type = models.CharField(max_length=20, choices=RULE_TYPES)
+    doc_types = models.JSONField(default=list, blank=True)  # empty = every document type
+    pattern = models.TextField(blank=True)  # regex; for numeric_threshold group 1 is the number
+    config = models.JSONField(default=dict, blank=True)  # keywords, min/max, margin...
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='medium')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default='flag')
+    message = models.CharField(max_length=255)
+    recommendation = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.rule_type})"
+    
+    class Meta:
+        app_label = 'agents'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'name'], name='agents_compliance_rule_unique_name'),
+        ]
+
+class CompensationBand(models.Model):
+    """
+    Salary distribution of one department/position/contract type group,
+    kept up to date by Employee signals (see agents/compensation.py)
+    """
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    department = models.ForeignKey('departments.Department', on_delete=models.CASCADE, null=True, blank=True)
+    position = models.CharField(max_length=120)  # normalized (see compensation.position_key)
+    contract_type = models.CharField(max_length=20)
+    headcount = models.PositiveIntegerField(default=0)
+    min_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    p10 = models.DecimalField(max_digits=10, decimal_places=2)
+    p25 = models.DecimalField(max_digits=10, decimal_places=2)
+    p50 = models.DecimalField(max_digits=10, decimal_places=2)
+    p75 = models.DecimalField(max_digits=10, decimal_places=2)
+    p90 = models.DecimalField(max_digits=10, decimal_places=2)
+    max_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.position} / {self.contract_type} ({self.headcount})"
+
+    class Meta:
+        app_label = 'agents'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'department', 'position', 'contract_type'],
+                condition=models.Q(department__isnull=False),
+                name='agents_compband_unique_group'
+            ),
+            models.UniqueConstraint(
+                fields=['tenant', 'position', 'contract_type'],
+                condition=models.Q(department__isnull=True),
+                name='agents_compband_unique_nodept'
+            ),
+        ]
+
+class ScreeningResult(models.Model):
+    """
+    Stored resume screening, reused while the resume, the job requirements
+    and the model are unchanged (see RecruitingAgent.screening_fingerprint)
+    """
+    tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    resume_hash = models.CharField(max_length=64)
+    requirements_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    evaluation = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        app_label = 'agents'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'resume_hash', 'requirements_hash', 'model'],
+                name='agents_screening_result_unique_key'
+            ),
+        ]
 
 class ConversationHistory(models.Model):
-    """Chat history between employees and support agent"""
+    """
+    Chat history between employees and support agent.
+    Messages live in ConversationMessage (append-only, one row per message);
+    turn_count is the number of user/assistant exchanges so far. summary
+    condenses exchanges 1..summary_through_turn (see agents/context_window.py).
+    """
     tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
     employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    messages = models.JSONField(default=list)  # [{"role": "user", "content": "..."}]
+    turn_count = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)
+    summary_through_turn = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         app_label = 'agents'
+    
+    def append_turn(self, messages):
+        """
+        Append one exchange ([{"role": ..., "content": ...}, ...]) as new
+        rows; nothing already stored is read or rewritten.
+        """
+        from .context_window import count_tokens
+        
+        with transaction.atomic():
+            # The UPDATE locks the row, so concurrent turns get distinct numbers
+            ConversationHistory.objects.filter(pk=self.pk).update(
+                turn_count=models.F('turn_count') + 1,
+                updated_at=timezone.now()
+            )
+            self.turn_count = ConversationHistory.objects.values_list(
+                'turn_count', flat=True
+            ).get(pk=self.pk)
+            ConversationMessage.objects.bulk_create([
+                ConversationMessage(
+                    conversation=self,
+                    turn=self.turn_count,
+                    role=message["role"],
+                    content=message["content"],
+                    token_count=count_tokens(message["content"]),
+                )
+                for message in messages
+            ])
+        return self.turn_count
+    
+    def page(self, before_turn=None, limit=20):
+        """
+        Up to `limit` exchanges older than before_turn (newest page first),
+        returned oldest first. Returns (rows, next before_turn or None).
+        """
+        upper = min(before_turn or self.turn_count + 1, self.turn_count + 1)
+        lower = max(upper - max(limit, 1), 1)
+        rows = list(self.message_rows.filter(turn__gte=lower, turn__lt=upper).order_by('turn', 'id'))
+        return rows, (lower if lower > 1 else None)
+
+class ConversationMessage(models.Model):
+    """One message of a ConversationHistory"""
+    conversation = models.ForeignKey(ConversationHistory, on_delete=models.CASCADE, related_name='message_rows')
+    turn = models.PositiveIntegerField()
+    role = models.CharField(max_length=20)
+    content = models.JSONField()  # text, or content blocks
+    token_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        app_label = 'agents'
+        indexes = [
+            models.Index(fields=['conversation', 'turn'], name='agents_convmsg_turn_idx'),
+        ]
@@ -1,4 +1,5 @@
 from .base import BaseAgent
+from .async_base import AsyncBaseAgent
 from django.db import connection
 import logging
 
@@ -36,45 +37,81 @@ Strategic, authoritative, yet helpful. You are the CEO's personal HR assistant.
     def handle_request(self, user_query):
         """Orchestrates a complex request"""
         if self.mock_mode:
-            # Simulate analyzing intent and routing
-            if "hire" in user_query.lower() or "candidate" in user_query.lower():
-                return {
-                    "intent": "recruiting",
-                    "plan": [
-                        {"step": 1, "agent": "Recruiting", "action": "Source top candidates"},
-                        {"step": 2, "agent": "Knowledge", "action": "Check hiring policy"}
-                    ],
-                    "status": "In Progress",
-                    "next_step": "Awaiting recruiting feedback."
-                }
-            elif "audit" in user_query.lower() or "contract" in user_query.lower() or "compliance" in user_query.lower():
-                return {
-                    "intent": "compliance_audit",
-                    "plan": [
-                        {"step": 1, "agent": "Compliance", "action": "Perform document audit"},
-                        {"step": 2, "agent": "Knowledge", "action": "Verify against latest policies"}
-                    ],
-                    "status": "Running",
-                    "next_step": "Scanning document for compliance issues."
-                }
-            elif "pay" in user_query.lower() or "salary" in user_query.lower():
-                return {
-                    "intent": "payroll_analytics",
-                    "plan": [
-                        {"step": 1, "agent": "Payroll", "action": "Fetch current salary ranges"},
-                        {"step": 2, "agent": "Analytics", "action": "Compare against budget trends"}
-                    ],
-                    "status": "Summary Ready",
-                    "summary": "Platform analysis shows salaries are 5% above market average for Engineering."
-                }
-            else:
-                return {
-                    "intent": "general_support",
-                    "agent": "Support",
-                    "action": "Routing to Support Agent",
-                    "message": "I've analyzed your request and delegated it to our Support specialist."
-                }
+            return self._mock_route(user_query)
             
         # Real Claude logic for orchestration
-        prompt = f"Analyze this request and coordinate the necessary sub-agents: {user_query}"
-        return self.call_claude(prompt)
+        response = self.call_claude(self.build_prompt(user_query))
+        return self._format_result(response)
+
+    def build_prompt(self, user_query):
+        return f"Analyze this request and coordinate the necessary sub-agents: {user_query}"
+
+    def _format_result(self, response):
+        return {
+            "intent": "orchestrated",
+            "status": "Summary Ready",
+            "summary": self.extract_text_response(response)
+        }
+
+    def _mock_route(self, user_query):
+        """Simulate analyzing intent and routing"""
+        if "hire" in user_query.lower() or "candidate" in user_query.lower():
+            return {
+                "intent": "recruiting",
+                "plan": [
+                    {"step": 1, "agent": "Recruiting", "action": "Source top candidates"},
+                    {"step": 2, "agent": "Knowledge", "action": "Check hiring policy"}
+                ],
+                "status": "In Progress",
+                "next_step": "Awaiting recruiting feedback."
+            }
+        elif "audit" in user_query.lower() or "contract" in user_query.lower() or "compliance" in user_query.lower():
+            return {
+                "intent": "compliance_audit",
+                "plan": [
+                    {"step": 1, "agent": "Compliance", "action": "Perform document audit"},
+                    {"step": 2, "agent": "Knowledge", "action": "Verify against latest policies"}
+                ],
+                "status": "Running",
+                "next_step": "Scanning document for compliance issues."
+            }
+        elif "pay" in user_query.lower() or "salary" in user_query.lower():
+            return {
+                "intent": "payroll_analytics",
+                "plan": [
+                    {"step": 1, "agent": "Payroll", "action": "Fetch current salary ranges"},
+                    {"step": 2, "agent": "Analytics", "action": "Compare against budget trends"}
+                ],
+                "status": "Summary Ready",
+                "summary": "Platform analysis shows salaries are 5% above market average for Engineering."
+            }
+        else:
+            return {
+                "intent": "general_support",
+                "agent": "Support",
+                "action": "Routing to Support Agent",
+                "message": "I've analyzed your request and delegated it to our Support specialist."
+            }
+
+
+class AsyncOrchestratorAgent(AsyncBaseAgent, OrchestratorAgent):
+    """OrchestratorAgent on the async runtime (used by the ASGI endpoints)"""
+
+    async def handle_request(self, user_query):
+        if self.mock_mode:
+            return self._mock_route(user_query)
+
+        response = await self.acall_claude(self.build_prompt(user_query))
+        return self._format_result(response)
+
+    async def stream_request(self, user_query):
+        """Stream the orchestration answer (token events, then done)"""
+        if self.mock_mode:
+            yield {"type": "done", **self._mock_route(user_query)}
+            return
+
+        async for event in self.astream_claude(self.build_prompt(user_query)):
+            if event["type"] == "token":
+                yield event
+            elif event["type"] == "message":
+                yield {"type": "done", **self._format_result(event["message"])}
@@ -0,0 +1,157 @@
+"""
+Monthly partitions of the AgentLog table (see migration 0005).
+
+All functions work on the schema currently selected on the connection,
+so callers set the tenant first.
+"""
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+import gzip
+import json
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'agents_agentlog'
+DEFAULT_PARTITION = 'agents_agentlog_default'
+PARTITION_RE = re.compile(r'^agents_agentlog_p(\d{4})_(\d{2})$')
+ARCHIVE_COLUMNS = ['id', 'tenant_id', 'agent_type', 'action', 'prompt', 'response', 'metadata', 'created_at']
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(day):
+    return f"{PARENT_TABLE}_p{day.year}_{day.month:02d}"
+
+
+def list_partitions():
+    """Monthly partitions of the current schema as [(name, start, end)], oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+            WHERE parent.relname = %s AND ns.nspname = current_schema()
+        """, [PARENT_TABLE])
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            start = date(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((name, start, next_month(start)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(months_ahead=2, today=None):
+    """Create the partitions for this month and the next months_ahead months"""
+    existing = {name for name, start, end in list_partitions()}
+    start = month_start(today or date.today())
+    created = []
+
+    for _ in range(months_ahead + 1):
+        name = partition_name(start)
+        if name not in existing:
+            create_partition(name, start, next_month(start))
+            created.append(name)
+        start = next_month(start)
+    return created
+
+
+def create_partition(name, start, end):
+    """
+    Create the partition for [start, end). Rows the default partition
+    already holds for that range (written while the partition was missing)
+    are moved into it first: Postgres refuses to create a partition whose
+    rows are still in the default one.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s)',
+            [start, end]
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [start, end]
+            )
+            return
+
+        # Keep new rows of the range out of the default partition until it is attached
+        cursor.execute(f'LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE')
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            [start, end]
+        )
+        # Indexes and the primary key are created on the table as it is attached
+        cursor.execute(
+            f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            [start, end]
+        )
+        logger.info(f"Moved rows of {name} out of {DEFAULT_PARTITION}")
+
+
+def get_retention_days(tenant):
+    """Per-tenant retention from AgentConfig.agent_settings['log_retention_days']"""
+    from .models import AgentConfig
+
+    default = getattr(settings, 'AGENT_SETTINGS', {}).get('LOG_RETENTION_DAYS', 365)
+    config = AgentConfig.objects.filter(tenant=tenant).first()
+    if config:
+        return int(config.agent_settings.get('log_retention_days', default))
+    return default
+
+
+def expired_partitions(retention_days, today=None):
+    """Partitions whose newest possible row is older than the retention window"""
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    return [p for p in list_partitions() if p[2] <= cutoff]
+
+
+def archive_partition(name, archive_dir, batch_size=2000):
+    """
+    Stream a partition into <archive_dir>/<name>.jsonl.gz through a
+    server-side cursor, so memory stays flat however large it is.
+    Returns (path, row_count).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    tmp_path = f"{path}.part"
+    rows = 0
+
+    with transaction.atomic():
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(f'SELECT {", ".join(ARCHIVE_COLUMNS)} FROM "{name}" ORDER BY id')
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    for row in batch:
+                        f.write(json.dumps(dict(zip(ARCHIVE_COLUMNS, row)), default=str) + "\n")
+                    rows += len(batch)
+
+    # Only a complete archive gets the final name
+    os.replace(tmp_path, path)
+    return path, rows
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from django.db import transaction
+from .caching import get_version, bump_version
+from .term_vectors import chunk_text, get_knowledge_index_settings, term_vectors, to_bytes
+import threading
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkIndex:
+    """
+    In-process matrix of a tenant's passage term vectors.
+
+    Built once from KnowledgeChunk rows and tagged with the tenant's
+    "knowledge" cache version; index_document() bumps that version, so every
+    worker rebuilds on its next search. At most MAX_TENANTS matrices are kept
+    (least recently used are dropped).
+    """
+
+    scope = "knowledge"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # schema_name -> (version, chunk_ids, document_ids, matrix)
+
+    def get(self, tenant):
+        """Returns (chunk_ids, document_ids, matrix) for a tenant"""
+        schema_name = tenant.schema_name
+        version = get_version(self.scope, schema_name)
+
+        with self._lock:
+            entry = self._entries.get(schema_name)
+            if version is not None and entry and entry[0] == version:
+                self._entries.move_to_end(schema_name)
+                return entry[1:]
+
+        chunk_ids, document_ids, matrix = self._build(tenant)
+
+        if version is not None:
+            with self._lock:
+                self._entries[schema_name] = (version, chunk_ids, document_ids, matrix)
+                self._entries.move_to_end(schema_name)
+                while len(self._entries) > get_knowledge_index_settings()['MAX_TENANTS']:
+                    self._entries.popitem(last=False)
+        return chunk_ids, document_ids, matrix
+
+    def _build(self, tenant):
+        from .models import KnowledgeChunk
+
+        dimensions = get_knowledge_index_settings()['DIMENSIONS']
+        row_bytes = dimensions * 4
+        chunk_ids, document_ids, vectors = [], [], []
+
+        rows = KnowledgeChunk.objects.filter(
+            tenant=tenant, document__is_active=True
+        ).order_by('id').values_list('id', 'document_id', 'term_vector')
+        for chunk_id, document_id, vector in rows.iterator(chunk_size=2000):
+            # Rows hashed with another DIMENSIONS setting wait for re-indexing
+            if len(vector) != row_bytes:
+                continue
+            chunk_ids.append(chunk_id)
+            document_ids.append(document_id)
+            vectors.append(vector)
+
+        matrix = np.frombuffer(b"".join(vectors), dtype=np.float32).reshape(-1, dimensions)
+        return np.array(chunk_ids, dtype=np.int64), np.array(document_ids, dtype=np.int64), matrix
+
+    def invalidate(self, schema_name):
+        bump_version(self.scope, schema_name)
+        with self._lock:
+            self._entries.pop(schema_name, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tenants": len(self._entries),
+                "chunks": sum(len(entry[1]) for entry in self._entries.values()),
+                "bytes": sum(entry[3].nbytes for entry in self._entries.values()),
+            }
+
+
+chunk_index = ChunkIndex()
+
+
+def index_document(document):
+    """(Re)build the chunks of a KnowledgeBase document; returns the chunk count"""
+    from .models import KnowledgeChunk
+
+    passages = chunk_text(document.content)
+    # The title is hashed with every passage so it still matches on its own
+    vectors = term_vectors([f"{document.title}\n{passage}" for passage in passages])
+
+    with transaction.atomic():
+        KnowledgeChunk.objects.filter(document=document).delete()
+        KnowledgeChunk.objects.bulk_create([
+            KnowledgeChunk(
+                tenant=document.tenant,
+                document=document,
+                position=position,
+                text=passage,
+                term_vector=to_bytes(vector),
+            )
+            for position, (passage, vector) in enumerate(zip(passages, vectors))
+        ], batch_size=500)
+
+    # Other workers must not rebuild from rows that are not committed yet
+    schema_name = document.tenant.schema_name
+    transaction.on_commit(lambda: chunk_index.invalidate(schema_name))
+    return len(passages)
@@ -0,0 +1,122 @@
+"""
+Local pre-ranking of a job's candidates before LLM screening.
+
+All resumes of a job are scored against the job's title, requirements and
+description with BM25 in one pass: term counts are collected into a sparse
+(candidate, term) matrix in coordinate form (three numpy arrays), and
+per-candidate scores are a weighted np.bincount over its entries. The score
+is stored in Candidate.prerank_score (0-100, relative to a resume that
+mentions every job term) so bulk screening can send only the top K to Claude.
+"""
+from django.conf import settings
+from .term_vectors import WORD_RE
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRERANK_SETTINGS = {
+    'K1': 1.2,
+    'B': 0.75,
+    'TITLE_WEIGHT': 2.0,          # query term weights by job field
+    'REQUIREMENTS_WEIGHT': 1.5,
+    'DESCRIPTION_WEIGHT': 0.5,
+}
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could do does
+for from has have having he her his how i if in into is it its job may more most must of on or
+our out over role she should so some such than that the their them then there these they this
+to under up us we well were what when where which while who will with within work would you your
+""".split())
+
+
+def get_prerank_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_PRERANK_SETTINGS, **agent_settings.get('PRERANK', {})}
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall((text or "").lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def query_weights(job, prerank_settings):
+    """{term: weight} from the job's fields (a term's weight is summed over its fields)"""
+    weights = {}
+    for text, weight in (
+        (job.title, prerank_settings['TITLE_WEIGHT']),
+        (job.requirements, prerank_settings['REQUIREMENTS_WEIGHT']),
+        (job.description, prerank_settings['DESCRIPTION_WEIGHT']),
+    ):
+        for term in set(tokenize(text)):
+            weights[term] = weights.get(term, 0.0) + weight
+    return weights
+
+
+def bm25_scores(query, documents, k1=1.2, b=0.75):
+    """
+    Scores (0-100) of documents (lists of tokens) for query ({term: weight}),
+    relative to a document of average length containing each query term once
+    """
+    if not documents or not query:
+        return np.zeros(len(documents))
+
+    vocabulary = {term: column for column, term in enumerate(query)}
+    term_weights = np.fromiter(query.values(), dtype=np.float64, count=len(query))
+    lengths = np.fromiter((len(tokens) for tokens in documents), dtype=np.float64, count=len(documents))
+
+    rows, columns, counts = [], [], []
+    for row, tokens in enumerate(documents):
+        document_counts = {}
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                document_counts[column] = document_counts.get(column, 0) + 1
+        rows += [row] * len(document_counts)
+        columns += document_counts.keys()
+        counts += document_counts.values()
+    if not rows:
+        return np.zeros(len(documents))
+
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.float64)
+
+    n = len(documents)
+    document_frequency = np.bincount(columns, minlength=len(query))
+    idf = np.log1p((n - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = lengths.mean() or 1.0
+    norm = k1 * (1 - b + b * lengths[rows] / average_length)
+    contributions = term_weights[columns] * idf[columns] * counts * (k1 + 1) / (counts + norm)
+
+    scores = np.bincount(rows, weights=contributions, minlength=n)
+    # Every query term once, at average length; repeated terms can go past it
+    best = float((term_weights * idf).sum())
+    return np.minimum(scores * 100 / best, 100.0) if best else scores
+
+
+def prerank_job(job):
+    """
+    Score every candidate of the job, save Candidate.prerank_score and
+    return [(candidate_id, score)] best first
+    """
+    from candidates.models import Candidate
+
+    prerank_settings = get_prerank_settings()
+    ids, documents = [], []
+    for candidate_id, resume_text in Candidate.objects.filter(job=job).values_list('id', 'resume_text').iterator(chunk_size=1000):
+        ids.append(candidate_id)
+        documents.append(tokenize(resume_text))
+
+    scores = bm25_scores(
+        query_weights(job, prerank_settings), documents,
+        k1=prerank_settings['K1'], b=prerank_settings['B']
+    )
+    ranking = sorted(zip(ids, (round(float(score), 2) for score in scores)), key=lambda item: (-item[1], item[0]))
+
+    Candidate.objects.bulk_update(
+        [Candidate(id=candidate_id, prerank_score=score) for candidate_id, score in ranking],
+        ['prerank_score'], batch_size=1000
+    )
+    logger.info(f"Pre-ranked {len(ranking)} candidates for job {job.id}")
+    return ranking
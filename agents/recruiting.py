@@ -1,10 +1,14 @@
 from .base import BaseAgent
 from django.db import connection
+import hashlib
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Part of the screening fingerprint: bump when build_screening_prompt changes
+SCREENING_PROMPT_VERSION = 2
+
 class RecruitingAgent(BaseAgent):
     """
     Autonomous recruiting agent
@@ -88,7 +92,7 @@ Return as JSON.
         if self.mock_mode:
             return self._mock_source_candidates(job)
 
-        response = self.call_claude(prompt)
+        response = self.call_claude(prompt, cache=True)
         result = self.extract_text_response(response)
         
         try:
@@ -112,10 +116,11 @@ Return as JSON.
             "sourcing_channels": ["LinkedIn", "GitHub", "Internal Referrals"]
         }
     
-    def screen_resume(self, candidate_id, job_id):
+    def screen_resume(self, candidate_id, job_id, force_refresh=False):
         """
         AI screen a candidate's resume against job requirements
-        Returns score (0-100) and reasoning
+        Returns score (0-100) and reasoning; a stored result for the same
+        resume, requirements and model is reused unless force_refresh
         """
         connection.set_tenant(self.tenant)
         from candidates.models import Job, Candidate
@@ -126,7 +131,18 @@ Return as JSON.
         except (Candidate.DoesNotExist, Job.DoesNotExist):
             return {"error": "Candidate or Job not found"}
         
-        prompt = f"""
+        evaluation = self.evaluate_candidate(candidate, job, force_refresh=force_refresh)
+        if "error" in evaluation:
+            return evaluation
+            
+        # Save evaluation to candidate
+        self.apply_evaluation(candidate, evaluation)
+        candidate.save(update_fields=['ai_score', 'ai_evaluation'])
+        
+        return evaluation
+
+    def build_screening_prompt(self, candidate, job):
+        return f"""
 Screen this candidate for the position:
 
 JOB TITLE: {job.title}
@@ -135,32 +151,105 @@ REQUIREMENTS:
 
 CANDIDATE:
 Name: {candidate.name}
-Email: {candidate.email}
 Resume:
 {candidate.resume_text}
 
 Please evaluate and return JSON with score (0-100), strengths, weaknesses, recommendation, and reasoning.
 """
-        
+
+    def evaluate_candidate(self, candidate, job, force_refresh=False, stored=None, store=True):
+        """
+        Evaluation dict for a candidate, or {"error", "raw_response"}; the
+        candidate is not saved. Reuses a stored ScreeningResult unless
+        force_refresh; stored is a lookup preloaded by stored_evaluations.
+        With store=False new results are left to the caller to store in bulk.
+        """
         if self.mock_mode:
-            evaluation = self._mock_screen_resume(candidate, job)
-        else:
-            response = self.call_claude(prompt)
-            result = self.extract_text_response(response)
-            try:
-                if "```json" in result:
-                    result = result.split("```json")[1].split("```")[0].strip()
-                evaluation = json.loads(result)
-            except:
-                return {"error": "Could not parse evaluation", "raw_response": result}
-            
-        # Save evaluation to candidate
-        candidate.ai_score = evaluation.get("score", 0)
-        candidate.ai_evaluation = evaluation
-        candidate.save()
+            return self._mock_screen_resume(candidate, job)
         
+        if not force_refresh:
+            if stored is None:
+                stored = self.stored_evaluations([candidate], job)
+            if candidate.id in stored:
+                return stored[candidate.id]
+        
+        response = self.call_claude(self.build_screening_prompt(candidate, job))
+        evaluation = self.parse_evaluation(self.extract_text_response(response))
+        if store and "error" not in evaluation:
+            self.store_evaluations([(candidate, evaluation)], job)
         return evaluation
 
+    def screening_fingerprint(self, candidate, job):
+        """
+        (resume_hash, requirements_hash, model) of a screening. Only what the
+        prompt uses counts: the candidate's name and resume, the job title
+        and requirements, and the prompt version.
+        """
+        resume = f"{candidate.name}\n{' '.join((candidate.resume_text or '').split())}"
+        requirements = f"{SCREENING_PROMPT_VERSION}\n{job.title}\n{' '.join((job.requirements or '').split())}"
+        return (
+            hashlib.sha256(resume.encode('utf-8')).hexdigest(),
+            hashlib.sha256(requirements.encode('utf-8')).hexdigest(),
+            self.get_model(),
+        )
+
+    def stored_evaluations(self, candidates, job):
+        """{candidate id: stored evaluation} for candidates screened before, in one query"""
+        from .models import ScreeningResult
+        
+        if self.mock_mode or not candidates:
+            return {}
+        keys = {candidate.id: self.screening_fingerprint(candidate, job) for candidate in candidates}
+        _, requirements_hash, model = next(iter(keys.values()))
+        rows = ScreeningResult.objects.filter(
+            tenant=self.tenant, requirements_hash=requirements_hash, model=model,
+            resume_hash__in={key[0] for key in keys.values()}
+        ).values_list('resume_hash', 'evaluation')
+        evaluations = dict(rows)
+        return {
+            candidate_id: evaluations[key[0]]
+            for candidate_id, key in keys.items() if key[0] in evaluations
+        }
+
+    def store_evaluations(self, results, job):
+        """Save [(candidate, evaluation)] as ScreeningResults (replacing older ones)"""
+        from .models import ScreeningResult
+        
+        if self.mock_mode or not results:
+            return
+        rows = {}
+        for candidate, evaluation in results:
+            resume_hash, requirements_hash, model = self.screening_fingerprint(candidate, job)
+            rows[resume_hash] = ScreeningResult(
+                tenant=self.tenant, resume_hash=resume_hash, requirements_hash=requirements_hash,
+                model=model, evaluation=evaluation
+            )
+        ScreeningResult.objects.bulk_create(
+            list(rows.values()),
+            update_conflicts=True,
+            unique_fields=['tenant', 'resume_hash', 'requirements_hash', 'model'],
+            update_fields=['evaluation', 'updated_at']
+        )
+
+    def parse_evaluation(self, result):
+        try:
+            if "```json" in result:
+                result = result.split("```json")[1].split("```")[0].strip()
+            evaluation = json.loads(result)
+        except:
+            return {"error": "Could not parse evaluation", "raw_response": result}
+        if not isinstance(evaluation, dict):
+            return {"error": "Could not parse evaluation", "raw_response": result}
+        return evaluation
+
+    def apply_evaluation(self, candidate, evaluation):
+        """Set (not save) the candidate's AI fields; bulk screening saves them in batches"""
+        try:
+            candidate.ai_score = max(0, min(100, int(evaluation.get("score", 0))))
+        except (TypeError, ValueError):
+            candidate.ai_score = 0
+        candidate.ai_evaluation = evaluation
+
     def _mock_screen_resume(self, candidate, job):
         """Mock resume screening"""
         return {
@@ -185,12 +274,16 @@ Please evaluate and return JSON with score (0-100), strengths, weaknesses, recom
         except (Candidate.DoesNotExist, Job.DoesNotExist):
             return {"error": "Candidate or Job not found"}
         
-        prompt = f"""
-Draft a personalized recruiting email for {candidate.name} for the position {job.title} at {self.tenant.name}.
-"""
-        
         if self.mock_mode:
-            return f"Subject: Opportunity for {job.title} at {self.tenant.name}\n\nHi {candidate.name},\n\nI noticed your impressive background and think you'd be a great fit for our {job.title} role..."
+            return self._mock_draft_outreach(candidate, job)
 
-        response = self.call_claude(prompt)
+        response = self.call_claude(self.build_outreach_prompt(candidate, job))
         return self.extract_text_response(response)
+
+    def build_outreach_prompt(self, candidate, job):
+        return f"""
+Draft a personalized recruiting email for {candidate.name} for the position {job.title} at {self.tenant.name}.
+"""
+
+    def _mock_draft_outreach(self, candidate, job):
+        return f"Subject: Opportunity for {job.title} at {self.tenant.name}\n\nHi {candidate.name},\n\nI noticed your impressive background and think you'd be a great fit for our {job.title} role..."
@@ -0,0 +1,297 @@
+"""
+Deterministic compliance rules, run before any LLM audit.
+
+Rules come from built-in defaults (DEFAULT_RULES) merged with the tenant's
+ComplianceRule rows: a row with a default's name replaces it, an inactive
+row switches it off. The merged set is compiled once per tenant and cached
+under the tenant's "compliance_rules" version, which ComplianceRule signals
+bump.
+
+Each rule either flags a finding outright or, for ambiguous matches
+(action 'escalate', or a number within `margin` of its threshold), hands
+the passage to Claude for review.
+"""
+from .caching import get_version, bump_version
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEAVE_TERMS = r"(?:PTO|paid time off|paid leave|annual leave|vacation|holidays?)"
+
+DEFAULT_RULES = [
+    {
+        "name": "max_weekly_hours",
+        "rule_type": "numeric_threshold",
+        "pattern": r"(\d+(?:[.,]\d+)?)\s*(?:hours?|hrs?|h)\s*(?:per|a|each|every|/)\s*week",
+        "config": {"max": 48, "margin": 4},
+        "severity": "high",
+        "message": "Working time of {value:g} hours per week exceeds the {max:g} hour limit",
+        "recommendation": "Cap working time at 48 hours per week including overtime, or document a valid opt-out.",
+    },
+    {
+        "name": "pto_waiver",
+        "rule_type": "regex",
+        # "no"/"without" only directly before the leave term or a right to it:
+        # "no less than 25 days of paid vacation" or "no approval is needed for
+        # holidays" are compliant, "has no right to PTO" is not
+        "pattern": rf"\b(?:waives?|forfeits?|renounces?|gives? up)\b[^.\n]{{0,40}}?\b{LEAVE_TERMS}\b"
+                   rf"|\b(?:no|without)\s+(?:any\s+)?(?:(?:right|entitlement|claim)s?\s+to\s+(?:any\s+)?)?"
+                   rf"(?:paid\s+)?{LEAVE_TERMS}\b"
+                   rf"|\bnot\s+(?:be\s+)?entitled\s+to\s+(?:any\s+)?(?:paid\s+)?{LEAVE_TERMS}\b",
+        "severity": "high",
+        "action": "escalate",
+        "message": "Language waives or denies paid time off",
+        "recommendation": "Statutory paid leave cannot be waived; state the employee's leave entitlement.",
+    },
+    {
+        "name": "unpaid_overtime",
+        "rule_type": "keyword",
+        "config": {"keywords": ["unpaid overtime", "overtime will not be paid", "without overtime pay"]},
+        "severity": "high",
+        "message": "Overtime is stated to be unpaid",
+        "recommendation": "Specify overtime compensation or time off in lieu.",
+    },
+    {
+        "name": "non_compete",
+        "rule_type": "keyword",
+        "config": {"keywords": ["non-compete", "non compete", "noncompete", "shall not compete"]},
+        "severity": "medium",
+        "action": "escalate",
+        "message": "Non-compete clause: scope, duration and compensation need review",
+    },
+    {
+        "name": "termination_clause",
+        "rule_type": "required",
+        "doc_types": ["contract"],
+        "config": {"keywords": ["termination", "notice period"]},
+        "severity": "medium",
+        "message": "Missing mandatory clause: termination and notice period",
+        "recommendation": "Add a termination clause with the notice period for both parties.",
+    },
+    {
+        "name": "confidentiality_clause",
+        "rule_type": "required",
+        "doc_types": ["contract"],
+        "config": {"keywords": ["confidential"]},
+        "severity": "low",
+        "message": "Missing clause: confidentiality",
+        "recommendation": "Add a confidentiality clause.",
+    },
+    {
+        "name": "governing_law_clause",
+        "rule_type": "required",
+        "doc_types": ["contract"],
+        "config": {"keywords": ["governing law", "governed by", "jurisdiction"]},
+        "severity": "low",
+        "message": "Missing clause: governing law",
+        "recommendation": "State the law governing the contract.",
+    },
+]
+
+
+def excerpt(text, start, end, width=80):
+    prefix = "..." if start > width else ""
+    suffix = "..." if end + width < len(text) else ""
+    return prefix + " ".join(text[max(0, start - width):end + width].split()) + suffix
+
+
+RULE_TYPES = ('regex', 'keyword', 'required', 'numeric_threshold')
+SEVERITIES = ('high', 'medium', 'low')
+ACTIONS = ('flag', 'escalate')
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class CompiledRule:
+    """Raises ValueError (or re.error) for a spec that could not be evaluated"""
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.rule_type = spec["rule_type"]
+        self.config = spec.get("config") or {}
+        self.severity = spec.get("severity") or "medium"
+        self.action = spec.get("action") or "flag"
+        self.message = spec["message"]
+        self.recommendation = spec.get("recommendation") or ""
+
+        if self.rule_type not in RULE_TYPES:
+            raise ValueError(f"rule_type must be one of {', '.join(RULE_TYPES)}")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+        if self.action not in ACTIONS:
+            raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+        if not isinstance(self.config, dict):
+            raise ValueError("config must be an object")
+        doc_types = spec.get("doc_types") or []
+        if not isinstance(doc_types, list) or not all(isinstance(doc_type, str) for doc_type in doc_types):
+            raise ValueError("doc_types must be a list of strings")
+        self.doc_types = [doc_type.lower() for doc_type in doc_types]
+
+        keywords = self.config.get("keywords", [])
+        if not isinstance(keywords, list) or not all(isinstance(keyword, str) and keyword for keyword in keywords):
+            raise ValueError("config.keywords must be a list of non-empty strings")
+        self.keywords = [keyword.lower() for keyword in keywords]
+        for key in ("min", "max", "margin"):
+            if key in self.config and not is_number(self.config[key]):
+                raise ValueError(f"config.{key} must be a number")
+
+        self.regex = re.compile(spec["pattern"], re.IGNORECASE | re.MULTILINE) if spec.get("pattern") else None
+        if self.rule_type in ('regex', 'numeric_threshold') and self.regex is None:
+            raise ValueError(f"{self.rule_type} rules need a pattern")
+        if self.rule_type == 'numeric_threshold':
+            if self.regex.groups < 1:
+                raise ValueError("numeric_threshold patterns must capture the number in group 1")
+            if "min" not in self.config and "max" not in self.config:
+                raise ValueError("numeric_threshold rules need config.min or config.max")
+        if self.rule_type == 'keyword' and not self.keywords:
+            raise ValueError("keyword rules need config.keywords")
+        if self.rule_type == 'required' and not self.keywords and self.regex is None:
+            raise ValueError("required rules need config.keywords or a pattern")
+
+    def applies_to(self, doc_type):
+        return not self.doc_types or (doc_type or "").lower() in self.doc_types
+
+    def evaluate(self, text, lowered):
+        """Returns [(escalate, finding)]"""
+        if self.rule_type == "required":
+            if any(keyword in lowered for keyword in self.keywords):
+                return []
+            if self.regex and self.regex.search(text):
+                return []
+            return [(self.action == "escalate", self.finding(self.message, clause=None))]
+
+        if self.rule_type == "keyword":
+            results = []
+            for keyword in self.keywords:
+                position = lowered.find(keyword)
+                if position != -1:
+                    results.append((self.action == "escalate", self.finding(
+                        self.message, excerpt(text, position, position + len(keyword))
+                    )))
+            return results
+
+        if self.rule_type == "regex":
+            return [
+                (self.action == "escalate", self.finding(self.message, excerpt(text, match.start(), match.end())))
+                for match in self.regex.finditer(text)
+            ]
+
+        if self.rule_type == "numeric_threshold":
+            return [result for match in self.regex.finditer(text) for result in self.check_number(text, match)]
+
+        return []
+
+    def check_number(self, text, match):
+        try:
+            value = float(match.group(1).replace(",", "."))
+        except (IndexError, TypeError, ValueError):
+            return []
+
+        limit = None
+        if "max" in self.config and value > self.config["max"]:
+            limit = self.config["max"]
+        elif "min" in self.config and value < self.config["min"]:
+            limit = self.config["min"]
+        if limit is None:
+            return []
+
+        # Close to the limit: averaging periods, opt-outs etc. need a reading of the clause
+        borderline = abs(value - limit) <= self.config.get("margin", 0)
+        try:
+            message = self.message.format(value=value, **{k: v for k, v in self.config.items() if k in ("min", "max")})
+        except (KeyError, IndexError, ValueError):
+            message = self.message
+        return [(self.action == "escalate" or borderline, self.finding(
+            message, excerpt(text, match.start(), match.end()), value=value
+        ))]
+
+    def finding(self, issue, clause, **extra):
+        return {
+            "rule": self.name,
+            "severity": self.severity,
+            "issue": issue,
+            "clause": clause,
+            "recommendation": self.recommendation,
+            "source": "rule",
+            **extra,
+        }
+
+
+class RuleEngine:
+    """Per-tenant compiled rule sets, rebuilt when the tenant's rules change"""
+
+    scope = "compliance_rules"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # schema_name -> (version, [CompiledRule])
+
+    def get_rules(self, tenant):
+        version = get_version(self.scope, tenant.schema_name)
+        with self._lock:
+            entry = self._entries.get(tenant.schema_name)
+            if version is not None and entry and entry[0] == version:
+                return entry[1]
+
+        rules = self._compile(tenant)
+        if version is not None:
+            with self._lock:
+                self._entries[tenant.schema_name] = (version, rules)
+        return rules
+
+    def _compile(self, tenant):
+        from .models import ComplianceRule
+
+        specs = {spec["name"]: spec for spec in DEFAULT_RULES}
+        for rule in ComplianceRule.objects.filter(tenant=tenant):
+            if not rule.is_active:
+                specs.pop(rule.name, None)
+                continue
+            specs[rule.name] = {
+                "name": rule.name,
+                "rule_type": rule.rule_type,
+                "doc_types": rule.doc_types,
+                "pattern": rule.pattern,
+                "config": rule.config,
+                "severity": rule.severity,
+                "action": rule.action,
+                "message": rule.message,
+                "recommendation": rule.recommendation,
+            }
+
+        rules = []
+        for spec in specs.values():
+            try:
+                rules.append(CompiledRule(spec))
+            except (re.error, KeyError, ValueError) as e:
+                logger.error(f"Skipping invalid compliance rule {spec.get('name')}: {str(e)}")
+        return rules
+
+    def evaluate(self, tenant, text, doc_type):
+        """Returns (findings, escalations)"""
+        findings, escalations = [], []
+        lowered = text.lower()
+        for rule in self.get_rules(tenant):
+            if not rule.applies_to(doc_type):
+                continue
+            try:
+                results = rule.evaluate(text, lowered)
+            except Exception as e:
+                # One broken rule must not fail the whole audit
+                logger.error(f"Compliance rule {rule.name} failed: {str(e)}")
+                continue
+            for escalate, finding in results:
+                (escalations if escalate else findings).append(finding)
+        return findings, escalations
+
+    def invalidate(self, schema_name):
+        bump_version(self.scope, schema_name)
+        with self._lock:
+            self._entries.pop(schema_name, None)
+
+
+rule_engine = RuleEngine()
@@ -0,0 +1,159 @@
+"""
+Bulk resume screening for all candidates of a Job.
+
+start_bulk_screening records an AgentTask and fans the candidates out to
+Celery in chunks (agents.tasks.screen_candidate_chunk); a chord callback
+(finish_bulk_screening) completes the task. Each chunk takes one of the
+tenant's TENANT_CONCURRENCY screening slots before calling Claude, so one
+large job cannot occupy every worker or the tenant's rate limit. Scores are
+written with one bulk_update per chunk.
+"""
+from django.conf import settings
+from django.db import transaction
+from .caching import get_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_SCREENING_SETTINGS = {
+    'CHUNK_SIZE': 10,            # candidates per Celery task
+    'TENANT_CONCURRENCY': 4,     # chunks screened at the same time per tenant
+    'RETRY_DELAY': 5,            # seconds before a chunk without a free slot tries again
+    'MAX_SLOT_RETRIES': 720,     # a chunk still without a slot after this many tries fails
+    'SLOT_TIMEOUT': 900,         # a slot held longer than this (crashed worker) is freed
+    'TOP_K': None,               # default top_k of the bulk screening endpoint (None: everyone)
+}
+
+
+def get_bulk_screening_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_BULK_SCREENING_SETTINGS, **agent_settings.get('BULK_SCREENING', {})}
+
+
+def acquire_slot(schema_name, owner):
+    """Key of a free screening slot of the tenant, or None when all are taken"""
+    screening_settings = get_bulk_screening_settings()
+    cache = get_cache()
+    for slot in range(screening_settings['TENANT_CONCURRENCY']):
+        key = f"agents:screening_slot:{schema_name}:{slot}"
+        if cache.add(key, owner, screening_settings['SLOT_TIMEOUT']):
+            return key
+    return None
+
+
+def release_slot(key, owner):
+    """
+    Free a slot held by owner. A slot that outlived SLOT_TIMEOUT may
+    already belong to another chunk; that one is left alone.
+    """
+    cache = get_cache()
+    if cache.get(key) == owner:
+        cache.delete(key)
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def start_bulk_screening(tenant, job, rescreen=False, top_k=None, force_refresh=False):
+    """
+    Queue screening of the job's candidates (only unscreened ones unless
+    rescreen); stored screening results are reused unless force_refresh.
+    With top_k, all candidates are pre-ranked locally
+    (agents/prerank.py) and only the best top_k of those are sent to Claude.
+    Returns the AgentTask; it is completed at once when there is nothing to
+    screen.
+    """
+    from celery import chord
+    from django.utils import timezone
+    from candidates.models import Candidate
+    from .models import AgentTask
+    from .prerank import prerank_job
+    from .tasks import finish_bulk_screening, screen_candidate_chunk
+
+    candidates = Candidate.objects.filter(job=job)
+    if not rescreen:
+        candidates = candidates.filter(ai_evaluation__isnull=True)
+    candidate_ids = list(candidates.order_by('id').values_list('id', flat=True))
+
+    skipped = 0
+    if top_k:
+        eligible = set(candidate_ids)
+        ranked = [candidate_id for candidate_id, _ in prerank_job(job) if candidate_id in eligible]
+        candidate_ids, skipped = ranked[:top_k], max(len(ranked) - top_k, 0)
+
+    task = AgentTask.objects.create(
+        tenant=tenant,
+        agent_type='recruiting',
+        task_type='bulk_screen',
+        input_data={
+            "job_id": job.id, "rescreen": rescreen, "top_k": top_k,
+            "skipped": skipped, "force_refresh": force_refresh,
+        },
+        progress_total=len(candidate_ids),
+    )
+    if not candidate_ids:
+        AgentTask.objects.filter(id=task.id).update(
+            status='completed', completed_at=timezone.now(),
+            output_data={"job_id": job.id, "screened": 0, "reused": 0, "failed": [], "skipped": skipped}
+        )
+        task.refresh_from_db()
+        return task
+
+    chunks = chunked(candidate_ids, get_bulk_screening_settings()['CHUNK_SIZE'])
+    workflow = chord(
+        [screen_candidate_chunk.s(tenant.id, task.id, job.id, chunk, force_refresh) for chunk in chunks],
+        finish_bulk_screening.s(tenant.id, task.id, job.id)
+    )
+    transaction.on_commit(workflow.delay)
+    return task
+
+
+def screen_chunk(agent, job, candidate_ids, force_refresh=False):
+    """
+    Screen candidates and save their scores in one bulk_update; stored
+    screening results are reused unless force_refresh.
+    Returns {"screened": n, "reused": n, "failed": [{"candidate_id", "error"}]}.
+    """
+    from candidates.models import Candidate
+
+    candidates = list(Candidate.objects.filter(id__in=candidate_ids, job=job).order_by('id'))
+    stored = {} if force_refresh else agent.stored_evaluations(candidates, job)
+
+    screened, fresh, failed = [], [], []
+    for candidate in candidates:
+        try:
+            evaluation = agent.evaluate_candidate(
+                candidate, job, force_refresh=force_refresh, stored=stored, store=False
+            )
+        except Exception as e:
+            logger.error(f"Screening candidate {candidate.id} failed: {str(e)}")
+            evaluation = {"error": str(e)}
+        if "error" in evaluation:
+            failed.append({"candidate_id": candidate.id, "error": evaluation["error"]})
+            continue
+        if candidate.id not in stored:
+            fresh.append((candidate, evaluation))
+        agent.apply_evaluation(candidate, evaluation)
+        screened.append(candidate)
+
+    agent.store_evaluations(fresh, job)
+    Candidate.objects.bulk_update(screened, ['ai_score', 'ai_evaluation'])
+    return {"screened": len(screened), "reused": len(screened) - len(fresh), "failed": failed}
+
+
+def summarize_bulk_screening(job, results, skipped=0, top=10):
+    from candidates.models import Candidate
+
+    failed = [failure for result in results for failure in result["failed"]]
+    return {
+        "job_id": job.id,
+        "screened": sum(result["screened"] for result in results),
+        "reused": sum(result.get("reused", 0) for result in results),  # stored results, no LLM call
+        "failed": failed,
+        "skipped": skipped,  # left out by the pre-ranker (top_k)
+        "top_candidates": list(
+            Candidate.objects.filter(job=job, ai_evaluation__isnull=False)
+            .order_by('-ai_score', 'id').values('id', 'name', 'ai_score', 'prerank_score')[:top]
+        ),
+    }
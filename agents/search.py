@@ -0,0 +1,170 @@
+"""
+Full-text and hybrid search over KnowledgeBase.
+
+KnowledgeBase.search_vector is maintained by a database trigger (migration
+0009): title weighted A, content weighted B, 'english' configuration. It is
+GIN indexed, so a search reads only the matching rows instead of scanning
+every document body.
+
+hybrid_search() ranks passages (KnowledgeChunk) by combining the similarity
+of their hashed term vectors (agents/term_vectors.py, lexical, not semantic)
+with the full-text rank of their document. Documents without passages yet
+are only found by search_documents(unindexed_only=True).
+
+Snippets are cut by ts_headline in the database around the matched terms,
+and document bodies are never loaded, so a result costs the same however
+long the document is.
+"""
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+from .passage_index import chunk_index
+from .term_vectors import get_knowledge_index_settings, term_vector
+import re
+import numpy as np
+
+SEARCH_CONFIG = 'english'
+# ts_rank normalization 32 maps the score to rank / (rank + 1), i.e. 0..1
+RANK_NORMALIZATION = 32
+
+# Short highlighted window for result lists
+SNIPPET_OPTIONS = {'start_sel': '<mark>', 'stop_sel': '</mark>', 'min_words': 15, 'max_words': 35}
+# Several fragments around the matches, used as prompt context
+EXCERPT_OPTIONS = {
+    'start_sel': '**', 'stop_sel': '**',
+    'max_fragments': 4, 'min_words': 20, 'max_words': 60, 'fragment_delimiter': ' ... ',
+}
+
+PREFIX_TERM_RE = re.compile(r'(?<![\w"])([^\W_]+)\*')
+
+
+def build_search_query(text):
+    """
+    Parse user input into a SearchQuery.
+
+    Web-search syntax is supported ("exact phrase", OR, -excluded); terms
+    ending in * match as prefixes (remot* -> remote, remotely). Returns None
+    when nothing searchable is left.
+    """
+    prefixes = PREFIX_TERM_RE.findall(text)
+    remainder = PREFIX_TERM_RE.sub(' ', text).strip()
+
+    query = None
+    if remainder.strip('"- '):
+        query = SearchQuery(remainder, search_type='websearch', config=SEARCH_CONFIG)
+    if prefixes:
+        prefix_query = SearchQuery(
+            ' & '.join(f"{term.lower()}:*" for term in prefixes),
+            search_type='raw',
+            config=SEARCH_CONFIG
+        )
+        query = prefix_query if query is None else query & prefix_query
+    return query
+
+
+def ranked_documents(tenant, text):
+    """Active documents matching text, best first, annotated with `rank`"""
+    from .models import KnowledgeBase
+
+    query = build_search_query(text)
+    if query is None:
+        return KnowledgeBase.objects.none()
+
+    return KnowledgeBase.objects.filter(
+        tenant=tenant,
+        is_active=True,
+        search_vector=query
+    ).annotate(
+        rank=SearchRank(F('search_vector'), query, normalization=RANK_NORMALIZATION)
+    ).order_by('-rank', '-updated_at')
+
+
+def search_documents(tenant, text, limit=5, excerpts=False, unindexed_only=False):
+    """
+    Best matching documents with a highlighted `snippet` (and, with
+    excerpts=True, a longer `excerpt`); `content` is deferred.
+    unindexed_only keeps documents that have no passages (KnowledgeChunk).
+    """
+    query = build_search_query(text)
+    documents = ranked_documents(tenant, text).defer('content', 'search_vector')
+    if unindexed_only:
+        documents = documents.filter(chunks__isnull=True)
+    if query is None:
+        return documents
+
+    documents = documents.annotate(
+        snippet=SearchHeadline('content', query, config=SEARCH_CONFIG, **SNIPPET_OPTIONS)
+    )
+    if excerpts:
+        documents = documents.annotate(
+            excerpt=SearchHeadline('content', query, config=SEARCH_CONFIG, **EXCERPT_OPTIONS)
+        )
+    return documents[:limit]
+
+
+def hybrid_search(tenant, text, limit=None):
+    """
+    Best passages for text as [{"chunk", "score", "passage_score", "keyword_score"}],
+    best first. Empty when the tenant has no indexed chunks.
+    """
+    from .models import KnowledgeChunk
+
+    index_settings = get_knowledge_index_settings()
+    limit = limit or index_settings['TOP_PASSAGES']
+
+    chunk_ids, document_ids, matrix = chunk_index.get(tenant)
+    if not len(chunk_ids):
+        return []
+
+    # Term overlap of the query with each passage (cosine of hashed term vectors)
+    passage_scores = np.clip(matrix @ term_vector(text, matrix.shape[1]), 0.0, None)
+
+    # Full-text rank of each chunk's document, scaled to 0..1 (0 = no match)
+    keyword_scores = np.zeros(len(chunk_ids), dtype=np.float32)
+    ranks = dict(ranked_documents(tenant, text).values_list('id', 'rank')[:100])
+    if ranks:
+        keys = np.array(sorted(ranks), dtype=np.int64)
+        values = np.array([ranks[key] for key in keys], dtype=np.float32)
+        values /= values.max() or 1.0
+        positions = np.searchsorted(keys, document_ids).clip(max=len(keys) - 1)
+        keyword_scores = np.where(keys[positions] == document_ids, values[positions], 0.0)
+
+    weight = index_settings['KEYWORD_WEIGHT']
+    scores = (1 - weight) * passage_scores + weight * keyword_scores
+
+    # Over-fetch so the per-document cap can still fill the limit
+    candidates = min(limit * 4, len(scores))
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    top = top[np.argsort(-scores[top])]
+
+    selected = []
+    per_document = {}
+    for i in top:
+        if scores[i] < index_settings['MIN_SCORE'] or len(selected) >= limit:
+            break
+        document_id = int(document_ids[i])
+        if per_document.get(document_id, 0) >= index_settings['MAX_PASSAGES_PER_DOCUMENT']:
+            continue
+        per_document[document_id] = per_document.get(document_id, 0) + 1
+        selected.append(i)
+
+    chunks = KnowledgeChunk.objects.filter(
+        id__in=[int(chunk_ids[i]) for i in selected],
+        document__is_active=True
+    ).select_related('document').defer('term_vector', 'document__content', 'document__search_vector')
+    query = build_search_query(text)
+    if query is not None:
+        chunks = chunks.annotate(
+            snippet=SearchHeadline('text', query, config=SEARCH_CONFIG, **SNIPPET_OPTIONS)
+        )
+    chunks = chunks.in_bulk()
+
+    return [
+        {
+            "chunk": chunks[int(chunk_ids[i])],
+            "score": float(scores[i]),
+            "passage_score": float(passage_scores[i]),
+            "keyword_score": float(keyword_scores[i]),
+        }
+        for i in selected
+        if int(chunk_ids[i]) in chunks
+    ]
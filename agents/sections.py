@@ -0,0 +1,76 @@
+"""
+Clause-aware splitting of long documents (contracts, handbooks) into
+sections that fit one audit prompt.
+"""
+from .context_window import count_tokens
+import re
+
+# "ARTICLE 4", "Section 2.1", "Clause 7", "12. ...", "3.2) ...", "IV. ..." or an all-caps heading line
+HEADING_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?i:article|section|clause|schedule|annex|appendix|part)\s+[\dIVXLC]+(?:\.\d+)*\b'
+    r'|\d+(?:\.\d+)*[.)][ \t]+\S'
+    r'|[IVXLC]+[.)][ \t]+\S'
+    r'|[A-Z][A-Z0-9 ,&/\'-]{3,80}[ \t]*$'
+    r')',
+    re.MULTILINE
+)
+
+
+def split_clauses(text):
+    """[(heading, clause text)] in document order; heading is '' for text before the first one"""
+    starts = [match.start() for match in HEADING_RE.finditer(text)]
+    headed = set(starts)
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+
+    clauses = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        clause = text[start:end].strip()
+        if clause:
+            heading = clause.splitlines()[0].strip()[:120] if start in headed else ''
+            clauses.append((heading, clause))
+    return clauses
+
+
+def _split_long(text, max_tokens):
+    """Paragraphs, then word windows, for a clause that alone exceeds max_tokens"""
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        words = paragraph.split()
+        # ~0.75 words per token is a safe lower bound for English prose
+        step = max(int(max_tokens * 0.75), 50)
+        pieces += [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+    return pieces
+
+
+def split_sections(text, max_tokens):
+    """
+    Group consecutive clauses into sections of at most ~max_tokens tokens.
+    Returns [{"index", "heading", "text"}]; a clause is only cut when it
+    alone is longer than a section.
+    """
+    sections = []
+    current, current_tokens, heading = [], 0, ''
+
+    def close():
+        nonlocal current, current_tokens, heading
+        if current:
+            sections.append({"index": len(sections), "heading": heading, "text": "\n\n".join(current)})
+        current, current_tokens, heading = [], 0, ''
+
+    for clause_heading, clause in split_clauses(text):
+        pieces = [clause] if count_tokens(clause) <= max_tokens else _split_long(clause, max_tokens)
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                close()
+            if not current:
+                heading = clause_heading
+            current.append(piece)
+            current_tokens += tokens
+    close()
+    return sections
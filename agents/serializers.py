@@ -0,0 +1,23 @@
+from rest_framework import serializers
+from .models import ComplianceRule
+from .rules import CompiledRule
+import re
+
+class ComplianceRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ComplianceRule
+        fields = [
+            'id', 'name', 'rule_type', 'doc_types', 'pattern', 'config',
+            'severity', 'action', 'message', 'recommendation', 'is_active'
+        ]
+
+    def validate(self, attrs):
+        # Compile the rule as the audit will, so a spec that cannot be
+        # evaluated is rejected here rather than skipped at audit time
+        try:
+            CompiledRule(attrs)
+        except re.error as e:
+            raise serializers.ValidationError({"pattern": f"Invalid pattern: {str(e)}"})
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return attrs
@@ -0,0 +1,87 @@
+from django.db import connection, transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from employees.models import Employee
+from departments.models import Department
+from .caching import context_cache, search_cache
+from .compensation import COUNTED_STATUSES, group_of, schedule_band_update
+from .models import ComplianceRule, KnowledgeBase
+from .rules import rule_engine
+
+
+def invalidate_context():
+    # Bump after commit, so no request rebuilds the context from uncommitted rows
+    schema_name = connection.schema_name
+    transaction.on_commit(lambda: context_cache.invalidate(schema_name))
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, created, **kwargs):
+    # Only the headcount is part of the agent context
+    if created:
+        invalidate_context()
+
+
+@receiver(post_delete, sender=Employee)
+def employee_deleted(sender, instance, **kwargs):
+    invalidate_context()
+
+
+@receiver([post_save, post_delete], sender=Department)
+def department_changed(sender, instance, **kwargs):
+    invalidate_context()
+
+
+def band_state(employee):
+    """(group, counted salary) of an employee as the band index sees it"""
+    counted = employee["status"] in COUNTED_STATUSES and employee["salary"] is not None
+    group = group_of(employee["department_id"], employee["position"], employee["contract_type"])
+    return group, employee["salary"] if counted else None
+
+
+BAND_FIELDS = ('department_id', 'position', 'contract_type', 'salary', 'status')
+
+
+@receiver(pre_save, sender=Employee)
+def employee_band_before_save(sender, instance, **kwargs):
+    instance._band_previous = None
+    if instance.pk:
+        instance._band_previous = Employee.objects.filter(pk=instance.pk).values(*BAND_FIELDS).first()
+
+
+@receiver(post_save, sender=Employee)
+def employee_band_saved(sender, instance, created, **kwargs):
+    current = band_state({field: getattr(instance, field) for field in BAND_FIELDS})
+    previous = band_state(instance._band_previous) if getattr(instance, '_band_previous', None) else None
+    if previous == current:
+        return
+    # The group an employee left and the one they joined
+    groups = [group for group, salary in filter(None, (previous, current)) if salary is not None]
+    if groups:
+        schedule_band_update(connection.tenant, groups)
+
+
+@receiver(post_delete, sender=Employee)
+def employee_band_deleted(sender, instance, **kwargs):
+    schedule_band_update(connection.tenant, [group_of(instance.department_id, instance.position, instance.contract_type)])
+
+
+@receiver(post_delete, sender=Department)
+def department_band_deleted(sender, instance, **kwargs):
+    # Its employees were moved to "no department" with a plain UPDATE
+    positions = Employee.objects.filter(department__isnull=True).values_list('position', 'contract_type').distinct()
+    schedule_band_update(connection.tenant, [group_of(None, position, contract_type) for position, contract_type in positions])
+
+
+@receiver([post_save, post_delete], sender=KnowledgeBase)
+def knowledge_changed(sender, instance, **kwargs):
+    # Bump after commit, so no worker caches results of uncommitted rows
+    schema_name = connection.schema_name
+    transaction.on_commit(lambda: search_cache.invalidate(schema_name))
+
+
+@receiver([post_save, post_delete], sender=ComplianceRule)
+def compliance_rule_changed(sender, instance, **kwargs):
+    schema_name = connection.schema_name
+    transaction.on_commit(lambda: rule_engine.invalidate(schema_name))
@@ -1,7 +1,13 @@
-from .base import BaseAgent
+from .base import BaseAgent, FINAL_TOOL_CHOICE
+from .async_base import AsyncBaseAgent
 from .models import ConversationHistory
+from .caching import get_cache
+from .context_window import ConversationWindow
 from django.db import connection
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class SupportAgent(BaseAgent):
     """
@@ -49,32 +55,9 @@ AVAILABLE TOOLS:
 """
         return support_context
     
-    def answer_question(self, employee, question):
-        """
-        Answer an employee question
-        
-        Args:
-            employee: User object
-            question: String question
-            
-        Returns:
-            dict with answer and metadata
-        """
-        connection.set_tenant(self.tenant)
-        
-        # Load conversation history
-        conversation, created = ConversationHistory.objects.get_or_create(
-            tenant=self.tenant,
-            employee=employee
-        )
-        
-        # Build message history
-        messages = conversation.messages + [
-            {"role": "user", "content": question}
-        ]
-        
-        # Define tools
-        tools = [
+    def get_tools(self):
+        """Tool definitions offered to Claude"""
+        return [
             {
                 "name": "lookup_leave_balance",
                 "description": "Get employee's current leave balance",
@@ -123,43 +106,39 @@ AVAILABLE TOOLS:
                 }
             }
         ]
-        
-        # Call Claude (or Mock)
-        prompt = f"""Employee {employee.email} asks:
+    
+    def build_prompt(self, employee, question):
+        return f"""Employee {employee.email} asks:
 
 {question}
 
 Please provide a helpful answer. Use the available tools if needed to look up specific information.
 """
+    
+    def answer_question(self, employee, question):
+        """
+        Answer an employee question
         
-        response = self.call_claude(prompt, tools=tools)
+        Args:
+            employee: User object
+            question: String question
+            
+        Returns:
+            dict with answer and metadata
+        """
+        connection.set_tenant(self.tenant)
         
-        # Handle tool use if not in mock mode (mock mode just returns text for now)
-        answer = self.extract_text_response(response)
-        tool_calls = []
+        # Load the most recent part of the conversation history
+        conversation, history = self._load_conversation(employee)
         
-        if not self.mock_mode:
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_result = self.execute_tool(block.name, block.input)
-                    tool_calls.append({
-                        "tool": block.name,
-                        "input": block.input,
-                        "result": tool_result
-                    })
-                    
-                    # If tool was used, make follow-up call with results
-                    if tool_result:
-                        follow_up = self.call_claude(
-                            f"Tool result: {json.dumps(tool_result)}\n\nPlease provide final answer."
-                        )
-                        answer = self.extract_text_response(follow_up)
+        # Call Claude (or Mock), answering tool requests until a final answer
+        prompt = self.build_prompt(employee, question)
+        response, tool_calls = self.run_tool_loop(
+            prompt, self.get_tools(), messages=self.build_conversation(history, prompt)
+        )
+        answer = self.extract_text_response(response)
         
-        # Update conversation history
-        conversation.messages = messages + [
-            {"role": "assistant", "content": answer}
-        ]
-        conversation.save()
+        self._save_conversation(conversation, question, answer)
         
         return {
             "answer": answer,
@@ -167,6 +146,48 @@ Please provide a helpful answer. Use the available tools if needed to look up sp
             "conversation_id": conversation.id
         }
     
+    def _load_conversation(self, employee):
+        """
+        Returns (conversation, history). history is the rolling summary plus
+        the newest exchanges that fit the HISTORY_WINDOW token budget.
+        """
+        conversation, created = ConversationHistory.objects.get_or_create(
+            tenant=self.tenant,
+            employee=employee
+        )
+        if created:
+            return conversation, []
+        
+        history, summarize_through = ConversationWindow().build(conversation)
+        # A mock summary would replace the real history it stands for
+        if summarize_through and not self.mock_mode:
+            self._schedule_summary(conversation, summarize_through)
+        return conversation, history
+    
+    def _schedule_summary(self, conversation, through_turn):
+        """Queue a summary refresh, at most one in flight per conversation"""
+        from .tasks import summarize_conversation
+        
+        lock_key = f"agents:summarizing:{self.tenant.schema_name}:{conversation.id}"
+        try:
+            if get_cache().add(lock_key, through_turn, 300):
+                summarize_conversation.delay(self.tenant.id, conversation.id, through_turn)
+        except Exception as e:
+            # The window still works without a summary, just with less history
+            logger.warning(f"Could not schedule summary of conversation {conversation.id}: {str(e)}")
+    
+    def build_conversation(self, history, prompt):
+        """Previous exchanges followed by the current question"""
+        # The API rejects empty turns (e.g. an answer that was only tool use)
+        previous = [message for message in history if message["content"]]
+        return previous + self.build_user_messages(prompt)
+    
+    def _save_conversation(self, conversation, question, answer):
+        conversation.append_turn([
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ])
+    
     def execute_tool(self, tool_name, tool_input):
         """Execute tool calls"""
         connection.set_tenant(self.tenant)
@@ -217,3 +238,64 @@ Please provide a helpful answer. Use the available tools if needed to look up sp
             "status": "created",
             "message": "Ticket created. HR will respond within 24 hours."
         }
+
+
+class AsyncSupportAgent(AsyncBaseAgent, SupportAgent):
+    """SupportAgent on the async runtime (used by the ASGI endpoints)"""
+    
+    async def answer_question(self, employee, question):
+        result = None
+        async for event in self.stream_answer(employee, question):
+            if event["type"] == "done":
+                result = event
+        return result
+    
+    async def stream_answer(self, employee, question):
+        """
+        Answer a question as a stream of events (token, tool_call,
+        tool_result, done). Same tool loop as run_tool_loop: every round's
+        tools run concurrently and go back to Claude in one follow-up.
+        History is saved before "done" is emitted.
+        """
+        conversation, history = await self.run_sync(self._load_conversation, employee)
+        
+        prompt = self.build_prompt(employee, question)
+        claude_messages = self.build_conversation(history, prompt)
+        log_message = prompt
+        tool_calls = []
+        max_rounds = self.get_max_tool_rounds()
+        
+        for round_number in range(max_rounds + 1):
+            response = None
+            async for event in self.astream_claude(
+                log_message, tools=self.get_tools(), messages=claude_messages,
+                tool_choice=FINAL_TOOL_CHOICE if round_number == max_rounds else None
+            ):
+                if event["type"] == "token":
+                    yield event
+                elif event["type"] == "message":
+                    response = event["message"]
+            
+            tool_uses = self.get_tool_uses(response)
+            if not tool_uses or round_number == max_rounds:
+                break
+            
+            for block in tool_uses:
+                yield {"type": "tool_call", "tool": block.name, "input": block.input}
+            results = await self.aexecute_tools(tool_uses)
+            for block, result in zip(tool_uses, results):
+                tool_calls.append({"tool": block.name, "input": block.input, "result": result})
+                yield {"type": "tool_result", "tool": block.name, "result": result}
+            
+            claude_messages = claude_messages + self.build_tool_turn(response, tool_uses, results)
+            log_message = f"Tool results: {json.dumps(results, default=str)}"
+        
+        answer = self.extract_text_response(response)
+        await self.run_sync(self._save_conversation, conversation, question, answer)
+        
+        yield {
+            "type": "done",
+            "answer": answer,
+            "tool_calls": tool_calls,
+            "conversation_id": conversation.id
+        }
@@ -1,12 +1,19 @@
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 from django.db import connection
 from tenants.models import Client
 from .support import SupportAgent
 from .recruiting import RecruitingAgent
+from .log_sink import log_sink
 import logging
 
 logger = logging.getLogger(__name__)
 
+@worker_process_shutdown.connect
+def flush_agent_logs(**kwargs):
+    """Prefork children exit without running atexit hooks"""
+    log_sink.shutdown()
+
 @shared_task
 def process_agent_task(tenant_id, agent_type, task_type, input_data):
     """Generic background task for AI agents"""
@@ -17,9 +24,14 @@ def process_agent_task(tenant_id, agent_type, task_type, input_data):
         if agent_type == 'support':
             # Example: Process a complex support query in background
             pass
-        elif agent_type == 'recruiting':
-            # Example: Bulk screen candidates
-            pass
+        elif agent_type == 'recruiting' and task_type == 'bulk_screen':
+            from candidates.models import Job
+            from .screening import start_bulk_screening
+            start_bulk_screening(
+                tenant, Job.objects.get(id=input_data["job_id"]),
+                rescreen=input_data.get("rescreen", False), top_k=input_data.get("top_k"),
+                force_refresh=input_data.get("force_refresh", False)
+            )
             
         logger.info(f"Successfully processed {agent_type} task for tenant {tenant.name}")
         
@@ -39,3 +51,218 @@ def trigger_n8n_webhook(webhook_url, payload):
     except Exception as e:
         logger.error(f"Failed to trigger n8n webhook: {str(e)}")
         return {"error": str(e)}
+
+@shared_task
+def maintain_agent_log_partitions():
+    """Periodic: create upcoming AgentLog partitions and archive expired ones"""
+    from django.core.management import call_command
+    call_command('archive_agent_logs')
+
+@shared_task
+def summarize_conversation(tenant_id, conversation_id, through_turn):
+    """Fold exchanges up to through_turn into a conversation's rolling summary"""
+    from .caching import get_cache
+    from .context_window import build_summary_prompt, get_window_settings
+    from .models import ConversationHistory
+    
+    tenant = Client.objects.get(id=tenant_id)
+    try:
+        connection.set_tenant(tenant)
+        conversation = ConversationHistory.objects.get(id=conversation_id)
+        if through_turn <= conversation.summary_through_turn:
+            return
+        agent = SupportAgent(tenant)
+        if agent.mock_mode:
+            logger.info(f"Not summarizing conversation {conversation_id} in mock mode")
+            return
+        
+        messages = [
+            {"role": row["role"], "content": row["content"]}
+            for row in conversation.message_rows.filter(
+                turn__gt=conversation.summary_through_turn, turn__lte=through_turn
+            ).order_by('turn', 'id').values('role', 'content')
+            if row["content"]
+        ]
+        response = agent.call_claude(
+            build_summary_prompt(conversation.summary, messages),
+            max_tokens=get_window_settings()['SUMMARY_MAX_TOKENS']
+        )
+        summary = agent.extract_text_response(response)
+        
+        # Never replace a summary that already covers more turns
+        ConversationHistory.objects.filter(
+            id=conversation_id, summary_through_turn__lt=through_turn
+        ).update(summary=summary, summary_through_turn=through_turn)
+        logger.info(f"Summarized conversation {conversation_id} through turn {through_turn}")
+    finally:
+        get_cache().delete(f"agents:summarizing:{tenant.schema_name}:{conversation_id}")
+
+@shared_task
+def ingest_knowledge_document(tenant_id, document_id, file_path=None, force=False):
+    """Extract, store and index a KnowledgeBase document's file"""
+    from .ingestion import ingest_file
+    
+    tenant = Client.objects.get(id=tenant_id)
+    status = ingest_file(tenant, document_id, file_path, force=force)
+    logger.info(f"Ingested document {document_id} for tenant {tenant.name}: {status}")
+    return status
+
+@shared_task
+def index_knowledge_documents(tenant_id, document_ids):
+    """Build the passages of KnowledgeBase documents written in bulk"""
+    from .models import KnowledgeBase
+    from .passage_index import index_document
+    
+    tenant = Client.objects.get(id=tenant_id)
+    connection.set_tenant(tenant)
+    
+    chunks = 0
+    for document in KnowledgeBase.objects.filter(tenant=tenant, id__in=document_ids).select_related('tenant'):
+        chunks += index_document(document)
+    logger.info(f"Indexed {len(document_ids)} documents into {chunks} passages for tenant {tenant.name}")
+    return chunks
+
+@shared_task
+def run_compliance_audit(tenant_id, task_id):
+    """Background compliance audit tracked by an AgentTask"""
+    from django.utils import timezone
+    from .compliance import ComplianceAgent
+    from .models import AgentTask
+    
+    tenant = Client.objects.get(id=tenant_id)
+    connection.set_tenant(tenant)
+    task = AgentTask.objects.get(id=task_id)
+    AgentTask.objects.filter(id=task_id).update(status='running')
+    
+    def progress(done, total):
+        AgentTask.objects.filter(id=task_id).update(progress_done=done, progress_total=total)
+    
+    try:
+        result = ComplianceAgent(tenant).audit(
+            task.input_data["document_text"],
+            task.input_data.get("doc_type", "contract"),
+            progress=progress,
+            llm_mode=task.input_data.get("llm_mode")
+        )
+        AgentTask.objects.filter(id=task_id).update(
+            status='completed', output_data=result, completed_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error(f"Compliance audit {task_id} failed: {str(e)}")
+        AgentTask.objects.filter(id=task_id).update(status='failed', error=str(e), completed_at=timezone.now())
+        raise
+
+def failed_chunk(candidate_ids, error):
+    return {
+        "screened": 0, "reused": 0,
+        "failed": [{"candidate_id": candidate_id, "error": error} for candidate_id in candidate_ids],
+    }
+
+@shared_task(bind=True)
+def screen_candidate_chunk(self, tenant_id, task_id, job_id, candidate_ids, force_refresh=False):
+    """
+    Screen a chunk of a bulk screening job once a tenant screening slot is
+    free. A raising chunk would stop the chord callback, so failures
+    (including never getting a slot) are reported as failed candidates.
+    """
+    from django.db.models import F
+    from candidates.models import Job
+    from .models import AgentTask
+    from .screening import acquire_slot, get_bulk_screening_settings, release_slot, screen_chunk
+    
+    tenant = Client.objects.get(id=tenant_id)
+    screening_settings = get_bulk_screening_settings()
+    slot = acquire_slot(tenant.schema_name, self.request.id)
+    if slot is None and self.request.retries < screening_settings['MAX_SLOT_RETRIES']:
+        raise self.retry(countdown=screening_settings['RETRY_DELAY'], max_retries=screening_settings['MAX_SLOT_RETRIES'])
+    
+    connection.set_tenant(tenant)
+    if slot is None:
+        logger.error(f"Bulk screening {task_id} chunk got no screening slot after {self.request.retries} retries")
+        result = failed_chunk(candidate_ids, "No screening slot became free")
+    else:
+        try:
+            AgentTask.objects.filter(id=task_id, status='pending').update(status='running')
+            result = screen_chunk(RecruitingAgent(tenant), Job.objects.get(id=job_id), candidate_ids, force_refresh)
+        except Exception as e:
+            logger.error(f"Bulk screening {task_id} chunk failed: {str(e)}")
+            result = failed_chunk(candidate_ids, str(e))
+        finally:
+            release_slot(slot, self.request.id)
+    
+    AgentTask.objects.filter(id=task_id).update(progress_done=F('progress_done') + len(candidate_ids))
+    return result
+
+@shared_task
+def finish_bulk_screening(results, tenant_id, task_id, job_id):
+    """Chord callback: complete a bulk screening AgentTask"""
+    from django.utils import timezone
+    from candidates.models import Job
+    from .models import AgentTask
+    from .screening import summarize_bulk_screening
+    
+    tenant = Client.objects.get(id=tenant_id)
+    connection.set_tenant(tenant)
+    task = AgentTask.objects.only('input_data').get(id=task_id)
+    output = summarize_bulk_screening(Job.objects.get(id=job_id), results, skipped=task.input_data.get("skipped", 0))
+    AgentTask.objects.filter(id=task_id).update(
+        status='completed', output_data=output, completed_at=timezone.now()
+    )
+    logger.info(f"Bulk screening {task_id} for tenant {tenant.name}: {output['screened']} screened, {len(output['failed'])} failed")
+
+@shared_task(bind=True, max_retries=None)
+def poll_message_batch(self, tenant_id, task_id):
+    """
+    Check a Message Batch; map its results back once it has ended. Retries
+    are bounded by MESSAGE_BATCHES['MAX_WAIT'] from the task's creation,
+    after which the AgentTask is marked failed.
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from .batches import apply_batch_results, get_backend, get_batch_settings
+    from .models import AgentTask
+    
+    tenant = Client.objects.get(id=tenant_id)
+    connection.set_tenant(tenant)
+    task = AgentTask.objects.get(id=task_id)
+    if task.status != 'running':
+        return
+    
+    agent = RecruitingAgent(tenant)
+    batch_settings = get_batch_settings()
+    
+    def retry_or_fail(reason):
+        if timezone.now() - task.created_at > timedelta(seconds=batch_settings['MAX_WAIT']):
+            logger.error(f"Giving up on batch {task.output_data['batch_id']}: {reason}")
+            AgentTask.objects.filter(id=task_id).update(
+                status='failed', error=f"Gave up after {batch_settings['MAX_WAIT']} seconds: {reason}",
+                completed_at=timezone.now()
+            )
+            return
+        raise self.retry(countdown=batch_settings['POLL_INTERVAL'])
+    
+    try:
+        batch = get_backend(agent, task.output_data["backend"]).retrieve(task.output_data["batch_id"])
+    except LookupError as e:
+        AgentTask.objects.filter(id=task_id).update(status='failed', error=str(e), completed_at=timezone.now())
+        return
+    except Exception as e:
+        logger.warning(f"Polling batch {task.output_data['batch_id']} failed: {str(e)}")
+        return retry_or_fail(f"polling failed: {str(e)}")
+    
+    AgentTask.objects.filter(id=task_id).update(
+        progress_done=task.progress_total - batch["request_counts"].get("processing", 0)
+    )
+    if batch["processing_status"] != 'ended':
+        return retry_or_fail(f"batch still {batch['processing_status']}")
+    
+    try:
+        output = apply_batch_results(agent, task)
+    except Exception as e:
+        logger.error(f"Applying batch {task.output_data['batch_id']} failed: {str(e)}")
+        AgentTask.objects.filter(id=task_id).update(status='failed', error=str(e), completed_at=timezone.now())
+        raise
+    AgentTask.objects.filter(id=task_id).update(
+        status='completed', output_data=output, progress_done=task.progress_total, completed_at=timezone.now()
+    )
+    logger.info(f"Batch {output['batch_id']} for tenant {tenant.name} applied ({len(output['failed'])} failed)")
@@ -0,0 +1,107 @@
+"""
+Chunking and hashed term vectors for the knowledge base.
+
+Passages are turned into term vectors in-process with the hashing trick:
+lower-cased word unigrams and bigrams are hashed into a fixed number of
+signed buckets, weighted by log term frequency and L2-normalized. No model
+download or external API is needed, vectors of one tenant can be compared
+with a single matrix product, and they are stored as raw float32 bytes.
+Their similarity only measures shared words and word pairs (a lexical
+signal, like the full-text rank); synonyms and paraphrases do not match.
+"""
+from django.conf import settings
+import re
+import zlib
+import numpy as np
+
+WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+DEFAULT_KNOWLEDGE_INDEX_SETTINGS = {
+    'CHUNK_WORDS': 200,
+    'CHUNK_OVERLAP': 40,
+    'DIMENSIONS': 256,
+    'KEYWORD_WEIGHT': 0.4,       # share of the full-text rank in the hybrid score
+    'TOP_PASSAGES': 6,           # passages sent to Claude
+    'MAX_PASSAGES_PER_DOCUMENT': 2,
+    'MIN_SCORE': 0.1,            # passages below this hybrid score are dropped
+    'MAX_TENANTS': 8,            # tenant matrices kept in memory per process
+}
+
+
+def get_knowledge_index_settings():
+    agent_settings = getattr(settings, 'AGENT_SETTINGS', {})
+    return {**DEFAULT_KNOWLEDGE_INDEX_SETTINGS, **agent_settings.get('KNOWLEDGE_INDEX', {})}
+
+
+def chunk_text(text, size=None, overlap=None):
+    """
+    Split text into passages of about `size` words overlapping by `overlap`
+    words. Paragraphs are kept together where they fit.
+    """
+    index_settings = get_knowledge_index_settings()
+    size = size or index_settings['CHUNK_WORDS']
+    overlap = min(overlap if overlap is not None else index_settings['CHUNK_OVERLAP'], size // 2)
+
+    chunks = []
+    current, fresh = [], 0
+
+    def flush():
+        nonlocal current, fresh
+        chunks.append(" ".join(current))
+        current, fresh = (current[-overlap:] if overlap else []), 0
+
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        words = paragraph.split()
+        while words:
+            room = size - len(current)
+            if len(words) <= room:
+                current += words
+                fresh += len(words)
+                words = []
+            elif fresh and len(words) <= size - overlap:
+                # Start a new passage rather than splitting a paragraph
+                flush()
+            else:
+                current += words[:room]
+                fresh += len(words[:room])
+                words = words[room:]
+                flush()
+    if fresh:
+        flush()
+    return chunks
+
+
+def _features(text):
+    words = WORD_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def term_vectors(texts, dimensions=None):
+    """float32 matrix (len(texts), dimensions), rows L2-normalized"""
+    dimensions = dimensions or get_knowledge_index_settings()['DIMENSIONS']
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+
+    for row, text in enumerate(texts):
+        counts = {}
+        for feature in _features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            hashed = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if hashed & 0x80000000 else -1.0
+            matrix[row, hashed % dimensions] += sign * (1.0 + np.log(count))
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def term_vector(text, dimensions=None):
+    return term_vectors([text], dimensions)[0]
+
+
+def to_bytes(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(data, dtype=np.float32)
@@ -0,0 +1,974 @@
+import anthropic
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+from django.db import connection
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from candidates.models import Candidate, Job
+from departments.models import Department
+from .base import BaseAgent
+from .batches import FakeBatchBackend, apply_batch_results, build_entries, custom_id, parse_custom_id
+from .bulk_ingest import BulkIngestor, ingest_zip
+from .caching import ResponseCache, context_cache, get_version, search_cache
+from .clients import ClientRegistry
+from .compensation import estimate_percentile, percentile
+from .compliance import ComplianceAgent
+from .context_window import ConversationWindow
+from .log_sink import log_sink
+from .models import AgentLog, AgentTask, AgentUsage, ComplianceRule, ConversationHistory, KnowledgeBase
+from .partitions import DEFAULT_PARTITION, ensure_partitions, list_partitions
+from .ingestion import ingest_file
+from .knowledge import KnowledgeAgent
+from .passage_index import index_document
+from .prerank import bm25_scores
+from .rules import rule_engine
+from .screening import acquire_slot, release_slot
+from .sections import split_sections
+from .search import hybrid_search, ranked_documents, search_documents
+from .term_vectors import term_vector, term_vectors
+from .support import SupportAgent
+from .tasks import poll_message_batch, screen_candidate_chunk, summarize_conversation
+from .usage import UsageLedger
+from api.views_agents import agent_usage, compliance_drift, knowledge_ingest_bulk
+
+
+def count_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+class ContextCacheTests(TenantTestCase):
+    def setUp(self):
+        context_cache.invalidate(self.tenant.schema_name)
+
+    def test_builds_once_per_version(self):
+        calls = []
+
+        def builder():
+            calls.append(1)
+            return "static", "dynamic"
+
+        schema_name = self.tenant.schema_name
+        self.assertEqual(context_cache.get_or_build(schema_name, 'support', builder), ("static", "dynamic"))
+        context_cache.get_or_build(schema_name, 'support', builder)
+        self.assertEqual(len(calls), 1)
+
+        context_cache.invalidate(schema_name)
+        context_cache.get_or_build(schema_name, 'support', builder)
+        self.assertEqual(len(calls), 2)
+
+    def test_department_change_invalidates_after_commit(self):
+        self.assertNotIn("Research", BaseAgent(self.tenant).dynamic_context)
+        version = get_version('context', self.tenant.schema_name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name="Research")
+            # Not before the commit: a concurrent rebuild would cache uncommitted data
+            self.assertEqual(get_version('context', self.tenant.schema_name), version)
+
+        self.assertGreater(get_version('context', self.tenant.schema_name), version)
+        self.assertIn("Research", BaseAgent(self.tenant).dynamic_context)
+
+
+class ClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = ClientRegistry()
+        self.addCleanup(self.registry.close)
+
+    def test_one_client_per_api_key(self):
+        client = self.registry.get_client('key-a')
+        self.assertIs(self.registry.get_client('key-a'), client)
+        self.assertIsNot(self.registry.get_client('key-b'), client)
+
+    def test_forked_process_gets_new_clients(self):
+        client = self.registry.get_client('key-a')
+        self.registry._pid = -1  # as seen from a forked child
+        self.assertIsNot(self.registry.get_client('key-a'), client)
+
+    def test_async_clients_are_per_loop_and_closed_with_it(self):
+        async def get_clients():
+            client = self.registry.get_async_client('key-a')
+            self.assertIs(self.registry.get_async_client('key-a'), client)
+            return client
+
+        first = asyncio.run(get_clients())
+        second = asyncio.run(get_clients())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed())
+        self.assertTrue(second.is_closed())
+
+
+class SystemBlockTests(TenantTestCase):
+    def cached(self, blocks):
+        return "cache_control" in blocks[0]
+
+    def test_small_prefix_is_not_marked(self):
+        agent = BaseAgent(self.tenant)
+        self.assertFalse(self.cached(agent.get_system_blocks()))
+
+    def test_prefix_above_the_minimum_is_marked(self):
+        agent = BaseAgent(self.tenant)
+        tools = [{
+            "name": "large_tool",
+            "description": "word " * 5000,
+            "input_schema": {"type": "object", "properties": {}},
+        }]
+        self.assertTrue(self.cached(agent.get_system_blocks(tools)))
+
+        with override_settings(AGENT_SETTINGS={**settings.AGENT_SETTINGS, 'PROMPT_CACHE_MIN_TOKENS': 1}):
+            self.assertTrue(self.cached(agent.get_system_blocks()))
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache()
+
+    def key(self, prompt):
+        return self.cache.make_key('tenant', 'support', 'model', "system", prompt, None, 1024)
+
+    def test_key_depends_on_the_prompt(self):
+        self.assertEqual(self.key("hello"), self.key("hello"))
+        self.assertNotEqual(self.key("hello"), self.key("hello!"))
+
+    def test_second_level_serves_other_processes(self):
+        self.cache.set(self.key("hello"), {"text": "hi"}, 60)
+        self.assertEqual(self.cache.get(self.key("hello")), {"text": "hi"})
+
+        self.cache.clear()  # as seen from another worker
+        self.assertEqual(self.cache.get(self.key("hello")), {"text": "hi"})
+        self.assertIsNone(self.cache.get(self.key("unknown")))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["l2_hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_first_level_is_bounded(self):
+        with override_settings(AGENT_SETTINGS={**settings.AGENT_SETTINGS, 'RESPONSE_CACHE': {'MAX_ENTRIES': 2}}):
+            for prompt in ("a", "b", "c"):
+                self.cache.set(self.key(prompt), prompt, 60)
+            self.assertEqual(self.cache.stats()["entries"], 2)
+            self.assertNotIn(self.key("a"), self.cache._entries)
+
+
+class LogSinkTests(TenantTestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+        spool_settings = override_settings(AGENT_SETTINGS={
+            **settings.AGENT_SETTINGS,
+            'LOG_SINK': {**settings.AGENT_SETTINGS['LOG_SINK'], 'SPOOL_DIR': self.spool_dir},
+        })
+        spool_settings.enable()
+        self.addCleanup(spool_settings.disable)
+
+    def entry(self, action, prompt="prompt"):
+        return AgentLog(
+            tenant=self.tenant, agent_type='support', action=action, prompt=prompt,
+            response="response", metadata={"action": action}, created_at=timezone.now()
+        )
+
+    def test_disabled_sink_writes_immediately(self):
+        log_sink.emit(self.tenant, agent_type='support', action='direct', prompt="p", response="r", metadata={})
+        self.assertTrue(AgentLog.objects.filter(action='direct').exists())
+
+    def test_concurrent_spooling_keeps_lines_whole(self):
+        def spool(n):
+            for i in range(20):
+                log_sink._spool({self.tenant.schema_name: (self.tenant, [self.entry(f"t{n}-{i}", "x" * 20000)])})
+
+        threads = [threading.Thread(target=spool, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(os.path.join(self.spool_dir, f"agentlog-{os.getpid()}.jsonl"), encoding='utf-8') as f:
+            actions = [json.loads(line)["action"] for line in f]
+        self.assertEqual(len(actions), 80)
+
+    def test_spooled_entries_are_replayed(self):
+        log_sink._spool({self.tenant.schema_name: (self.tenant, [self.entry('spooled')])})
+        call_command('replay_agent_log_spool', stdout=StringIO(), stderr=StringIO())
+
+        connection.set_tenant(self.tenant)
+        self.assertEqual(AgentLog.objects.get(action='spooled').metadata, {"action": "spooled"})
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+
+class UsageLedgerTests(TenantTestCase):
+    usage = {"input_tokens": 100, "output_tokens": 20, "cache_read_input_tokens": 50}
+
+    def test_summarize_groups_recorded_calls(self):
+        ledger = UsageLedger()
+        ledger.record(self.tenant, 'support', 'model-a', self.usage, latency_ms=100)
+        ledger.record(self.tenant, 'support', 'model-a', self.usage, latency_ms=300, cached=True)
+        ledger.record(self.tenant, 'hr', 'model-b', self.usage, latency_ms=50)
+
+        today = timezone.now().date()
+        rows = {row['agent_type']: row for row in ledger.summarize(self.tenant, today, today, ['agent_type'])}
+        self.assertEqual(rows['support']['call_count'], 2)
+        self.assertEqual(rows['support']['cached_call_count'], 1)
+        self.assertEqual(rows['support']['input_tokens'], 200)
+        self.assertEqual(rows['support']['avg_latency_ms'], 200)
+        self.assertEqual(rows['hr']['call_count'], 1)
+
+    def test_failed_flush_is_retried(self):
+        ledger = UsageLedger()
+        buffered = override_settings(AGENT_SETTINGS={
+            **settings.AGENT_SETTINGS,
+            'LOG_SINK': {**settings.AGENT_SETTINGS['LOG_SINK'], 'ENABLED': True},
+        })
+        with buffered:
+            ledger.record(self.tenant, 'support', 'model-a', self.usage)
+            with mock.patch.object(ledger, '_apply', side_effect=Exception("database down")):
+                ledger.flush()
+            self.assertFalse(AgentUsage.objects.exists())
+
+            ledger.record(self.tenant, 'support', 'model-a', self.usage)
+            ledger.flush()
+        self.assertEqual(AgentUsage.objects.get().call_count, 2)
+
+    def test_usage_view_rejects_bad_dates(self):
+        factory = APIRequestFactory()
+        user = get_user_model()(email='reporter@example.com')
+
+        def get(**params):
+            request = factory.get('/api/agents/usage/', params)
+            force_authenticate(request, user=user)
+            return agent_usage(request)
+
+        self.assertEqual(get(start='2026-10-01', end='2026-10-31').status_code, 200)
+        self.assertEqual(get(start='yesterday').status_code, 400)
+        self.assertEqual(get(end='2026-02-30').status_code, 400)
+        self.assertEqual(get(start='2026-10-31', end='2026-10-01').status_code, 400)
+
+
+class PartitionTests(TenantTestCase):
+    def test_creates_missing_months_once(self):
+        created = ensure_partitions(months_ahead=1, today=date(2099, 11, 20))
+        self.assertEqual(created, ['agents_agentlog_p2099_11', 'agents_agentlog_p2099_12'])
+        self.assertEqual(ensure_partitions(months_ahead=1, today=date(2099, 11, 20)), [])
+        self.assertIn('agents_agentlog_p2099_12', [name for name, start, end in list_partitions()])
+
+    def test_moves_rows_out_of_the_default_partition(self):
+        # Written while the month had no partition, so they land in the default one
+        created_at = datetime(2099, 3, 15, tzinfo=dt_timezone.utc)
+        for action in ('first', 'second'):
+            AgentLog.objects.create(tenant=self.tenant, agent_type='support', action=action, created_at=created_at)
+        AgentLog.objects.create(
+            tenant=self.tenant, agent_type='support', action='later',
+            created_at=datetime(2099, 5, 1, tzinfo=dt_timezone.utc)
+        )
+
+        self.assertEqual(ensure_partitions(months_ahead=0, today=date(2099, 3, 1)), ['agents_agentlog_p2099_03'])
+        self.assertEqual(count_rows('agents_agentlog_p2099_03'), 2)
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 1)
+        self.assertEqual(AgentLog.objects.filter(created_at__year=2099).count(), 3)
+
+
+class FakeMessages:
+    """
+    Stands in for client.messages: records each request and answers with
+    the text reply(request) returns, or asks for a tool when reply is None
+    """
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.reply:
+            content = [{"type": "text", "text": self.reply(request)}]
+            stop_reason = "end_turn"
+        else:
+            content = [{"type": "tool_use", "id": f"toolu_{len(self.requests)}", "name": "lookup", "input": {}}]
+            stop_reason = "tool_use"
+        return anthropic.types.Message.model_validate({
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 5},
+        })
+
+
+class ToolLoopTests(TenantTestCase):
+    def test_last_round_forbids_tools(self):
+        agent = BaseAgent(self.tenant)
+        agent.mock_mode = False
+        agent.client = mock.Mock(messages=FakeMessages())
+        tools = [{"name": "lookup", "description": "Look something up", "input_schema": {"type": "object", "properties": {}}}]
+
+        with override_settings(AGENT_SETTINGS={**settings.AGENT_SETTINGS, 'MAX_TOOL_ROUNDS': 2}):
+            response, tool_calls = agent.run_tool_loop("Question", tools)
+
+        requests = agent.client.messages.requests
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(len(tool_calls), 2)
+        self.assertNotIn("tool_choice", requests[0])
+        self.assertEqual(requests[-1]["tool_choice"], {"type": "none"})
+        # The final call still carries every tool result
+        self.assertEqual(len(requests[-1]["messages"]), 5)
+
+
+class ConversationPageTests(TenantTestCase):
+    def setUp(self):
+        user = User.objects.create_user(email="employee@example.com", password="secret")
+        self.conversation = ConversationHistory.objects.create(tenant=self.tenant, employee=user)
+        for turn in range(1, 6):
+            self.conversation.append_turn([
+                {"role": "user", "content": f"question {turn}"},
+                {"role": "assistant", "content": f"answer {turn}"},
+            ])
+
+    def turns(self, rows):
+        return sorted({row.turn for row in rows})
+
+    def test_pages_back_from_the_newest_turn(self):
+        rows, before = self.conversation.page(limit=2)
+        self.assertEqual(self.turns(rows), [4, 5])
+        self.assertEqual([row.content for row in rows][:2], ["question 4", "answer 4"])
+        self.assertEqual(before, 4)
+
+        rows, before = self.conversation.page(before_turn=before, limit=2)
+        self.assertEqual(self.turns(rows), [2, 3])
+        self.assertEqual(before, 2)
+
+        rows, before = self.conversation.page(before_turn=before, limit=2)
+        self.assertEqual(self.turns(rows), [1])
+        self.assertIsNone(before)
+
+    def test_limit_is_at_least_one(self):
+        for limit in (0, -5):
+            rows, before = self.conversation.page(limit=limit)
+            self.assertEqual(self.turns(rows), [5])
+            self.assertEqual(before, 5)
+
+    def test_before_turn_past_the_end(self):
+        rows, before = self.conversation.page(before_turn=100, limit=10)
+        self.assertEqual(self.turns(rows), [1, 2, 3, 4, 5])
+        self.assertIsNone(before)
+
+
+class ConversationWindowTests(TenantTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="window@example.com", password="secret")
+        self.conversation = ConversationHistory.objects.create(tenant=self.tenant, employee=self.user)
+        for turn in range(1, 5):
+            self.conversation.append_turn([
+                {"role": "user", "content": f"question {turn} " + "word " * 100},
+                {"role": "assistant", "content": f"answer {turn} " + "word " * 100},
+            ])
+
+    def test_everything_fits(self):
+        messages, summarize_through = ConversationWindow(budget_tokens=10000).build(self.conversation)
+        self.assertEqual(len(messages), 8)
+        self.assertIsNone(summarize_through)
+
+    def test_keeps_the_newest_turns_within_budget(self):
+        messages, summarize_through = ConversationWindow(budget_tokens=450).build(self.conversation)
+        self.assertEqual(len(messages), 4)
+        self.assertTrue(messages[0]["content"].startswith("question 3"))
+        self.assertEqual(summarize_through, 2)
+
+    def test_summary_replaces_older_turns(self):
+        self.conversation.summary = "The employee asked about leave."
+        self.conversation.summary_through_turn = 2
+        self.conversation.save()
+
+        messages, summarize_through = ConversationWindow(budget_tokens=10000).build(self.conversation)
+        self.assertIn("asked about leave", messages[0]["content"])
+        self.assertEqual(len(messages), 2 + 4)
+        self.assertIsNone(summarize_through)
+
+    def test_mock_mode_does_not_summarize(self):
+        with override_settings(AGENT_SETTINGS={**settings.AGENT_SETTINGS, 'HISTORY_WINDOW': {'TOKEN_BUDGET': 450}}):
+            with mock.patch.object(summarize_conversation, 'delay') as delay:
+                SupportAgent(self.tenant)._load_conversation(self.user)
+            delay.assert_not_called()
+
+        summarize_conversation(self.tenant.id, self.conversation.id, 2)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summary, "")
+        self.assertEqual(self.conversation.summary_through_turn, 0)
+
+
+class FullTextSearchTests(TenantTestCase):
+    def setUp(self):
+        self.remote = KnowledgeBase.objects.create(
+            tenant=self.tenant, title="Remote work policy",
+            content="Employees may work remotely up to three days a week."
+        )
+        self.expenses = KnowledgeBase.objects.create(
+            tenant=self.tenant, title="Expense policy",
+            content="Travel to remote offices is reimbursed within 30 days."
+        )
+        KnowledgeBase.objects.create(
+            tenant=self.tenant, title="Old remote policy", content="Remote work is not allowed.", is_active=False
+        )
+
+    def titles(self, text):
+        return [document.title for document in ranked_documents(self.tenant, text)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles("remote"), ["Remote work policy", "Expense policy"])
+
+    def test_prefix_terms(self):
+        self.assertEqual(self.titles("reimburs*"), ["Expense policy"])
+        self.assertEqual(self.titles("remot* week"), ["Remote work policy"])
+
+    def test_excluded_terms_and_phrases(self):
+        self.assertEqual(self.titles("policy -travel"), ["Remote work policy"])
+        self.assertEqual(self.titles('"remote offices"'), ["Expense policy"])
+
+    def test_nothing_searchable(self):
+        self.assertEqual(self.titles('- ""'), [])
+
+
+class HybridSearchTests(TenantTestCase):
+    def setUp(self):
+        self.parental = self.document(
+            "Parental leave",
+            "Parents receive sixteen weeks of paid parental leave.\n\n" + "Unrelated filler text. " * 100
+        )
+        self.sick = self.document("Sick days", "Employees receive ten sick days per year.")
+        with self.captureOnCommitCallbacks(execute=True):
+            index_document(self.parental)
+            index_document(self.sick)
+        # Not split into passages yet
+        self.unindexed = self.document("Leave calendar", "Parental leave requests are planned in the leave calendar.")
+
+    def document(self, title, content):
+        return KnowledgeBase.objects.create(tenant=self.tenant, title=title, content=content)
+
+    def test_term_vectors_measure_shared_words(self):
+        query = term_vector("paid parental leave")
+        close, far = term_vectors(["weeks of paid parental leave", "sick days per year"])
+        self.assertGreater(query @ close, query @ far)
+        self.assertAlmostEqual(float(close @ close), 1.0, places=5)
+
+    def test_best_passage_first(self):
+        results = hybrid_search(self.tenant, "paid parental leave")
+        self.assertEqual(results[0]["chunk"].document_id, self.parental.id)
+        self.assertGreater(results[0]["passage_score"], 0)
+        self.assertNotIn(self.unindexed.id, [result["chunk"].document_id for result in results])
+
+    def test_unindexed_documents_come_after_indexed_ones(self):
+        results, context_text = KnowledgeAgent(self.tenant)._find_documents("parental leave", limit=5)
+        self.assertEqual([result["id"] for result in results][:2], [self.parental.id, self.unindexed.id])
+        self.assertIn("Leave calendar", context_text)
+
+    def test_context_only_holds_returned_documents(self):
+        results, context_text = KnowledgeAgent(self.tenant)._find_documents("parental leave", limit=1)
+        self.assertEqual([result["id"] for result in results], [self.parental.id])
+        self.assertIn("Parental leave (passage 1)", context_text)
+        self.assertNotIn("Leave calendar", context_text)
+
+
+class IngestionTests(TenantTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.write("handbook.txt", "Employees receive ten sick days per year.")
+        self.document = KnowledgeBase.objects.create(
+            tenant=self.tenant, title="Handbook", content="", ingest_status='pending'
+        )
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_extracts_and_indexes_text(self):
+        self.assertEqual(ingest_file(self.tenant, self.document.id, self.path), 'ready')
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.content, "Employees receive ten sick days per year.")
+        self.assertEqual(len(self.document.content_hash), 64)
+        self.assertEqual(self.document.chunks.count(), 1)
+
+    def test_unchanged_file_is_skipped(self):
+        ingest_file(self.tenant, self.document.id, self.path)
+        self.assertEqual(ingest_file(self.tenant, self.document.id, self.path), 'skipped')
+        self.assertEqual(ingest_file(self.tenant, self.document.id, self.path, force=True), 'ready')
+
+        self.write("handbook.txt", "Employees receive twelve sick days per year.")
+        self.assertEqual(ingest_file(self.tenant, self.document.id, self.path), 'ready')
+        self.document.refresh_from_db()
+        self.assertIn("twelve", self.document.content)
+
+    def test_failure_is_recorded(self):
+        self.assertEqual(ingest_file(self.tenant, self.document.id, os.path.join(self.directory, "missing.txt")), 'failed')
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.ingest_status, 'failed')
+        self.assertTrue(self.document.ingest_error)
+
+
+class SnippetTests(TenantTestCase):
+    def setUp(self):
+        KnowledgeBase.objects.create(
+            tenant=self.tenant, title="Travel policy",
+            content=("Filler sentence about nothing in particular. " * 200)
+            + "Hotel costs are reimbursed up to a nightly limit. "
+            + ("More filler about other topics. " * 200)
+        )
+
+    def test_snippets_are_cut_around_the_match(self):
+        document = search_documents(self.tenant, "hotel")[0]
+        self.assertIn("<mark>Hotel</mark>", document.snippet)
+        self.assertLess(len(document.snippet.split()), 40)
+        self.assertIn('content', document.get_deferred_fields())
+        self.assertFalse(hasattr(document, 'excerpt'))
+
+    def test_excerpts_for_the_prompt(self):
+        document = search_documents(self.tenant, "hotel", excerpts=True)[0]
+        self.assertIn("**Hotel**", document.excerpt)
+
+    def test_results_use_the_snippet(self):
+        results, context_text = KnowledgeAgent(self.tenant)._find_documents("hotel")
+        self.assertIn("<mark>Hotel</mark>", results[0]["snippet"])
+        self.assertIn("**Hotel**", context_text)
+
+
+class SearchCacheTests(TenantTestCase):
+    def setUp(self):
+        search_cache.invalidate(self.tenant.schema_name)
+        KnowledgeBase.objects.create(tenant=self.tenant, title="Remote work", content="Work remotely twice a week.")
+        self.agent = KnowledgeAgent(self.tenant)
+
+    def test_normalizes_case_and_punctuation_only(self):
+        self.assertEqual(search_cache.normalize("  Remote, WORK? "), "remote work")
+        self.assertEqual(search_cache.normalize('"remote work" -office'), '"remote work" -office')
+
+    def test_repeated_query_is_served_from_cache(self):
+        with mock.patch.object(KnowledgeAgent, '_search_knowledge', wraps=self.agent._search_knowledge) as search:
+            first = self.agent.search_knowledge("Remote work")
+            second = self.agent.search_knowledge("remote work?")
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual(second["results"], first["results"])
+        self.assertEqual(second["query"], "remote work?")
+
+    def test_document_change_invalidates_after_commit(self):
+        self.agent.search_knowledge("remote")
+        with self.captureOnCommitCallbacks(execute=True):
+            KnowledgeBase.objects.create(tenant=self.tenant, title="Remote equipment", content="Laptops for remote staff.")
+            self.assertEqual(len(self.agent.search_knowledge("remote")["results"]), 1)
+
+        self.assertEqual(len(self.agent.search_knowledge("remote")["results"]), 2)
+
+
+def zip_bytes(files):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+class BulkIngestTests(TenantTestCase):
+    def ingest(self, files):
+        ingestor = BulkIngestor(self.tenant, category="Handbook")
+        ingest_zip(ingestor, BytesIO(zip_bytes(files)))
+        return ingestor.finish()
+
+    def test_reports_each_entry(self):
+        report = self.ingest({"leave_policy.txt": "Ten days of leave.", "notes.md": "Notes.", "logo.png": "binary"})
+        self.assertEqual(report["counts"], {"created": 2, "error": 1})
+        document = KnowledgeBase.objects.get(title="leave policy")
+        self.assertEqual(document.category, "Handbook")
+
+        report = self.ingest({"leave_policy.txt": "Ten days of leave.", "notes.md": "New notes."})
+        self.assertEqual(report["counts"], {"unchanged": 1, "updated": 1})
+
+    def test_changed_content_drops_stale_passages(self):
+        self.ingest({"leave_policy.txt": "Ten days of leave."})
+        document = KnowledgeBase.objects.get(title="leave policy")
+        with self.captureOnCommitCallbacks(execute=True):
+            index_document(document)
+        self.assertEqual(document.chunks.count(), 1)
+
+        self.ingest({"leave_policy.txt": "Twelve days of leave."})
+        self.assertEqual(document.chunks.count(), 0)
+
+    def test_oversized_archive_is_refused(self):
+        body = zip_bytes({"handbook.txt": "word " * 1000})
+        request = APIRequestFactory().post(
+            '/api/agents/knowledge/ingest/bulk/', data=body, content_type='application/zip'
+        )
+        force_authenticate(request, user=get_user_model()(email='admin@example.com'))
+
+        bulk_settings = {**settings.AGENT_SETTINGS, 'BULK_INGEST': {'MAX_ARCHIVE_BYTES': len(body) - 1}}
+        with override_settings(AGENT_SETTINGS=bulk_settings):
+            response = knowledge_ingest_bulk(request)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(KnowledgeBase.objects.exists())
+
+
+class MapReduceAuditTests(TenantTestCase):
+    document = "\n\n".join(
+        f"ARTICLE {number}\n" + f"The employee works long hours in role {number}. " * 8
+        for number in (1, 2, 3)
+    )
+
+    def setUp(self):
+        self.agent = ComplianceAgent(self.tenant)
+        self.agent.mock_mode = False
+        self.agent.client = mock.Mock(messages=FakeMessages(self.reply))
+        # Section audits run in pool threads, outside the test transaction
+        log_patch = mock.patch.object(self.agent, 'log_interaction')
+        log_patch.start()
+        self.addCleanup(log_patch.stop)
+
+    def reply(self, request):
+        prompt = request["messages"][0]["content"]
+        if "You are auditing section" in prompt:
+            return '[{"issue": "Unpaid overtime", "severity": "high", "clause": "long hours"}]'
+        return "Merged report"
+
+    def prompts(self):
+        return [request["messages"][0]["content"] for request in self.agent.client.messages.requests]
+
+    def test_sections_keep_clauses_whole(self):
+        sections = split_sections(self.document, 150)
+        self.assertEqual([section["heading"] for section in sections], ["ARTICLE 1", "ARTICLE 2", "ARTICLE 3"])
+        self.assertEqual(len(split_sections(self.document, 10000)), 1)
+
+    def test_sections_are_audited_then_merged(self):
+        progress = []
+        audit_settings = {**settings.AGENT_SETTINGS, 'COMPLIANCE_AUDIT': {'SECTION_TOKENS': 150, 'WORKERS': 2}}
+        with override_settings(AGENT_SETTINGS=audit_settings):
+            report = self.agent.llm_audit(self.document, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(report, "Merged report")
+        section_prompts = [prompt for prompt in self.prompts() if "You are auditing section" in prompt]
+        self.assertEqual(len(section_prompts), 3)
+        reduce_prompt = self.prompts()[-1]
+        self.assertIn("Unpaid overtime", reduce_prompt)
+        self.assertIn("3. ARTICLE 3", reduce_prompt)
+        self.assertEqual(progress[-1], (4, 4))
+
+    def test_free_text_findings_are_kept(self):
+        findings = self.agent.parse_findings("The overtime clause is unclear.", {"index": 1, "heading": "ARTICLE 2"})
+        self.assertEqual(findings, [{
+            "section": 2, "heading": "ARTICLE 2", "issue": "The overtime clause is unclear.", "severity": "unknown"
+        }])
+
+
+class RuleEngineTests(TenantTestCase):
+    def setUp(self):
+        rule_engine.invalidate(self.tenant.schema_name)
+
+    def rules_hit(self, text, doc_type='contract'):
+        findings, escalations = rule_engine.evaluate(self.tenant, text, doc_type)
+        return {finding["rule"] for finding in findings}, {finding["rule"] for finding in escalations}
+
+    def test_weekly_hours_threshold(self):
+        findings, escalations = self.rules_hit("The employee works 60 hours per week.")
+        self.assertIn('max_weekly_hours', findings)
+
+        findings, escalations = self.rules_hit("The employee works 50 hours per week.")
+        self.assertIn('max_weekly_hours', escalations)  # within the margin
+
+        findings, escalations = self.rules_hit("The employee works 40 hours per week.")
+        self.assertNotIn('max_weekly_hours', findings | escalations)
+
+    def test_pto_waiver_needs_waiving_language(self):
+        for text in (
+            "The employee waives all paid time off.",
+            "The employee shall not be entitled to paid vacation.",
+            "Employment is without any entitlement to annual leave.",
+        ):
+            findings, escalations = self.rules_hit(text)
+            self.assertIn('pto_waiver', escalations, text)
+
+        for text in (
+            "The employee receives no less than 25 days of paid vacation.",
+            "No approval is needed for holidays.",
+        ):
+            findings, escalations = self.rules_hit(text)
+            self.assertNotIn('pto_waiver', findings | escalations, text)
+
+    def test_compliance_agent_example(self):
+        # The sample contract of test_compliance_agent.py
+        findings, escalations = self.rules_hit(
+            "This contract dictates that the employee will work 100 hours per week and has no right to PTO."
+        )
+        self.assertIn('max_weekly_hours', findings)
+        self.assertIn('pto_waiver', escalations)
+
+    def test_required_clauses_only_for_their_doc_types(self):
+        findings, escalations = self.rules_hit("Short agreement.")
+        self.assertIn('termination_clause', findings)
+
+        findings, escalations = self.rules_hit("Short policy.", doc_type='policy')
+        self.assertNotIn('termination_clause', findings)
+
+    def test_tenant_rules_replace_and_disable_defaults(self):
+        ComplianceRule.objects.create(
+            tenant=self.tenant, name='non_compete', rule_type='keyword', is_active=False,
+            config={"keywords": ["non-compete"]}, message="Non-compete"
+        )
+        ComplianceRule.objects.create(
+            tenant=self.tenant, name='probation', rule_type='keyword', severity='low',
+            config={"keywords": ["probation"]}, message="Probation period"
+        )
+        rule_engine.invalidate(self.tenant.schema_name)
+
+        findings, escalations = self.rules_hit("A probation period and a non-compete clause.")
+        self.assertIn('probation', findings)
+        self.assertNotIn('non_compete', findings | escalations)
+
+    def test_invalid_rule_is_skipped(self):
+        ComplianceRule.objects.create(
+            tenant=self.tenant, name='broken', rule_type='regex', pattern='(unclosed',
+            message="Broken"
+        )
+        rule_engine.invalidate(self.tenant.schema_name)
+
+        findings, escalations = self.rules_hit("The employee works 60 hours per week.")
+        self.assertIn('max_weekly_hours', findings)
+        self.assertNotIn('broken', findings | escalations)
+
+
+class CompensationTests(SimpleTestCase):
+    def test_percentile_interpolates(self):
+        values = [10.0, 20.0, 30.0, 40.0]
+        self.assertEqual(percentile(values, 0), 10.0)
+        self.assertEqual(percentile(values, 50), 25.0)
+        self.assertEqual(percentile(values, 100), 40.0)
+        self.assertEqual(percentile([7.0], 90), 7.0)
+
+    def test_estimate_percentile(self):
+        band = SimpleNamespace(min_salary=100, p10=110, p25=125, p50=150, p75=175, p90=190, max_salary=200)
+        self.assertEqual(estimate_percentile(band, 90), 0.0)
+        self.assertEqual(estimate_percentile(band, 150), 50.0)
+        self.assertEqual(estimate_percentile(band, 162.5), 62.5)
+        self.assertEqual(estimate_percentile(band, 250), 100.0)
+
+    def test_estimate_percentile_flat_band(self):
+        band = SimpleNamespace(min_salary=100, p10=100, p25=100, p50=100, p75=100, p90=100, max_salary=100)
+        self.assertEqual(estimate_percentile(band, 100), 0.0)
+        self.assertEqual(estimate_percentile(band, 101), 100.0)
+
+
+class DriftRequestTests(TenantTestCase):
+    def post(self, data):
+        request = APIRequestFactory().post('/api/agents/compliance/drift/', data, format='json')
+        force_authenticate(request, user=get_user_model()(email='hr@example.com'))
+        return compliance_drift(request)
+
+    def test_employee_id_must_be_an_integer(self):
+        response = self.post({"employee_id": "abc", "field": "salary", "new_value": 50000})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "employee_id must be an integer, got 'abc'")
+
+    def test_explain_takes_the_same_modes_in_bulk(self):
+        response = self.post({"changes": [{"employee_id": 1, "salary": 50000}], "explain": "true"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post({"changes": [{"employee_id": "x1", "salary": 50000}], "explain": "drift"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["issues"], ["employee_id must be an integer, got 'x1'"])
+
+
+class ScreeningSlotTests(SimpleTestCase):
+    def test_release_only_frees_own_slot(self):
+        slot = acquire_slot('slot_test', 'chunk-a')
+        self.assertIsNotNone(slot)
+
+        # The slot expired and another chunk took it over
+        release_slot(slot, 'chunk-b')
+        self.assertNotEqual(acquire_slot('slot_test', 'chunk-c'), slot)
+
+        release_slot(slot, 'chunk-a')
+        self.assertEqual(acquire_slot('slot_test', 'chunk-c'), slot)
+
+
+class ScreeningChunkTests(TenantTestCase):
+    def test_chunk_without_a_slot_fails_its_candidates(self):
+        task = AgentTask.objects.create(
+            tenant=self.tenant, agent_type='recruiting', task_type='bulk_screening', input_data={}, progress_total=2
+        )
+        screening_settings = {**settings.AGENT_SETTINGS, 'BULK_SCREENING': {'TENANT_CONCURRENCY': 1, 'MAX_SLOT_RETRIES': 0}}
+        with override_settings(AGENT_SETTINGS=screening_settings):
+            slot = acquire_slot(self.tenant.schema_name, 'busy')
+            self.addCleanup(release_slot, slot, 'busy')
+            result = screen_candidate_chunk.apply(args=(self.tenant.id, task.id, 0, [1, 2])).get()
+
+        self.assertEqual([failure["candidate_id"] for failure in result["failed"]], [1, 2])
+        task.refresh_from_db()
+        self.assertEqual(task.progress_done, 2)
+
+
+class CustomIdTests(SimpleTestCase):
+    def test_round_trip(self):
+        self.assertEqual(parse_custom_id(custom_id('screen', 42)), ('screen', 42))
+        self.assertEqual(parse_custom_id('batch-outreach-7'), ('batch-outreach', 7))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_custom_id('screen-abc')
+
+
+class BatchResultTests(TenantTestCase):
+    def setUp(self):
+        from .recruiting import RecruitingAgent
+
+        self.agent = RecruitingAgent(self.tenant)
+        self.job = Job.objects.create(
+            title="Backend developer", location="Remote", requirements="Python", description="APIs"
+        )
+        self.candidates = [
+            Candidate.objects.create(name=f"Candidate {i}", email=f"c{i}@example.com", resume_text="Python", job=self.job)
+            for i in range(3)
+        ]
+
+    def batch_task(self, kind, entries):
+        backend = FakeBatchBackend()
+        return AgentTask.objects.create(
+            tenant=self.tenant, agent_type='recruiting', task_type=f"batch_{kind}",
+            input_data={"job_id": self.job.id, "kind": kind, "candidate_ids": [c.id for c in self.candidates]},
+            output_data={"job_id": self.job.id, "kind": kind, "batch_id": backend.create(entries), "backend": backend.name},
+        )
+
+    def test_screening_results_are_saved(self):
+        task = self.batch_task('screen', build_entries(self.agent, 'screen', self.job, self.candidates))
+
+        output = apply_batch_results(self.agent, task)
+
+        self.assertEqual(output["screened"], 3)
+        self.assertEqual(output["failed"], [])
+        for candidate in Candidate.objects.filter(job=self.job):
+            self.assertEqual(candidate.ai_score, 85)
+            self.assertIsNotNone(candidate.ai_evaluation)
+
+    def test_outreach_drafts_are_returned(self):
+        task = self.batch_task('outreach', build_entries(self.agent, 'outreach', self.job, self.candidates))
+
+        output = apply_batch_results(self.agent, task)
+
+        self.assertEqual(sorted(output["drafts"]), sorted(str(c.id) for c in self.candidates))
+
+    def test_unparseable_and_unknown_results_are_skipped(self):
+        entries = build_entries(self.agent, 'screen', self.job, self.candidates[:1])
+        entries[0]["mock_text"] = "not json"
+        entries.append({"custom_id": "garbage", "mock_text": "{}"})
+        entries.append({"custom_id": custom_id('screen', 999999), "mock_text": "{}"})
+        task = self.batch_task('screen', entries)
+
+        output = apply_batch_results(self.agent, task)
+
+        self.assertEqual(output["screened"], 0)
+        self.assertEqual([failure["candidate_id"] for failure in output["failed"]], [self.candidates[0].id])
+
+    def test_polling_completes_an_ended_batch(self):
+        with override_settings(AGENT_SETTINGS={**settings.AGENT_SETTINGS, 'MESSAGE_BATCHES': {'FAKE_DURATION': 0}}):
+            task = self.batch_task('screen', build_entries(self.agent, 'screen', self.job, self.candidates))
+            AgentTask.objects.filter(id=task.id).update(status='running')
+            poll_message_batch.apply(args=(self.tenant.id, task.id))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.output_data["screened"], 3)
+
+    def test_polling_gives_up_after_max_wait(self):
+        task = self.batch_task('screen', build_entries(self.agent, 'screen', self.job, self.candidates))
+        AgentTask.objects.filter(id=task.id).update(
+            status='running', created_at=timezone.now() - timedelta(days=2)
+        )
+
+        poll_message_batch.apply(args=(self.tenant.id, task.id))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn("batch still in_progress", task.error)
+        self.assertIsNotNone(task.completed_at)
+
+
+class PrerankTests(SimpleTestCase):
+    def test_more_matching_terms_rank_higher(self):
+        query = {"python": 1.0, "django": 1.0, "postgres": 1.0}
+        scores = bm25_scores(query, [
+            ["python", "django", "postgres"],
+            ["python", "java"],
+            ["cooking", "gardening"],
+        ])
+        self.assertGreater(scores[0], scores[1])
+        self.assertGreater(scores[1], 0)
+        self.assertEqual(scores[2], 0)
+        self.assertLessEqual(scores.max(), 100)
+
+    def test_weights_favour_heavier_terms(self):
+        scores = bm25_scores({"python": 2.0, "java": 0.5}, [["python"], ["java"]])
+        self.assertGreater(scores[0], scores[1])
+
+    def test_empty_inputs(self):
+        self.assertEqual(len(bm25_scores({"python": 1.0}, [])), 0)
+        self.assertEqual(list(bm25_scores({}, [["python"]])), [0])
+        self.assertEqual(list(bm25_scores({"python": 1.0}, [[], ["java"]])), [0, 0])
+
+
+class ScreeningReuseTests(TenantTestCase):
+    def setUp(self):
+        from .recruiting import RecruitingAgent
+
+        self.agent = RecruitingAgent(self.tenant)
+        self.agent.mock_mode = False
+        self.agent.client = mock.Mock(messages=FakeMessages(lambda request: '{"score": 70, "recommendation": "interview"}'))
+        self.job = Job.objects.create(title="Data engineer", location="Remote", requirements="SQL", description="ETL")
+        self.candidate = Candidate.objects.create(
+            name="Ada", email="ada@example.com", resume_text="SQL and Python", job=self.job
+        )
+
+    def calls(self):
+        return len(self.agent.client.messages.requests)
+
+    def test_unchanged_inputs_reuse_the_stored_evaluation(self):
+        self.assertEqual(self.agent.evaluate_candidate(self.candidate, self.job)["score"], 70)
+        self.agent.evaluate_candidate(self.candidate, self.job)
+        self.assertEqual(self.calls(), 1)
+
+        # Not part of the prompt, so not part of the fingerprint
+        self.candidate.email = "ada@example.org"
+        self.agent.evaluate_candidate(self.candidate, self.job)
+        self.assertEqual(self.calls(), 1)
+        self.assertNotIn("ada@example.org", self.agent.build_screening_prompt(self.candidate, self.job))
+
+        self.agent.evaluate_candidate(self.candidate, self.job, force_refresh=True)
+        self.assertEqual(self.calls(), 2)
+
+    def test_changed_resume_or_requirements_are_screened_again(self):
+        self.agent.evaluate_candidate(self.candidate, self.job)
+
+        self.candidate.resume_text = "SQL, Python and Spark"
+        self.agent.evaluate_candidate(self.candidate, self.job)
+        self.assertEqual(self.calls(), 2)
+
+        self.job.requirements = "SQL and Spark"
+        self.agent.evaluate_candidate(self.candidate, self.job)
+        self.assertEqual(self.calls(), 3)
+
+    def test_whitespace_does_not_change_the_fingerprint(self):
+        fingerprint = self.agent.screening_fingerprint(self.candidate, self.job)
+        self.candidate.resume_text = "SQL  and\nPython "
+        self.assertEqual(self.agent.screening_fingerprint(self.candidate, self.job), fingerprint)
@@ -0,0 +1,166 @@
+from collections import Counter
+from django.conf import settings
+from django.db import connection, IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .log_sink import log_sink, get_log_sink_settings
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = [
+    'call_count',
+    'cached_call_count',
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens',
+    'latency_ms_sum',
+]
+
+GROUP_FIELDS = ['day', 'agent_type', 'model']
+
+
+def get_model_pricing(model):
+    """USD per million tokens for a model (AGENT_SETTINGS['PRICING'])"""
+    pricing = getattr(settings, 'AGENT_SETTINGS', {}).get('PRICING', {})
+    return pricing.get(model) or pricing.get('default') or {}
+
+
+def estimate_cost(model, row):
+    price = get_model_pricing(model)
+    return (
+        row['input_tokens'] * price.get('input', 0)
+        + row['output_tokens'] * price.get('output', 0)
+        + row['cache_creation_input_tokens'] * price.get('cache_write', 0)
+        + row['cache_read_input_tokens'] * price.get('cache_read', 0)
+    ) / 1_000_000
+
+
+class UsageLedger:
+    """
+    Per-tenant, per-agent, per-model, per-day usage counters.
+
+    Calls only bump in-memory counters; the AgentLog sink's flush thread
+    folds them into AgentUsage rows with one UPDATE ... SET x = x + n per
+    bucket. Reports then read O(days x agents x models) rows instead of
+    parsing AgentLog metadata. Counters lag by at most one flush interval.
+    """
+
+    def __init__(self):
+        self._after_fork()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (schema, day, agent_type, model) -> (tenant, Counter)
+        self._pid = os.getpid()
+
+    def record(self, tenant, agent_type, model, usage, latency_ms=None, cached=False):
+        deltas = Counter({
+            'call_count': 1,
+            'cached_call_count': 1 if cached else 0,
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+            'cache_creation_input_tokens': usage.get('cache_creation_input_tokens', 0),
+            'cache_read_input_tokens': usage.get('cache_read_input_tokens', 0),
+            'latency_ms_sum': latency_ms or 0,
+        })
+        key = (tenant.schema_name, timezone.now().date(), agent_type, model)
+
+        if not get_log_sink_settings()['ENABLED']:
+            self._apply(tenant, key, deltas)
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pending = {}
+                self._pid = os.getpid()
+            self._pending.setdefault(key, (tenant, Counter()))[1].update(deltas)
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        failed = {}
+        for key, (tenant, deltas) in pending.items():
+            try:
+                self._apply(tenant, key, deltas)
+            except Exception as e:
+                logger.error(f"Could not write usage counters for {key}, retrying on the next flush: {str(e)}")
+                failed[key] = (tenant, deltas)
+
+        if failed:
+            # Each bucket is written in one statement, so a failed one wrote
+            # nothing: merge it back into what was recorded in the meantime
+            with self._lock:
+                if self._pid == os.getpid():
+                    for key, (tenant, deltas) in failed.items():
+                        self._pending.setdefault(key, (tenant, Counter()))[1].update(deltas)
+
+    def _apply(self, tenant, key, deltas):
+        from .models import AgentUsage
+
+        schema_name, day, agent_type, model = key
+        connection.set_tenant(tenant)
+        bucket = AgentUsage.objects.filter(tenant=tenant, day=day, agent_type=agent_type, model=model)
+        increments = {field: F(field) + deltas[field] for field in COUNTER_FIELDS if deltas[field]}
+
+        if bucket.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                AgentUsage.objects.create(
+                    tenant=tenant, day=day, agent_type=agent_type, model=model,
+                    **{field: deltas[field] for field in COUNTER_FIELDS}
+                )
+        except IntegrityError:
+            # Another process created the bucket first
+            bucket.update(**increments)
+
+    def summarize(self, tenant, start, end, group_by=None):
+        """
+        Usage between two dates (inclusive), grouped by any of
+        day/agent_type/model. Each row carries the summed counters,
+        an estimated cost in USD and the average latency.
+        """
+        from .models import AgentUsage
+
+        group_by = [field for field in (group_by or []) if field in GROUP_FIELDS]
+
+        connection.set_tenant(tenant)
+        # Always split by model internally: pricing is per model
+        rows = AgentUsage.objects.filter(
+            tenant=tenant, day__gte=start, day__lte=end
+        ).values(*sorted(set(group_by) | {'model'})).annotate(
+            **{field: Sum(field) for field in COUNTER_FIELDS}
+        )
+
+        merged = {}
+        for row in rows:
+            group = tuple(row[field] for field in group_by)
+            target = merged.setdefault(group, {
+                **dict(zip(group_by, group)),
+                **{field: 0 for field in COUNTER_FIELDS},
+                'estimated_cost_usd': 0.0,
+            })
+            for field in COUNTER_FIELDS:
+                target[field] += row[field] or 0
+            target['estimated_cost_usd'] += estimate_cost(row['model'], row)
+
+        results = []
+        for group in sorted(merged, key=lambda g: [str(v) for v in g]):
+            row = merged[group]
+            row['estimated_cost_usd'] = round(row['estimated_cost_usd'], 6)
+            row['avg_latency_ms'] = round(row['latency_ms_sum'] / row['call_count'], 1) if row['call_count'] else 0
+            results.append(row)
+        return results
+
+
+usage_ledger = UsageLedger()
+log_sink.add_flush_hook(usage_ledger.flush)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=usage_ledger._after_fork)
@@ -2,10 +2,11 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views_agents import (
     support_chat, support_history,
-    recruiting_source, recruiting_screen,
+    recruiting_source, recruiting_screen, recruiting_screen_bulk, recruiting_batch, recruiting_prerank,
     onboarding_plan, payroll_pto,
-    knowledge_search, knowledge_ingest, analytics_stats,
-    orchestrator_run,
+    knowledge_search, knowledge_ingest, knowledge_ingest_bulk, knowledge_document, analytics_stats,
+    orchestrator_run, agent_cache_stats, agent_usage,
+    compliance_audit, compliance_drift, compliance_rules, agent_task_status,
     trigger_workflow
 )
 from .views import tenant_info
@@ -13,6 +14,7 @@ from employees.views import EmployeeViewSet
 from candidates.views import CandidateViewSet, JobViewSet
 from leave.views import LeaveRequestViewSet, LeaveBalanceViewSet
 from . import views_slack
+from . import views_async
 
 router = DefaultRouter()
 router.register(r'employees', EmployeeViewSet, basename='employee')
@@ -33,14 +35,34 @@ urlpatterns = [
     path('agents/support/history/', support_history, name='support_history'),
     path('agents/recruiting/source/', recruiting_source, name='recruiting_source'),
     path('agents/recruiting/screen/', recruiting_screen, name='recruiting_screen'),
+    path('agents/recruiting/screen/bulk/', recruiting_screen_bulk, name='recruiting_screen_bulk'),
+    path('agents/recruiting/batch/', recruiting_batch, name='recruiting_batch'),
+    path('agents/recruiting/prerank/', recruiting_prerank, name='recruiting_prerank'),
     path('agents/onboarding/plan/', onboarding_plan, name='onboarding_plan'),
     path('agents/payroll/pto/', payroll_pto, name='payroll_pto'),
     path('agents/knowledge/search/', knowledge_search, name='knowledge_search'),
     path('agents/knowledge/ingest/', knowledge_ingest, name='knowledge_ingest'),
+    path('agents/knowledge/ingest/bulk/', knowledge_ingest_bulk, name='knowledge_ingest_bulk'),
+    path('agents/knowledge/documents/<int:document_id>/', knowledge_document, name='knowledge_document'),
     path('agents/analytics/stats/', analytics_stats, name='analytics_stats'),
     path('agents/orchestrator/run/', orchestrator_run, name='orchestrator_run'),
+    path('agents/compliance/audit/', compliance_audit, name='compliance_audit'),
+    path('agents/compliance/rules/', compliance_rules, name='compliance_rules'),
+    path('agents/compliance/drift/', compliance_drift, name='compliance_drift'),
+    path('agents/tasks/<int:task_id>/', agent_task_status, name='agent_task_status'),
+    path('agents/cache/stats/', agent_cache_stats, name='agent_cache_stats'),
+    path('agents/usage/', agent_usage, name='agent_usage'),
     path('agents/workflow/trigger/', trigger_workflow, name='trigger_workflow'),
     
+    # Async agent endpoints (serve with an ASGI server, see CopilotHQ/asgi.py)
+    path('agents/async/support/chat/', views_async.support_chat, name='async_support_chat'),
+    path('agents/async/knowledge/search/', views_async.knowledge_search, name='async_knowledge_search'),
+    path('agents/async/orchestrator/run/', views_async.orchestrator_run, name='async_orchestrator_run'),
+    
+    # Server-sent-events streaming
+    path('agents/support/chat/stream/', views_async.support_chat_stream, name='support_chat_stream'),
+    path('agents/orchestrator/run/stream/', views_async.orchestrator_run_stream, name='orchestrator_run_stream'),
+    
     # Slack Integration
     path('slack/events/', views_slack.slack_events_endpoint, name='slack_events'),
 ]
@@ -52,9 +52,9 @@ def support_chat(request):
 @permission_classes([IsAuthenticated])
 def support_history(request):
     """
-    Get conversation history
+    Get conversation history, newest exchanges first page by page
     
-    GET /api/agents/support/history/
+    GET /api/agents/support/history/?limit=20&before=<turn>
     """
     tenant = getattr(connection, 'tenant', None)
     if not tenant:
@@ -62,19 +62,37 @@ def support_history(request):
 
     employee = request.user
     
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        before = request.query_params.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return Response({"error": "limit and before must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         conversation = ConversationHistory.objects.get(
             tenant=tenant,
             employee=employee
         )
+        rows, next_before = conversation.page(before_turn=before, limit=limit)
         
         return Response({
-            "messages": conversation.messages,
+            "messages": [
+                {
+                    "turn": row.turn,
+                    "role": row.role,
+                    "content": row.content,
+                    "created_at": row.created_at
+                }
+                for row in rows
+            ],
+            "turn_count": conversation.turn_count,
+            "next_before": next_before,
             "updated_at": conversation.updated_at
         })
         
     except ConversationHistory.DoesNotExist:
-        return Response({"messages": []})
+        return Response({"messages": [], "turn_count": 0, "next_before": None})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -107,7 +125,8 @@ def recruiting_screen(request):
     POST /api/agents/recruiting/screen/
     {
         "candidate_id": 456,
-        "job_id": 123
+        "job_id": 123,
+        "force_refresh": false  # optional: ignore a stored result for the same resume and requirements
     }
     """
     from agents.recruiting import RecruitingAgent
@@ -123,10 +142,142 @@ def recruiting_screen(request):
         return Response({"error": "candidate_id and job_id are required"}, status=status.HTTP_400_BAD_REQUEST)
     
     agent = RecruitingAgent(tenant)
-    evaluation = agent.screen_resume(candidate_id, job_id)
+    evaluation = agent.screen_resume(
+        candidate_id, job_id,
+        force_refresh=request.data.get('force_refresh') in (True, 'true', '1', 1)
+    )
     
     return Response(evaluation)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recruiting_screen_bulk(request):
+    """
+    POST /api/agents/recruiting/screen/bulk/
+    {
+        "job_id": 123,
+        "rescreen": false,  # optional: also screen candidates that already have an evaluation
+        "top_k": 50,  # optional: only screen the 50 best pre-ranked candidates
+        "force_refresh": false  # optional: ignore stored screening results
+    }
+    
+    Screens the job's candidates in the background; returns 202 with a
+    task_id to poll at /api/agents/tasks/<id>/.
+    """
+    from agents.screening import get_bulk_screening_settings, start_bulk_screening
+    from candidates.models import Job
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = Job.objects.filter(id=request.data.get('job_id')).first() if request.data.get('job_id') else None
+    if not job:
+        return Response({"error": "A valid job_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # An explicit top_k (even 0) is validated; null screens everyone
+    top_k = request.data['top_k'] if 'top_k' in request.data else get_bulk_screening_settings()['TOP_K']
+    try:
+        top_k = int(top_k) if top_k is not None else None
+    except (TypeError, ValueError):
+        top_k = 0
+    if top_k is not None and top_k < 1:
+        return Response({"error": "top_k must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rescreen = request.data.get('rescreen') in (True, 'true', '1', 1)
+    task = start_bulk_screening(
+        tenant, job, rescreen=rescreen, top_k=top_k,
+        force_refresh=request.data.get('force_refresh') in (True, 'true', '1', 1)
+    )
+    
+    return Response(
+        {"task_id": task.id, "status": task.status, "candidates": task.progress_total,
+         "skipped": task.input_data.get("skipped", 0)},
+        status=status.HTTP_202_ACCEPTED
+    )
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recruiting_prerank(request):
+    """
+    POST /api/agents/recruiting/prerank/
+    {"job_id": 123, "limit": 50}
+    
+    Scores all of the job's candidates locally (no LLM calls), saves their
+    prerank_score and returns the best ones.
+    """
+    from agents.prerank import prerank_job
+    from candidates.models import Job
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = Job.objects.filter(id=request.data.get('job_id')).first() if request.data.get('job_id') else None
+    if not job:
+        return Response({"error": "A valid job_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = max(1, min(int(request.data.get('limit', 50)), 1000))
+    except (TypeError, ValueError):
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ranking = prerank_job(job)
+    return Response({
+        "job_id": job.id,
+        "candidates": len(ranking),
+        "ranking": [{"candidate_id": candidate_id, "score": score} for candidate_id, score in ranking[:limit]],
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recruiting_batch(request):
+    """
+    POST /api/agents/recruiting/batch/
+    {
+        "job_id": 123,
+        "kind": "screen",  # or "outreach"
+        "candidate_ids": [1, 2],  # optional, default: the job's candidates
+        "rescreen": false,  # optional, screening only
+        "force_refresh": false  # optional, screening only: ignore stored results
+    }
+    
+    Submits one Message Batch; results are applied when it ends. Returns 202
+    with a task_id to poll at /api/agents/tasks/<id>/ (outreach drafts are in
+    the task output).
+    """
+    from agents.batches import start_message_batch
+    from candidates.models import Job
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = Job.objects.filter(id=request.data.get('job_id')).first() if request.data.get('job_id') else None
+    if not job:
+        return Response({"error": "A valid job_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    candidate_ids = request.data.get('candidate_ids')
+    if candidate_ids is not None and not isinstance(candidate_ids, list):
+        return Response({"error": "candidate_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        task = start_message_batch(
+            tenant, job, request.data.get('kind', 'screen'),
+            candidate_ids=candidate_ids,
+            rescreen=request.data.get('rescreen') in (True, 'true', '1', 1),
+            force_refresh=request.data.get('force_refresh') in (True, 'true', '1', 1)
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        "task_id": task.id,
+        "status": task.status,
+        "batch_id": (task.output_data or {}).get("batch_id"),
+        "requests": task.progress_total,
+    }, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def onboarding_plan(request):
@@ -181,8 +332,11 @@ def knowledge_search(request):
     """
     POST /api/agents/knowledge/search/
     {
-        "query": "What is the remote work policy?"
+        "query": "\"remote work\" policy",
+        "limit": 5  # optional, max 20
     }
+    
+    Supports "phrases", OR, -excluded terms and prefix* terms.
     """
     from agents.knowledge import KnowledgeAgent
     
@@ -194,8 +348,13 @@ def knowledge_search(request):
     if not query:
         return Response({"error": "query is required"}, status=status.HTTP_400_BAD_REQUEST)
     
+    try:
+        limit = min(max(int(request.data.get('limit', 5)), 1), 20)
+    except (TypeError, ValueError):
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    
     agent = KnowledgeAgent(tenant)
-    results = agent.search_knowledge(query)
+    results = agent.search_knowledge(query, limit=limit)
     
     return Response(results)
 
@@ -208,19 +367,37 @@ def knowledge_ingest(request):
         "title": "Remote Work Policy",
         "content": "Employees can work from home..."
     }
+    
+    or multipart/form-data with a "file" (PDF or text) and optional
+    "title", "category" and "force". Files are extracted in the background;
+    poll /api/agents/knowledge/documents/<id>/ for the ingest status.
     """
     from agents.knowledge import KnowledgeAgent
     from agents.models import KnowledgeBase
+    from agents.passage_index import index_document
     
     tenant = getattr(connection, 'tenant', None)
     if not tenant:
         return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
 
+    upload = request.FILES.get('file')
+    if upload:
+        agent = KnowledgeAgent(tenant)
+        result = agent.ingest_document(
+            upload,
+            request.data.get('title') or upload.name,
+            category=request.data.get('category') or 'General',
+            force=str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+        )
+        if not result["success"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_202_ACCEPTED if result["status"] == 'pending' else status.HTTP_200_OK)
+
     title = request.data.get('title')
     content = request.data.get('content')
     
     if not title or not content:
-        return Response({"error": "title and content are required"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"error": "title and content (or a file) are required"}, status=status.HTTP_400_BAD_REQUEST)
     
     # Save directly to database
     kb_entry, created = KnowledgeBase.objects.update_or_create(
@@ -228,8 +405,100 @@ def knowledge_ingest(request):
         title=title,
         defaults={'content': content, 'category': 'Manual'}
     )
+    chunks = index_document(kb_entry)
+    
+    return Response({"success": True, "created": created, "title": title, "chunks": chunks})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def knowledge_ingest_bulk(request):
+    """
+    POST /api/agents/knowledge/ingest/bulk/?category=Handbook&force=1
+    
+    Body, one of:
+    - application/zip: an archive of PDF and text files
+    - multipart/form-data: an "archive" (zip) and/or any number of "files"
+    - application/x-ndjson: {"title": ..., "content": ..., "category": ...} per line
+    
+    Returns a report with one item per entry (created, updated, unchanged,
+    queued for PDF extraction, or error). Archives over MAX_ARCHIVE_BYTES
+    are refused with 413.
+    """
+    from agents.bulk_ingest import ArchiveTooLarge, BulkIngestor, copy_archive, ingest_ndjson, ingest_zip
+    import tempfile
+    import zipfile
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ingestor = BulkIngestor(
+        tenant,
+        category=request.query_params.get('category') or 'General',
+        force=request.query_params.get('force', '').lower() in ('1', 'true', 'yes')
+    )
+    content_type = request.content_type.split(';')[0].strip().lower()
+    
+    try:
+        if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+            if request.stream is not None:
+                ingest_ndjson(ingestor, request.stream)
+        elif content_type in ('application/zip', 'application/x-zip-compressed'):
+            with tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024) as archive:
+                if request.stream is not None:
+                    copy_archive(request.stream, archive, ingestor.settings['MAX_ARCHIVE_BYTES'])
+                archive.seek(0)
+                ingest_zip(ingestor, archive)
+        elif content_type == 'multipart/form-data':
+            if 'archive' in request.FILES:
+                ingest_zip(ingestor, request.FILES['archive'])
+            for upload in request.FILES.getlist('files'):
+                if not ingestor.accepts_more():
+                    break
+                ingestor.add_file(upload.name, upload)
+        else:
+            return Response(
+                {"error": "Send a zip archive, multipart files or NDJSON"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+    except zipfile.BadZipFile:
+        return Response({"error": "Invalid zip archive"}, status=status.HTTP_400_BAD_REQUEST)
+    except ArchiveTooLarge:
+        return Response(
+            {"error": f"Archive larger than {ingestor.settings['MAX_ARCHIVE_BYTES']} bytes"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+    
+    return Response(ingestor.finish())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def knowledge_document(request, document_id):
+    """
+    GET /api/agents/knowledge/documents/<id>/
+    Ingest status of a knowledge base document
+    """
+    from agents.models import KnowledgeBase
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response({"success": True, "created": created, "title": title})
+    document = KnowledgeBase.objects.filter(tenant=tenant, id=document_id).defer('content', 'search_vector').first()
+    if not document:
+        return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        "id": document.id,
+        "title": document.title,
+        "category": document.category,
+        "ingest_status": document.ingest_status,
+        "ingest_error": document.ingest_error,
+        "page_count": document.page_count,
+        "content_hash": document.content_hash,
+        "ingested_at": document.ingested_at,
+        "updated_at": document.updated_at,
+    })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -248,6 +517,67 @@ def analytics_stats(request):
     
     return Response(stats)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def agent_usage(request):
+    """
+    GET /api/agents/usage/?start=2026-10-01&end=2026-10-31&group_by=agent_type,model
+    
+    Defaults to the last 30 days grouped by agent_type.
+    group_by accepts any of: day, agent_type, model
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date
+    from agents.usage import usage_ledger
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def parse(name):
+        # parse_date returns None for malformed input and raises for impossible dates
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+    
+    try:
+        end = parse('end') or timezone.now().date()
+        start = parse('start') or end - timedelta(days=29)
+    except ValueError:
+        return Response({"error": "start and end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    group_by = [g for g in request.query_params.get('group_by', 'agent_type').split(',') if g]
+    
+    return Response({
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "results": usage_ledger.summarize(tenant, start, end, group_by=group_by)
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def agent_cache_stats(request):
+    """
+    GET /api/agents/cache/stats/
+    """
+    from agents.caching import context_cache, response_cache, search_cache
+    from agents.passage_index import chunk_index
+    
+    return Response({
+        "context": context_cache.stats(),
+        "responses": response_cache.stats(),
+        "search": search_cache.stats(),
+        "knowledge_index": chunk_index.stats(),
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def orchestrator_run(request):
@@ -272,6 +602,193 @@ def orchestrator_run(request):
     
     return Response(plan)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def compliance_audit(request):
+    """
+    POST /api/agents/compliance/audit/
+    {
+        "document_text": "...",
+        "doc_type": "contract",
+        "llm_mode": "escalations",  # optional: escalations | always | never
+        "background": false  # optional
+    }
+    
+    Rule checks run in the request. Full LLM audits (llm_mode "always") of
+    long documents are queued and return 202 with a task_id to poll at
+    /api/agents/tasks/<id>/.
+    """
+    from agents.compliance import ComplianceAgent, get_audit_settings
+    from agents.models import AgentTask
+    from agents.sections import split_sections
+    from agents.tasks import run_compliance_audit
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    document_text = request.data.get('document_text')
+    doc_type = request.data.get('doc_type', 'contract')
+    if not document_text:
+        return Response({"error": "document_text is required"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    audit_settings = get_audit_settings()
+    llm_mode = request.data.get('llm_mode') or audit_settings['LLM_MODE']
+    if llm_mode not in ('escalations', 'always', 'never'):
+        return Response({"error": "llm_mode must be escalations, always or never"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    sections = len(split_sections(document_text, audit_settings['SECTION_TOKENS'])) if llm_mode == 'always' else 1
+    background = request.data.get('background') in (True, 'true', '1', 1)
+    
+    if not background and sections <= audit_settings['BACKGROUND_SECTIONS']:
+        agent = ComplianceAgent(tenant)
+        return Response(agent.audit(document_text, doc_type, llm_mode=llm_mode))
+    
+    task = AgentTask.objects.create(
+        tenant=tenant,
+        agent_type='compliance',
+        task_type='audit_document',
+        input_data={"document_text": document_text, "doc_type": doc_type, "llm_mode": llm_mode},
+        progress_total=sections + 1 if sections > 1 else 1
+    )
+    run_compliance_audit.delay(tenant.id, task.id)
+    
+    return Response({"task_id": task.id, "status": task.status, "sections": sections}, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def compliance_drift(request):
+    """
+    POST /api/agents/compliance/drift/
+    {"employee_id": 1, "field": "salary", "new_value": 50000, "explain": "drift"}
+    
+    or, in bulk, {"changes": [{"employee_id": 1, "salary": 50000, "position": "..."}, ...]}
+    or multipart/form-data with a CSV "file" (columns employee_id and any of
+    salary, position, department, contract_type).
+    
+    explain is drift (explain flagged checks), always or never. A single
+    check defaults to COMPENSATION['EXPLAIN'], bulk checks to never.
+    """
+    from agents.compliance import ComplianceAgent
+    from agents.compensation import get_compensation_settings, parse_employee_id
+    import csv
+    import io
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    agent = ComplianceAgent(tenant)
+    max_rows = get_compensation_settings()['BULK_MAX_ROWS']
+    explain = request.data.get('explain') or None
+    if explain not in (None, 'drift', 'always', 'never'):
+        return Response({"error": "explain must be drift, always or never"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    upload = request.FILES.get('file')
+    if upload:
+        reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig', errors='replace'))
+        rows = []
+        for row in reader:
+            if len(rows) >= max_rows:
+                return Response({"error": f"At most {max_rows} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+            rows.append({(key or '').strip().lower(): value for key, value in row.items()})
+        return Response(agent.check_policy_drift_bulk(rows, explain=explain or 'never'))
+    
+    changes = request.data.get('changes')
+    if isinstance(changes, list):
+        if len(changes) > max_rows:
+            return Response({"error": f"At most {max_rows} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(row, dict) for row in changes):
+            return Response({"error": "changes must be a list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(agent.check_policy_drift_bulk(changes, explain=explain or 'never'))
+    
+    if not request.data.get('employee_id'):
+        return Response({"error": "employee_id (or a list of changes, or a CSV file) is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        parse_employee_id(request.data.get('employee_id'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = agent.check_policy_drift(dict(request.data.items()), explain=explain)
+    if result["status"] == "error":
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def compliance_rules(request):
+    """
+    GET  /api/agents/compliance/rules/  -> built-in defaults and tenant rules
+    POST /api/agents/compliance/rules/  (staff only: create or replace a rule by name)
+    {
+        "name": "max_weekly_hours",
+        "rule_type": "numeric_threshold",  # regex | keyword | required | numeric_threshold
+        "pattern": "(\\d+)\\s*hours per week",
+        "config": {"max": 40, "margin": 2},
+        "severity": "high",
+        "action": "flag",  # or "escalate"
+        "message": "Working time of {value:g} hours per week exceeds {max:g}",
+        "is_active": true
+    }
+    """
+    from agents.models import ComplianceRule
+    from agents.rules import DEFAULT_RULES
+    from agents.serializers import ComplianceRuleSerializer
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if request.method == 'GET':
+        return Response({
+            "defaults": DEFAULT_RULES,
+            "rules": ComplianceRuleSerializer(
+                ComplianceRule.objects.filter(tenant=tenant).order_by('name'), many=True
+            ).data,
+        })
+    
+    # Rules decide every audit of the tenant: only staff may change them
+    if not (request.user.is_staff or request.user.is_superuser):
+        return Response({"error": "Only administrators can change compliance rules"}, status=status.HTTP_403_FORBIDDEN)
+    
+    existing = ComplianceRule.objects.filter(tenant=tenant, name=request.data.get('name')).first()
+    serializer = ComplianceRuleSerializer(existing, data=request.data)
+    if not serializer.is_valid():
+        return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    rule = serializer.save(tenant=tenant)
+    
+    return Response({"success": True, "id": rule.id, "created": existing is None},
+                    status=status.HTTP_201_CREATED if existing is None else status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def agent_task_status(request, task_id):
+    """
+    GET /api/agents/tasks/<id>/
+    Status, progress and (once completed) output of a background agent task
+    """
+    from agents.models import AgentTask
+    
+    tenant = getattr(connection, 'tenant', None)
+    if not tenant:
+        return Response({"error": "Tenant not identified"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    task = AgentTask.objects.filter(tenant=tenant, id=task_id).defer('input_data').first()
+    if not task:
+        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        "id": task.id,
+        "agent_type": task.agent_type,
+        "task_type": task.task_type,
+        "status": task.status,
+        "progress": {"done": task.progress_done, "total": task.progress_total},
+        "output": task.output_data,
+        "error": task.error,
+        "created_at": task.created_at,
+        "completed_at": task.completed_at,
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def trigger_workflow(request):
@@ -0,0 +1,231 @@
+"""
+Async agent endpoints.
+
+Served under ASGI (CopilotHQ/asgi.py) these views await Claude without
+holding a worker thread, so one process can keep many agent calls in
+flight. DRF's @api_view is sync-only, so authentication is done with the
+configured DRF authenticators and JSON is parsed by hand.
+(Django 4.2's view decorators are sync-only too, hence async_post_view.)
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def async_post_view(view):
+    """POST-only, CSRF-exempt wrapper that keeps the view a coroutine"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return JsonResponse({"error": f'Method "{request.method}" not allowed.'}, status=405)
+        return await view(request, *args, **kwargs)
+
+    # Session-authenticated requests are CSRF-checked by DRF's SessionAuthentication
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def _sse(event):
+    """Format one event dict as a server-sent event"""
+    data = {k: v for k, v in event.items() if k != "type"}
+    return f"event: {event['type']}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _event_stream(events):
+    """Wrap an agent event generator into an SSE response"""
+    async def stream():
+        try:
+            async for event in events:
+                yield _sse(event)
+        except Exception as e:
+            yield _sse({"type": "error", "error": str(e)})
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _authenticate(request):
+    """Run the DRF authenticators; returns the user or None"""
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    user = drf_request.user
+    if user and user.is_authenticated:
+        return user
+    return None
+
+
+async def _prepare(request):
+    """
+    Common preamble: tenant, authenticated user and JSON body.
+    Returns (tenant, user, data, error_response).
+    """
+    # The tenant comes from the request, never from the thread-local connection
+    tenant = getattr(request, 'tenant', None)
+    if not tenant:
+        return None, None, None, JsonResponse({"error": "Tenant not identified"}, status=400)
+
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except APIException as e:
+        return None, None, None, JsonResponse({"error": str(e.detail)}, status=e.status_code)
+    if user is None:
+        return None, None, None, JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None, None, None, JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    return tenant, user, data, None
+
+
+@async_post_view
+async def support_chat(request):
+    """
+    POST /api/agents/async/support/chat/
+    {
+        "message": "How many vacation days do I have?"
+    }
+    """
+    from agents.support import AsyncSupportAgent
+
+    tenant, employee, data, error = await _prepare(request)
+    if error:
+        return error
+
+    message = data.get('message')
+    if not message:
+        return JsonResponse({"error": "message is required"}, status=400)
+
+    try:
+        agent = await AsyncSupportAgent.create(tenant)
+        result = await agent.answer_question(employee, message)
+
+        return JsonResponse({
+            "success": True,
+            "answer": result["answer"],
+            "tool_calls": result.get("tool_calls", []),
+            "conversation_id": result["conversation_id"]
+        })
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@async_post_view
+async def knowledge_search(request):
+    """
+    POST /api/agents/async/knowledge/search/
+    {
+        "query": "What is the remote work policy?"
+    }
+    """
+    from agents.knowledge import AsyncKnowledgeAgent
+
+    tenant, user, data, error = await _prepare(request)
+    if error:
+        return error
+
+    query = data.get('query')
+    if not query:
+        return JsonResponse({"error": "query is required"}, status=400)
+
+    try:
+        agent = await AsyncKnowledgeAgent.create(tenant)
+        results = await agent.search_knowledge(query)
+
+        return JsonResponse(results)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@async_post_view
+async def orchestrator_run(request):
+    """
+    POST /api/agents/async/orchestrator/run/
+    {
+        "query": "Help me hire a new dev and plan their onboarding"
+    }
+    """
+    from agents.orchestrator import AsyncOrchestratorAgent
+
+    tenant, user, data, error = await _prepare(request)
+    if error:
+        return error
+
+    query = data.get('query')
+    if not query:
+        return JsonResponse({"error": "query is required"}, status=400)
+
+    try:
+        agent = await AsyncOrchestratorAgent.create(tenant)
+        plan = await agent.handle_request(query)
+
+        return JsonResponse(plan)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@async_post_view
+async def support_chat_stream(request):
+    """
+    POST /api/agents/support/chat/stream/
+    {
+        "message": "How many vacation days do I have?"
+    }
+    Responds with text/event-stream: token, tool_call, tool_result, done
+    """
+    from agents.support import AsyncSupportAgent
+
+    tenant, employee, data, error = await _prepare(request)
+    if error:
+        return error
+
+    message = data.get('message')
+    if not message:
+        return JsonResponse({"error": "message is required"}, status=400)
+
+    try:
+        agent = await AsyncSupportAgent.create(tenant)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    return _event_stream(agent.stream_answer(employee, message))
+
+
+@async_post_view
+async def orchestrator_run_stream(request):
+    """
+    POST /api/agents/orchestrator/run/stream/
+    {
+        "query": "Help me hire a new dev and plan their onboarding"
+    }
+    Responds with text/event-stream: token, done
+    """
+    from agents.orchestrator import AsyncOrchestratorAgent
+
+    tenant, user, data, error = await _prepare(request)
+    if error:
+        return error
+
+    query = data.get('query')
+    if not query:
+        return JsonResponse({"error": "query is required"}, status=400)
+
+    try:
+        agent = await AsyncOrchestratorAgent.create(tenant)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    return _event_stream(agent.stream_request(query))
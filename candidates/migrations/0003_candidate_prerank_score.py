@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0002_candidate_job_candidate_linkedin_url_candidate_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='prerank_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -29,6 +29,7 @@ class Candidate(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='applied')
     ai_score = models.IntegerField(default=0)
     ai_evaluation = models.JSONField(null=True, blank=True)
+    prerank_score = models.FloatField(null=True, blank=True)  # local BM25 fit with the job (agents/prerank.py)
     job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name='candidates')
     created_at = models.DateTimeField(auto_now_add=True)
 
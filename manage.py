@@ -5,7 +5,8 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CopilotHQ.settings.base')
+    default_settings = 'CopilotHQ.settings.test' if sys.argv[1:2] == ['test'] else 'CopilotHQ.settings.base'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: